@@ -2,11 +2,63 @@ import argparse
 import subprocess as sp
 import logging as log
 import os
+import re
+import sys
+import shutil
+import json
+import time
+import shlex
+import threading
+import hashlib
+import tempfile
 
-from typing import Dict, Optional
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Callable, Dict, List, Optional, Tuple
 
 log.basicConfig(level=log.INFO, format='%(levelname)s: %(message)s')
 
+# docker CLI to invoke, overridden by --docker (e.g. ./fake_docker.py for offline testing)
+DOCKER: str = "docker"
+
+# BuildKit cache: local cache directory root (--cache-dir, None disables it) and buildx builder (--builder)
+CACHE_DIR: Optional[str] = None
+BUILDER: Optional[str] = None
+
+# Retries: base delay of the exponential backoff (--retry-backoff) and structured build log (--build-log)
+RETRY_BACKOFF: float = 5.0
+BUILD_LOG: Optional[str] = None
+
+# Build context analysis: where content hashes are cached between runs (--context-cache-dir)
+CONTEXT_CACHE_DIR: str = "~/.cache/vulkan-dev/context"
+
+# Parallel builds share stdout, keep their lines whole
+output_lock: threading.Lock = threading.Lock()
+build_log_lock: threading.Lock = threading.Lock()
+
+# Parallel builds of one Dockerfile share its local cache, swapping a new export in is serialised per cache
+cache_locks: Dict[str, threading.Lock] = {}
+cache_locks_lock: threading.Lock = threading.Lock()
+
+# Failure classes tried in order on each line of the failed step's output: (name, transient, pattern).
+# Network flakes are tried first, a failed wget/git clone also prints "error:" lines.
+FAILURE_CLASSES: List[Tuple[str, bool, re.Pattern]] = [
+    ("network", True, re.compile(
+        r"Could not resolve host|Temporary failure (in name resolution|resolving)|unable to resolve host address"
+        r"|Connection (timed out|reset|refused)|TLS handshake timeout|i/o timeout|early EOF|RPC failed"
+        r"|unexpected disconnect|Unable to establish SSL connection|Failed to fetch|Hash Sum mismatch"
+        r"|curl: \((6|7|18|28|35|52|56)\)|ERROR (429|5\d\d)|\b(429|50[234])\b.*(Too Many Requests|Bad Gateway|Service Unavailable|Gateway Time-?out)"
+        r"|toomanyrequests|failed to do request|net/http: request canceled")),
+    ("daemon", True, re.compile(r"Cannot connect to the Docker daemon|error reading from server: EOF|rpc error: code = Unavailable")),
+    ("disk", False, re.compile(r"no space left on device", re.IGNORECASE)),
+    ("oom", False, re.compile(r"exit code: 137|Killed signal terminated program|virtual memory exhausted|Cannot allocate memory")),
+    ("dockerfile", False, re.compile(
+        r"dockerfile parse error|unknown instruction|failed to compute cache key|COPY failed|failed to read dockerfile"
+        r"|pull access denied|manifest unknown")),
+    ("package", False, re.compile(r"Unable to locate package|has no installation candidate")),
+    ("compile", False, re.compile(r"\berror: |fatal error:|undefined reference to|make(\[\d+\])?: \*\*\*|ninja: build stopped|CMake Error")),
+]
+
 
 def parse_build_args(build_args: str) -> Dict[str, str]:
     build_args_dict: Dict[str, str] = {}
@@ -18,32 +70,753 @@ def parse_build_args(build_args: str) -> Dict[str, str]:
     
     return build_args_dict
 
-def build(image: str, dockerfile: str, build_args: Optional[str], retry: int) -> None:
-    build_args_cmd: str = ""
+def stream_command(command: List[str], prefix: str = "", on_line: Optional[Callable[[str], None]] = None,
+                   env: Optional[Dict[str, str]] = None) -> Tuple[int, str]:
+    """
+    Runs a command echoing its combined stdout/stderr line by line as it arrives, instead of
+    buffering everything until it exits. Returns the exit code and the last lines of output.
+    """
+    process = sp.Popen(command, stdout=sp.PIPE, stderr=sp.STDOUT, text=True, bufsize=1,
+                       env={**os.environ, **env} if env else None)
+    tail: deque = deque(maxlen=200)
+
+    for line in process.stdout:
+        tail.append(line)
+        if on_line:
+            on_line(line)
+        with output_lock:
+            sys.stdout.write(f"{prefix}{line}")
+            sys.stdout.flush()
+
+    return process.wait(), "".join(tail)
+
+def buildx_available() -> bool:
+    try:
+        return sp.run([DOCKER, "buildx", "version"], capture_output=True, text=True).returncode == 0
+    except FileNotFoundError:
+        return False
+
+def local_cache_export() -> bool:
+    """
+    type=local cache export needs a BuildKit that owns its cache store: an explicit --builder, a
+    docker-container (or kubernetes/remote) buildx driver, or a daemon on the containerd image
+    store. The default `docker` driver rejects --cache-to, so those builds keep the inline cache.
+    """
+    if BUILDER:
+        return True
+
+    try:
+        inspect = sp.run([DOCKER, "buildx", "inspect"], capture_output=True, text=True)
+        driver = re.search(r'^Driver:\s*(\S+)', inspect.stdout, re.M)
+        if inspect.returncode == 0 and driver and driver.group(1) != "docker":
+            return True
+        info = sp.run([DOCKER, "info", "--format", "{{json .DriverStatus}}"], capture_output=True, text=True)
+    except FileNotFoundError:
+        return False
+
+    return info.returncode == 0 and "io.containerd.snapshotter" in info.stdout
+
+def cache_path(dockerfile: str) -> Optional[str]:
+    """
+    One local cache per Dockerfile: every tag built from it shares the same layers.
+    """
+    if not CACHE_DIR:
+        return None
+
+    return os.path.join(os.path.expanduser(CACHE_DIR), re.sub(r'[^\w.-]', '_', dockerfile))
+
+def swap_cache(cache: str, export: str) -> None:
+    """
+    Replaces a local cache with a finished export. Each build exports to its own directory, so
+    builds of the same Dockerfile never write into one another's; the last one to finish wins whole.
+    """
+    with cache_locks_lock:
+        lock = cache_locks.setdefault(cache, threading.Lock())
+    with lock:
+        old = f"{export}.old"
+        if os.path.isdir(cache):
+            os.replace(cache, old)
+        os.replace(export, cache)
+        shutil.rmtree(old, ignore_errors=True)
+
+def build_command(image: str, dockerfile: str, build_args: Optional[str], buildx: bool = False,
+                  cache_export: Optional[str] = None) -> List[str]:
+    """
+    With a buildx builder that can export caches (see local_cache_export) the build imports the local
+    cache directory (type=local) and exports to `cache_export`, so layers survive `docker builder prune`
+    and can be copied between machines; `--load` puts the result in the local image store. Otherwise
+    BuildKit's inline cache metadata lets the previous image of the same tag serve as cache source,
+    registry-less.
+    """
+    cache = cache_path(dockerfile)
+
+    if buildx:
+        command: List[str] = [DOCKER, "buildx", "build", "--load", "--progress=plain"]
+        if BUILDER:
+            command += ["--builder", BUILDER]
+        if cache and os.path.isdir(cache):
+            command += ["--cache-from", f"type=local,src={cache}"]
+        if cache and cache_export:
+            # Written next to the old cache and swapped in after success, type=local never prunes in place
+            command += ["--cache-to", f"type=local,dest={cache_export},mode=max"]
+    else:
+        command = [DOCKER, "build", "--progress=plain", "--build-arg", "BUILDKIT_INLINE_CACHE=1"]
+        if cache:
+            command += ["--cache-from", image]
+
     if build_args:
-        build_args_dict = parse_build_args(build_args)
-        for key, value in build_args_dict.items():
-            build_args_cmd += f"--build-arg {key.upper()}=\"{value}\" "
+        for key, value in parse_build_args(build_args).items():
+            command += ["--build-arg", f"{key.upper()}={value}"]
+
+    return command + ["-t", image, "-f", dockerfile, "."]
+
+class BuildProgress:
+    """
+    Parses BuildKit `--progress=plain` output into per-step records:
+
+        #7 [3/12] RUN apt-get update ...
+        #7 CACHED                     or    #7 DONE 41.3s    or    #7 ERROR: ...
+    """
+    STEP = re.compile(r'^#(\d+) \[([^\]]*?)(\d+)/(\d+)\] (.*)$')
+    STATE = re.compile(r'^#(\d+) (CACHED|DONE (\d+(?:\.\d+)?)s|ERROR\b.*)$')
+    # Step output, with BuildKit's "#7 12.345 " vertex/timestamp prefix
+    OUTPUT = re.compile(r'^#(\d+) (?:\d+\.\d+ )?(.*)$')
+
+    def __init__(self) -> None:
+        self.steps: Dict[str, Dict] = {}
+        self.output: Dict[str, deque] = {}
+
+    def feed(self, line: str) -> None:
+        line = line.rstrip()
+
+        match = self.OUTPUT.match(line)
+        if match and match.group(1) in self.steps:
+            self.output.setdefault(match.group(1), deque(maxlen=100)).append(match.group(2))
+
+        match = self.STEP.match(line)
+        if match:
+            vertex, stage, index, total, instruction = match.groups()
+            self.steps.setdefault(vertex, {
+                "step": f"{stage.strip()} {index}/{total}".strip(),
+                "instruction": instruction,
+                "status": "RUNNING",
+                "seconds": 0.0,
+            })
+            return
+
+        match = self.STATE.match(line)
+        if match and match.group(1) in self.steps:
+            step = self.steps[match.group(1)]
+            state = match.group(2)
+            if state == "CACHED":
+                step["status"] = "CACHED"
+            elif state.startswith("DONE"):
+                step["status"] = "BUILT"
+                step["seconds"] = float(match.group(3))
+            else:
+                step["status"] = "ERROR"
+
+    def summary(self) -> List[Dict]:
+        return list(self.steps.values())
+
+    def failed_vertex(self) -> Optional[str]:
+        return next((v for v, s in self.steps.items() if s["status"] == "ERROR"), None)
+
+    def failed_step(self) -> Optional[Dict]:
+        vertex = self.failed_vertex()
+        return self.steps[vertex] if vertex else None
+
+    def failed_output(self) -> List[str]:
+        """
+        Last lines printed by the step that failed, ending with its ERROR line.
+        """
+        vertex = self.failed_vertex()
+        return list(self.output.get(vertex, ())) if vertex else []
+
+def classify_failure(output: str, step_output: Optional[List[str]] = None) -> Dict:
+    """
+    Classifies a failed build from the output of the step that failed (BuildProgress.failed_output)
+    or, when no step failed (Dockerfile parse errors, daemon errors), from the last error line of
+    the build. Lines are read bottom-up so the error closest to the failure decides, not a flake
+    the step recovered from earlier. Transient classes (network, daemon) are worth retrying; the
+    others fail the same way every time, and so are assumed to do unrecognised failures.
+    """
+    # Drop BuildKit's "#7 12.345 " vertex/timestamp prefix from step output
+    lines = [re.sub(r'^#\d+ \d+\.\d+ ', '', line).strip() for line in output.splitlines()]
+    lines = [line for line in lines if line]
+
+    if step_output:
+        candidates = [line.strip() for line in step_output if line.strip()]
+    else:
+        errors = [line for line in lines if re.search(r'\berror\b', line, re.IGNORECASE)]
+        candidates = (errors or lines)[-1:]
+
+    for line in reversed(candidates):
+        for name, transient, pattern in FAILURE_CLASSES:
+            if pattern.search(line):
+                return {"class": name, "transient": transient, "reason": line[-300:]}
+
+    return {"class": "unknown", "transient": False, "reason": candidates[-1][-300:] if candidates else ""}
+
+def write_build_log(record: Dict) -> None:
+    """
+    Appends one JSON line per build attempt to --build-log.
+    """
+    if not BUILD_LOG:
+        return
+
+    with build_log_lock:
+        os.makedirs(os.path.dirname(os.path.abspath(BUILD_LOG)), exist_ok=True)
+        with open(BUILD_LOG, 'a') as f:
+            f.write(json.dumps(record) + "\n")
+
+def log_build_summary(steps: List[Dict], prefix: str = "") -> None:
+    if not steps:
+        return
+
+    cached = [s for s in steps if s["status"] == "CACHED"]
+    built = [s for s in steps if s["status"] != "CACHED"]
+
+    log.info(f"{prefix}Build steps ({len(cached)} cached, {len(built)} rebuilt):")
+    for s in steps:
+        log.info(f"{prefix}  {s['step']:>8} {s['status']:<7} {s['seconds']:8.1f}s  {s['instruction'][:80]}")
+
+    if built:
+        first = built[0]
+        log.info(f"{prefix}Cache invalidated at step {first['step']}: {first['instruction'][:80]}")
+        log.info(f"{prefix}Rebuilt steps took {sum(s['seconds'] for s in built):.1f}s")
+
+def build(image: str, dockerfile: str, build_args: Optional[str], retry: int, prefix: str = "") -> bool:
+    """
+    Builds an image, retrying transient failures with exponential backoff. Retries never pass
+    --no-cache, so BuildKit resumes from the layers that completed in the failed attempt.
+    Deterministic failures (compile errors, missing packages, ...) abort at once.
+    """
+    cache = cache_path(dockerfile)
+    buildx = buildx_available() and local_cache_export()
+    if cache and not buildx:
+        log.info(f"{prefix}No buildx builder that can export a local cache, using the inline cache of {image}")
+    export = None
+    if buildx and cache:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        export = tempfile.mkdtemp(dir=os.path.dirname(cache), prefix=f"{os.path.basename(cache)}.new-")
+    command = build_command(image, dockerfile, build_args, buildx, export)
+
+    log.info(f"{prefix}Running build command: {shlex.join(command)}")
+
+    try:
+        for attempt in range(1, retry + 1):
+            progress = BuildProgress()
+            started = time.time()
+            returncode, output = stream_command(command, prefix, on_line=progress.feed, env={"DOCKER_BUILDKIT": "1"})
+            steps = progress.summary()
+            log_build_summary(steps, prefix)
+
+            failure = classify_failure(output, progress.failed_output()) if returncode != 0 else None
+            if failure:
+                step = progress.failed_step()
+                failure["step"] = f"{step['step']} {step['instruction'][:80]}" if step else None
+
+            write_build_log({
+                "image": image,
+                "dockerfile": dockerfile,
+                "attempt": attempt,
+                "started": started,
+                "seconds": round(time.time() - started, 3),
+                "returncode": returncode,
+                "cached_steps": sum(1 for s in steps if s["status"] == "CACHED"),
+                "steps": steps,
+                "failure": failure,
+            })
+
+            if returncode == 0:
+                if export and os.path.isfile(os.path.join(export, "index.json")):
+                    swap_cache(cache, export)
+                return True
+
+            log.error(f"{prefix}Build of {image} failed with exit code {returncode} (attempt {attempt}/{retry}): "
+                      f"{failure['class']} failure{' at step ' + failure['step'] if failure['step'] else ''}: {failure['reason']}")
+
+            if not failure["transient"]:
+                log.error(f"{prefix}{failure['class']} failures are deterministic, not retrying")
+                return False
+
+            if attempt < retry:
+                delay = min(RETRY_BACKOFF * 2 ** (attempt - 1), 300.0)
+                log.info(f"{prefix}Retrying in {delay:.1f}s, completed layers are reused from the build cache")
+                time.sleep(delay)
+
+        return False
+    finally:
+        # Nothing to swap in after a failure; after a success the export already became the cache
+        if export:
+            shutil.rmtree(export, ignore_errors=True)
+
+def default_build_graph(image_repo: str, image_tag: str, build_args: Optional[str]) -> Dict[str, Dict]:
+    """
+    Dockerfile starts FROM the :base image, so the base build must finish before the derived one.
+    """
+    return {
+        "base": {"image": f"{image_repo}:base", "dockerfile": "Dockerfile.base", "build_args": build_args, "depends": []},
+        "derived": {"image": f"{image_repo}:{image_tag}", "dockerfile": "Dockerfile", "build_args": build_args, "depends": ["base"]},
+    }
+
+def load_build_graph(path: str) -> Dict[str, Dict]:
+    """
+    JSON object of nodes: {"name": {"image": ..., "dockerfile": ..., "build_args": "K=V ...", "depends": [...]}}.
+    Nodes without a dependency path between them are built in parallel, e.g. several tags of the
+    derived image with different build args.
+    """
+    with open(path) as f:
+        graph: Dict[str, Dict] = json.load(f)
+
+    for node in graph.values():
+        node.setdefault("build_args", None)
+        node.setdefault("depends", [])
+
+    return graph
+
+def validate_build_graph(graph: Dict[str, Dict]) -> None:
+    for name, node in graph.items():
+        missing = [d for d in node["depends"] if d not in graph]
+        if missing:
+            log.error(f"Build node '{name}' depends on unknown node(s): {', '.join(missing)}")
+            exit(1)
+
+    # Kahn's algorithm: whatever cannot be ordered is part of a cycle
+    remaining = {name: set(node["depends"]) for name, node in graph.items()}
+    while remaining:
+        ready = [name for name, deps in remaining.items() if not deps]
+        if not ready:
+            log.error(f"Build graph has a dependency cycle between: {', '.join(sorted(remaining))}")
+            exit(1)
+        for name in ready:
+            del remaining[name]
+        for deps in remaining.values():
+            deps.difference_update(ready)
+
+def build_node(name: str, node: Dict, retry: int) -> Tuple[bool, float]:
+    started = time.perf_counter()
+    ok = build(image=node["image"], dockerfile=node["dockerfile"], build_args=node["build_args"], retry=retry, prefix=f"[{name}] ")
+
+    return ok, time.perf_counter() - started
+
+def build_graph(graph: Dict[str, Dict], jobs: int, retry: int) -> bool:
+    """
+    Builds every node once its dependencies succeeded, at most `jobs` at a time. Dependents of a
+    failed node are skipped. Logs each node's time and the wall time against the serial sum.
+    """
+    validate_build_graph(graph)
+
+    started = time.perf_counter()
+    status: Dict[str, str] = {}
+    durations: Dict[str, float] = {}
+    pending: Dict[str, Dict] = dict(graph)
+    running: Dict = {}
+
+    with ThreadPoolExecutor(max_workers=jobs) as pool:
+        while pending or running:
+            for name, node in list(pending.items()):
+                if any(status.get(d) in ("failed", "skipped") for d in node["depends"]):
+                    log.warning(f"Skipping {name}: a dependency did not build")
+                    status[name] = "skipped"
+                    del pending[name]
+                elif all(status.get(d) == "ok" for d in node["depends"]):
+                    log.info(f"Starting {name} ({node['image']} from {node['dockerfile']})")
+                    running[pool.submit(build_node, name, node, retry)] = name
+                    del pending[name]
+
+            if not running:
+                continue
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                ok, durations[name] = future.result()
+                status[name] = "ok" if ok else "failed"
+                log.info(f"Finished {name}: {status[name]} in {durations[name]:.1f}s")
 
-    build_command: str = f"docker build {build_args_cmd} -t {image} -f {dockerfile} .".strip()
+    wall = time.perf_counter() - started
+    serial = sum(durations.values())
 
-    log.info(f"Running build command: {build_command}")
+    log.info("Build graph summary:")
+    for name in graph:
+        log.info(f"  {name:<16} {status[name]:<8} {durations.get(name, 0.0):8.1f}s")
+    log.info(f"  wall {wall:.1f}s vs serial {serial:.1f}s ({serial / wall if wall > 0 else 1.0:.2f}x, {jobs} jobs)")
 
-    for _ in range(retry):
+    return all(s == "ok" for s in status.values())
+
+# Directory names that are almost never meant to be sent to the daemon
+HEAVY_NAMES: Tuple[str, ...] = (".git", "node_modules", "build", "target", "dist", ".venv", "venv", "__pycache__",
+                                ".ccache", ".cache", "CMakeFiles")
+HEAVY_PREFIXES: Tuple[str, ...] = ("build-", "cmake-build-")
+
+class DockerIgnore:
+    """
+    .dockerignore matching as the docker CLI does it: patterns are relative to the context root,
+    `*`/`?` stay within one path segment, `**` spans any number of segments, `!pattern` re-includes,
+    the last matching pattern wins, and a pattern matching a directory covers everything below it.
+    """
+    def __init__(self, patterns: List[str]) -> None:
+        self.rules: List[Tuple[re.Pattern, bool]] = []
+        for pattern in patterns:
+            pattern = pattern.strip()
+            if not pattern or pattern.startswith('#'):
+                continue
+            exception = pattern.startswith('!')
+            pattern = os.path.normpath(pattern.lstrip('!').strip()).lstrip('/')
+            if pattern != '.':
+                self.rules.append((re.compile(self.translate(pattern)), exception))
+        self.has_exceptions = any(exception for _, exception in self.rules)
+        # One alternation answers the common "no pattern matches" case in a single regex call
+        self.any_rule = re.compile("|".join(f"(?:{regex.pattern})" for regex, _ in self.rules)) if self.rules else None
+
+    @staticmethod
+    def path(context: str, dockerfile: Optional[str] = None) -> Optional[str]:
+        # BuildKit prefers <Dockerfile>.dockerignore next to the Dockerfile over the context's .dockerignore
+        candidates = [f"{dockerfile}.dockerignore"] if dockerfile else []
+        return next((p for p in candidates + [os.path.join(context, ".dockerignore")] if os.path.isfile(p)), None)
+
+    @classmethod
+    def load(cls, context: str, dockerfile: Optional[str] = None) -> "DockerIgnore":
+        path = cls.path(context, dockerfile)
+        if not path:
+            return cls([])
+        with open(path) as f:
+            return cls(f.read().splitlines())
+
+    @staticmethod
+    def translate(pattern: str) -> str:
+        regex, i = "", 0
+        while i < len(pattern):
+            c = pattern[i]
+            if pattern.startswith("**/", i):
+                regex, i = regex + "(.*/)?", i + 3
+                continue
+            if pattern.startswith("**", i):
+                regex, i = regex + ".*", i + 2
+                continue
+            if c == '*':
+                regex += "[^/]*"
+            elif c == '?':
+                regex += "[^/]"
+            elif c == '[':
+                end = pattern.find(']', i + 1)
+                if end == -1:
+                    regex += re.escape(c)
+                else:
+                    regex, i = regex + "[" + pattern[i + 1:end].replace('\\', '\\\\') + "]", end
+            else:
+                regex += re.escape(c)
+            i += 1
+        return f"^{regex}(/.*)?$"
+
+    def excluded(self, path: str) -> bool:
+        if not self.any_rule or not self.any_rule.match(path):
+            return False
+        for regex, exception in reversed(self.rules):
+            if regex.match(path):
+                return not exception
+        return False
+
+def heavy_name(name: str) -> bool:
+    return name in HEAVY_NAMES or name.startswith(HEAVY_PREFIXES)
+
+def hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def context_cache_path(context: str, dockerfile: Optional[str] = None) -> str:
+    # One cache per ignore file: contexts filtered differently must not count each other's files as removed
+    key = os.path.abspath(DockerIgnore.path(context, dockerfile) or context)
+    return os.path.join(os.path.expanduser(CONTEXT_CACHE_DIR), re.sub(r'[^\w.-]', '_', key) + ".json")
+
+def analyze_context(context: str, dockerfile: Optional[str] = None, depth: int = 2, heavy_mb: float = 100.0,
+                    cache_file: Optional[str] = None, content_digest: bool = False) -> Dict:
+    """
+    Walks the build context once, applying the .dockerignore that `dockerfile` builds with the way
+    the docker CLI does, and reports what `docker build` would upload: totals, size/file counts per
+    directory (up to `depth` levels) and heavy paths (the outermost artifact directories by name,
+    or single files over `heavy_mb`).
+
+    The context digest covers each file's path, mtime and size, or with `content_digest` its SHA-256
+    (hashes cached by path, mtime and size, so only the first analysis reads every file). The
+    digest tells whether COPY/ADD layers can be reused.
+    """
+    ignore = DockerIgnore.load(context, dockerfile)
+    cache_file = cache_file or context_cache_path(context, dockerfile)
+    try:
+        with open(cache_file) as f:
+            cached: Dict[str, List] = json.load(f).get("files", {})
+    except (OSError, ValueError):
+        cached = {}
+
+    directories: Dict[str, List[int]] = {}
+    files: Dict[str, List] = {}
+    heavy: Dict[str, int] = {}
+    hashed = hashed_bytes = excluded = 0
+    # (directory, outermost heavy directory it is in)
+    stack: List[Tuple[str, Optional[str]]] = [("", None)]
+
+    while stack:
+        relative_dir, heavy_root = stack.pop()
         try:
-            result = sp.run(build_command, shell=True, check=True, capture_output=True, text=True)
-            log.info(f"Build output:\n{result.stderr}")
+            entries = list(os.scandir(os.path.join(context, relative_dir)))
+        except OSError as e:
+            log.warning(f"Context: cannot read {relative_dir or '.'}: {e}")
+            continue
 
-            break
-        except sp.CalledProcessError as e:
-            log.error(f"Build failed with error:\n{e.stderr}")
+        for entry in entries:
+            relative = f"{relative_dir}/{entry.name}" if relative_dir else entry.name
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if ignore.excluded(relative):
+                excluded += 1
+                # Without "!" exceptions nothing below an excluded directory can come back
+                if not (is_dir and ignore.has_exceptions):
+                    continue
+            elif is_dir and not heavy_root and heavy_name(entry.name):
+                heavy[relative] = 0
+                stack.append((relative, relative))
+                continue
+
+            if is_dir:
+                stack.append((relative, heavy_root))
+                continue
+
+            st = entry.stat(follow_symlinks=False)
+            entry_cache = cached.get(relative)
+            if entry_cache and entry_cache[0] == st.st_mtime_ns and entry_cache[1] == st.st_size \
+                    and (entry_cache[2] is not None or not content_digest):
+                digest = entry_cache[2]
+            elif not content_digest and not entry.is_symlink():
+                digest = None
+            elif entry.is_file(follow_symlinks=False):
+                try:
+                    digest = hash_file(entry.path)
+                except OSError:
+                    continue
+                hashed += 1
+                hashed_bytes += st.st_size
+            else:
+                digest = os.readlink(entry.path) if entry.is_symlink() else ""
+            files[relative] = [st.st_mtime_ns, st.st_size, digest]
+
+            parts = relative.split('/')
+            for level in range(0, min(depth, len(parts) - 1) + 1):
+                totals = directories.setdefault('/'.join(parts[:level]) or '.', [0, 0])
+                totals[0] += st.st_size
+                totals[1] += 1
+            if heavy_root:
+                heavy[heavy_root] += st.st_size
+            elif st.st_size >= heavy_mb * 1024 * 1024:
+                heavy[relative] = st.st_size
+
+    # What identifies a file's content: its hash, or without content_digest its mtime and size
+    identity = (lambda entry: entry[2]) if content_digest else (lambda entry: entry[:2])
+    digest = hashlib.sha256()
+    for relative in sorted(files):
+        digest.update(f"{relative}\0{identity(files[relative])}\n".encode())
+    changed = sum(1 for relative, entry in files.items() if relative not in cached or identity(cached[relative]) != identity(entry))
+    removed = sum(1 for relative in cached if relative not in files)
+
+    if hashed or removed or len(files) != len(cached) or any(cached[r][0] != e[0] for r, e in files.items()):
+        os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+        with open(cache_file, 'w') as f:
+            json.dump({"context": os.path.abspath(context), "files": files}, f, separators=(',', ':'))
+
+    return {
+        "files": len(files),
+        "bytes": sum(entry[1] for entry in files.values()),
+        "excluded": excluded,
+        "directories": directories,
+        "heavy": heavy,
+        "digest": digest.hexdigest(),
+        "content_digest": content_digest,
+        "hashed": hashed,
+        "hashed_bytes": hashed_bytes,
+        "changed": changed + removed,
+    }
+
+def format_size(size: float) -> str:
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return ""
+
+def log_context_report(report: Dict, top: int = 10, dockerfiles: Optional[List[str]] = None) -> None:
+    log.info(f"Build context{' of ' + ', '.join(dockerfiles) if dockerfiles else ''}: {report['files']} files, "
+             f"{format_size(report['bytes'])} ({report['excluded']} paths excluded by .dockerignore), "
+             f"{'content' if report['content_digest'] else 'mtime/size'} digest {report['digest'][:12]}, "
+             f"{report['changed']} changed since last analysis")
+    if report["content_digest"]:
+        log.info(f"  hashed {report['hashed']} files ({format_size(report['hashed_bytes'])}), "
+                 f"{report['files'] - report['hashed']} reused from the hash cache")
+
+    ranked = sorted(((path, totals) for path, totals in report["directories"].items() if path != '.'),
+                    key=lambda item: item[1][0], reverse=True)
+    for path, (size, count) in ranked[:top]:
+        log.info(f"  {format_size(size):>10} {count:>8} files  {path}/")
+
+    for path, size in sorted(report["heavy"].items(), key=lambda item: item[1], reverse=True):
+        log.warning(f"Heavy path in build context: {path} ({format_size(size)}), consider adding it to .dockerignore")
+
+def write_context_excludes(dockerfiles: List[str], report: Dict) -> List[str]:
+    """
+    Writes <Dockerfile>.dockerignore files (preferred by BuildKit over .dockerignore) holding the
+    context's .dockerignore plus the heavy paths. Returns the files created, removed after the build.
+    """
+    if not report["heavy"]:
+        return []
+
+    base = ""
+    if os.path.isfile(".dockerignore"):
+        with open(".dockerignore") as f:
+            base = f.read()
+
+    created: List[str] = []
+    for dockerfile in dockerfiles:
+        path = f"{dockerfile}.dockerignore"
+        if os.path.exists(path):
+            log.warning(f"Not auto-excluding heavy paths for {dockerfile}: {path} already exists")
+            continue
+        with open(path, 'w') as f:
+            f.write(base.rstrip("\n") + "\n\n# Heavy paths auto-excluded by build_run.py --context-auto-exclude\n")
+            f.write("".join(f"/{p}\n" for p in sorted(report["heavy"])))
+        log.info(f"Auto-excluding {len(report['heavy'])} heavy path(s) from the {dockerfile} build context via {path}")
+        created.append(path)
+
+    return created
+
+def bench_context(files: int = 50000) -> None:
+    """
+    Builds a synthetic project tree (sources, a build directory, node_modules and a large
+    artifact), then times the default mtime/size analysis, a cold content-digest analysis (every
+    file hashed) and a warm one (hash cache hit).
+    """
+    root = tempfile.mkdtemp(prefix="context-bench-")
+    cache_file = os.path.join(root, "hashes.json")
+    context = os.path.join(root, "context")
+
+    try:
+        per_dir = 100
+        for i in range(files):
+            folder = ("workspace/app%d/src/m%d" if i % 5 else "workspace/app%d/build/obj%d") % (i // 10000, (i // per_dir) % 100)
+            os.makedirs(os.path.join(context, folder), exist_ok=True)
+            with open(os.path.join(context, folder, f"f{i}.cpp"), 'wb') as f:
+                f.write(os.urandom(512 + (i % 8) * 512))
+        os.makedirs(os.path.join(context, "tools/node_modules/pkg"), exist_ok=True)
+        with open(os.path.join(context, "tools/node_modules/pkg/index.js"), 'wb') as f:
+            f.write(os.urandom(4096))
+        with open(os.path.join(context, "dataset.bin"), 'wb') as f:
+            f.truncate(200 * 1024 * 1024)
+        with open(os.path.join(context, ".dockerignore"), 'w') as f:
+            f.write("workspace/*/build/\n*.log\n")
+
+        log.info(f"Context benchmark: {files} synthetic files under {context}")
+        for label, content_digest in (("mtime/size", False), ("cold", True), ("warm", True)):
+            started = time.perf_counter()
+            report = analyze_context(context, cache_file=cache_file, content_digest=content_digest)
+            elapsed = time.perf_counter() - started
+            log.info(f"  {label}: {elapsed:.3f}s for {report['files']} files, {format_size(report['bytes'])} "
+                     f"({report['files'] / elapsed:.0f} files/s, {report['hashed']} hashed)")
+        log_context_report(report, top=5)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+# Label on dev containers holding the hash of the options they were created with
+CONFIG_LABEL: str = "vulkan-dev.config-hash"
+
+def docker_json(*command: str) -> Optional[Dict]:
+    """
+    First object of `docker <command>` JSON output (inspect), None if the object does not exist.
+    """
+    result = sp.run([DOCKER, *command], capture_output=True, text=True)
+    if result.returncode != 0:
+        return None
 
-def run(project_path: str, image: str, container_name: str) -> None:
+    data = json.loads(result.stdout or "[]")
+    return data[0] if data else None
+
+def run_volumes(container_name: str) -> Dict[str, str]:
+    """
+    Named volumes for caches that live outside /workspace, so they survive container recreation:
+    ccache (CCACHE_DIR in the image), the cargo registry (rustup installs under $HOME) and the
+    Mesa/NVIDIA shader caches (pointed at one directory through env vars in run_command).
+    """
+    return {
+        f"{container_name}-ccache": "/ccache",
+        f"{container_name}-cargo-registry": "/home/developer/.cargo/registry",
+        f"{container_name}-shader-cache": "/home/developer/.cache/shader",
+    }
+
+def run_command(project_path: str, image: str, container_name: str, config_hash: str = "") -> List[str]:
+    env_vars = {
+        "DISPLAY": os.getenv("DISPLAY", ":0"),
+        "XDG_RUNTIME_DIR": os.getenv("XDG_RUNTIME_DIR", ""),
+        "WAYLAND_DISPLAY": os.getenv("WAYLAND_DISPLAY", "wayland-0")
+    }
+
+    command: List[str] = [
+        DOCKER, "run", "--gpus", "all", "--privileged", "-d",
+        "--name", container_name,
+        "--ipc=host",
+        "-e", "NVIDIA_VISIBLE_DEVICES=all",
+        "-e", "NVIDIA_DRIVER_CAPABILITIES=all",
+        "-e", f"DISPLAY={env_vars['DISPLAY']}",
+        "-e", f"XDG_RUNTIME_DIR={env_vars['XDG_RUNTIME_DIR']}",
+        "-e", f"WAYLAND_DISPLAY={env_vars['WAYLAND_DISPLAY']}",
+        "-e", "MESA_SHADER_CACHE_DIR=/home/developer/.cache/shader/mesa",
+        "-e", "__GL_SHADER_DISK_CACHE_PATH=/home/developer/.cache/shader/nvidia",
+        "-e", "__GL_SHADER_DISK_CACHE_SKIP_CLEANUP=1",
+        "-v", "/tmp/.X11-unix:/tmp/.X11-unix",
+        "-v", f"{env_vars['XDG_RUNTIME_DIR']}/{env_vars['WAYLAND_DISPLAY']}:{env_vars['XDG_RUNTIME_DIR']}/{env_vars['WAYLAND_DISPLAY']}",
+        "--device", "/dev/dri:/dev/dri",
+        "--device", "/dev/snd:/dev/snd",
+        "-v", f"{project_path}:/workspace",
+        "-v", f"{project_path}/qtcreator_config:/home/developer/.config/QtProject",
+    ]
+    for volume, target in run_volumes(container_name).items():
+        command += ["-v", f"{volume}:{target}"]
+    if config_hash:
+        command += ["--label", f"{CONFIG_LABEL}={config_hash}"]
+
+    return command + ["-w", "/workspace", image]
+
+def run_config_hash(project_path: str, image: str, container_name: str) -> str:
+    """
+    Hash of everything the container is created with (image name, mounts, env, devices), so a
+    changed option or environment (e.g. another DISPLAY) is detected as drift.
+    """
+    command = run_command(project_path, image, container_name)
+    return hashlib.sha256(json.dumps(command[1:]).encode()).hexdigest()[:16]
+
+def wait_ready(container_name: str, timeout: float = 30.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = docker_json("container", "inspect", container_name)
+        if state and state["State"].get("Running"):
+            if sp.run([DOCKER, "exec", container_name, "true"], capture_output=True).returncode == 0:
+                return True
+        elif state and state["State"].get("Status") == "exited":
+            return False
+        time.sleep(0.1)
+
+    return False
+
+def run(project_path: str, image: str, container_name: str, recreate: bool = False) -> None:
     """
     Runs the container of arthurrl/vulkan-dev:lts image, this will run correctly. 
     Only nvidia graphics cards are supported, if you use AMD graphics card, 
     you wil need to change things, in docker run, and Dockerfile too probably, building new images
 
+    An existing container is reused when it was created from the same image (digest) with the
+    same options (config hash label): a stopped one is just started, keeping its state, Qt Creator
+    indexes and caches warm. It is only recreated on drift, or with --recreate.
+
     Notes:
         The qtcreator volume works because of the dockerfile file config of the container HOME variable
 
@@ -51,41 +824,61 @@ def run(project_path: str, image: str, container_name: str) -> None:
         ENV HOME=/home/developer
         WORKDIR /home/developer    
     """ 
-    env_vars = {
-        "DISPLAY": os.getenv("DISPLAY", ":0"),
-        "XDG_RUNTIME_DIR": os.getenv("XDG_RUNTIME_DIR", ""),
-        "WAYLAND_DISPLAY": os.getenv("WAYLAND_DISPLAY", "wayland-0")
-    }
-    
-    run_command = f"""
-        docker rm -f {container_name} || true && \
-        docker run --gpus all --privileged -d \
-            --name {container_name} \
-            --ipc=host \
-            -e NVIDIA_VISIBLE_DEVICES=all \
-            -e NVIDIA_DRIVER_CAPABILITIES=all \
-            -e DISPLAY={env_vars['DISPLAY']} \
-            -e XDG_RUNTIME_DIR={env_vars['XDG_RUNTIME_DIR']} \
-            -e WAYLAND_DISPLAY={env_vars['WAYLAND_DISPLAY']} \
-            -v /tmp/.X11-unix:/tmp/.X11-unix \
-            -v {env_vars['XDG_RUNTIME_DIR']}/{env_vars['WAYLAND_DISPLAY']}:{env_vars['XDG_RUNTIME_DIR']}/{env_vars['WAYLAND_DISPLAY']} \
-            --device /dev/dri:/dev/dri \
-            --device /dev/snd:/dev/snd \
-            -v {project_path}:/workspace \
-            -v {project_path}/qtcreator_config:/home/developer/.config/QtProject \
-            -w /workspace \
-            {image}
-    """.strip()
+    started = time.perf_counter()
+    config_hash = run_config_hash(project_path, image, container_name)
 
-    log.info(f"Run command:\n{run_command}")
+    image_state = docker_json("image", "inspect", image)
+    if image_state is None:
+        log.info(f"Image {image} not found locally, pulling it")
+        returncode, _ = stream_command([DOCKER, "pull", image])
+        image_state = docker_json("image", "inspect", image) if returncode == 0 else None
+        if image_state is None:
+            log.error(f"Image {image} not found locally and could not be pulled (exit code {returncode}), build it first")
+            exit(1)
 
-    try:
-        result = sp.run(run_command, shell=True, check=True, capture_output=True, text=True)
-        log.info(f"Run output:\n{result.stdout}")
-    except sp.CalledProcessError as e:
-        log.error(f"Run failed with error:\n{e.stderr}")
+    container = docker_json("container", "inspect", container_name)
+    action = "created"
+
+    if container is not None:
+        drift: List[str] = []
+        if container["Image"] != image_state["Id"]:
+            drift.append(f"image {container['Image'][:19]} -> {image_state['Id'][:19]}")
+        labels = container["Config"].get("Labels") or {}
+        if labels.get(CONFIG_LABEL) != config_hash:
+            drift.append(f"config {labels.get(CONFIG_LABEL)} -> {config_hash}")
+
+        if recreate or drift:
+            log.info(f"Recreating {container_name}: {', '.join(drift) if drift else '--recreate'}")
+            sp.run([DOCKER, "rm", "-f", container_name], capture_output=True, text=True)
+            action = "recreated"
+        elif container["State"].get("Running"):
+            action = "already running"
+        else:
+            action = "started"
+
+    if action == "started":
+        command = [DOCKER, "start", container_name]
+    elif action in ("created", "recreated"):
+        command = run_command(project_path, image, container_name, config_hash)
+    else:
+        command = []
+
+    if command:
+        log.info(f"Run command:\n{shlex.join(command)}")
+
+        try:
+            result = sp.run(command, check=True, capture_output=True, text=True)
+            log.info(f"Run output:\n{result.stdout}")
+        except sp.CalledProcessError as e:
+            log.error(f"Run failed with error:\n{e.stderr}")
+            exit(1)
+
+    if not wait_ready(container_name):
+        log.error(f"Container {container_name} did not become ready, see: {DOCKER} logs {container_name}")
         exit(1)
 
+    log.info(f"Container {container_name} ready in {time.perf_counter() - started:.2f}s ({action})")
+
 def push(image: str) -> None:
     run_command: str = f"""
         docker push {image}
@@ -101,38 +894,97 @@ def push(image: str) -> None:
         exit(1)
 
 
-parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Build Vulkan dev image")
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description="Build Vulkan dev image")
 
-parser.add_argument('--run', dest='run', action='store_true', help='Run container instead of building', required=False)
-parser.add_argument('--build', dest='build', action='store_true', help='Build docker image', required=False)
-parser.add_argument('-r', '--retry', dest='retry', type=int, help='Build docker image', required=False, default=1)
-parser.add_argument('--base', dest='base', action='store_true', help='Build docker image Base/Derived', required=False)
-parser.add_argument('--push', dest='push', action='store_true', help='Push image to dockerhub after building', required=False)
-parser.add_argument('-p', '--project_path', dest='project_path', type=str, help='Path to the project', default=f"{os.getenv('HOME')}/dev")
-parser.add_argument('-ir', '--image_repo', dest='image_repo', type=str, help='Tag of the dev image', default='arthurrl')
-parser.add_argument('-in', '--image_name', dest='image_name', type=str, help='Name of the dev image', default='vulkan-dev')
-parser.add_argument('-it', '--image_tag', dest='image_tag', type=str, help='Tag of the dev image', default='latest')
-parser.add_argument('-c', '--container_name', dest='container_name', type=str, help='Name of the dev container', default='vulkan-dev')
-parser.add_argument('-ba', '--build_args', dest='build_args', type=str, help="Docker Build args container passed in StringList formatter sep=' '", default=None)
+    parser.add_argument('--run', dest='run', action='store_true', help='Run container instead of building', required=False)
+    parser.add_argument('--recreate', dest='recreate', action='store_true', help='Recreate the container even if it matches the image and config', required=False)
+    parser.add_argument('--build', dest='build', action='store_true', help='Build docker image', required=False)
+    parser.add_argument('-r', '--retry', dest='retry', type=int, help='Build attempts, only transient (network) failures are retried', required=False, default=1)
+    parser.add_argument('--retry-backoff', dest='retry_backoff', type=float, help='Seconds before the first retry, doubled on each attempt', default=5.0)
+    parser.add_argument('--build-log', dest='build_log', type=str, help='JSON lines log of every build attempt (steps, timings, failure reason)', default=f"{os.getenv('HOME')}/.cache/vulkan-dev/build-log.jsonl")
+    parser.add_argument('--base', dest='base', action='store_true', help='Build docker image Base/Derived', required=False)
+    parser.add_argument('--push', dest='push', action='store_true', help='Push image to dockerhub after building', required=False)
+    parser.add_argument('-p', '--project_path', dest='project_path', type=str, help='Path to the project', default=f"{os.getenv('HOME')}/dev")
+    parser.add_argument('-ir', '--image_repo', dest='image_repo', type=str, help='Tag of the dev image', default='arthurrl')
+    parser.add_argument('-in', '--image_name', dest='image_name', type=str, help='Name of the dev image', default='vulkan-dev')
+    parser.add_argument('-it', '--image_tag', dest='image_tag', type=str, help='Tag of the dev image', default='latest')
+    parser.add_argument('-c', '--container_name', dest='container_name', type=str, help='Name of the dev container', default='vulkan-dev')
+    parser.add_argument('--graph', dest='graph', action='store_true', help='Build base and derived images as a dependency graph', required=False)
+    parser.add_argument('--graph-file', dest='graph_file', type=str, help='JSON build graph (implies --graph)', default=None)
+    parser.add_argument('-j', '--jobs', dest='jobs', type=int, help='Max parallel builds in graph mode', default=2)
+    parser.add_argument('--cache-dir', dest='cache_dir', type=str, help='Local BuildKit cache directory (buildx type=local)', default=f"{os.getenv('HOME')}/.cache/vulkan-dev/buildkit")
+    parser.add_argument('--no-cache-dir', dest='no_cache_dir', action='store_true', help='Do not import/export the local build cache', required=False)
+    parser.add_argument('--builder', dest='builder', type=str, help='buildx builder to use (local cache export needs docker-container or the containerd image store)', default=None)
+    parser.add_argument('--no-context-check', dest='no_context_check', action='store_true', help='Skip the build context analysis before building', required=False)
+    parser.add_argument('--context-auto-exclude', dest='context_auto_exclude', action='store_true', help='Leave heavy paths out of the build context (via <Dockerfile>.dockerignore)', required=False)
+    parser.add_argument('--context-heavy-mb', dest='context_heavy_mb', type=float, help='Files at least this large are reported as heavy', default=100.0)
+    parser.add_argument('--context-digest', dest='context_digest', action='store_true', help='Digest the build context by file content (SHA-256, cached by mtime/size) instead of mtime/size', required=False)
+    parser.add_argument('--context-cache-dir', dest='context_cache_dir', type=str, help='Where build context content hashes are cached', default=f"{os.getenv('HOME')}/.cache/vulkan-dev/context")
+    parser.add_argument('--bench-context', dest='bench_context', type=int, nargs='?', const=50000, default=None, metavar='FILES', help='Benchmark the context analyzer on a synthetic tree and exit')
+    parser.add_argument('--docker', dest='docker', type=str, help='docker CLI to invoke (e.g. ./fake_docker.py)', default='docker')
+    parser.add_argument('-ba', '--build_args', dest='build_args', type=str, help="Docker Build args container passed in StringList formatter sep=' '", default=None)
 
-args: argparse.Namespace = parser.parse_args()
+    args: argparse.Namespace = parser.parse_args()
 
-if not os.path.isdir(args.project_path):
-    os.makedirs(args.project_path, exist_ok=True)
+    global DOCKER, CACHE_DIR, BUILDER, RETRY_BACKOFF, BUILD_LOG, CONTEXT_CACHE_DIR
 
-if not (len(args.image_name) > 0):
-    log.error(f"image_name parameter required!")
-    parser.print_help()
-    exit(1)
+    DOCKER = args.docker
+    CACHE_DIR = None if args.no_cache_dir else args.cache_dir
+    BUILDER = args.builder
+    RETRY_BACKOFF = args.retry_backoff
+    BUILD_LOG = args.build_log or None
+    CONTEXT_CACHE_DIR = args.context_cache_dir
 
-image: str = f"{args.image_repo}/{args.image_name}:{args.image_tag}"
-image = image.removeprefix('/')
+    if args.bench_context:
+        bench_context(args.bench_context)
+        exit(0)
+
+    if not os.path.isdir(args.project_path):
+        os.makedirs(args.project_path, exist_ok=True)
+
+    if not (len(args.image_name) > 0):
+        log.error(f"image_name parameter required!")
+        parser.print_help()
+        exit(1)
+
+    image: str = f"{args.image_repo}/{args.image_name}:{args.image_tag}"
+    image = image.removeprefix('/')
+
+    graph: Optional[Dict[str, Dict]] = None
+    if args.build and (args.graph or args.graph_file):
+        graph = load_build_graph(args.graph_file) if args.graph_file else default_build_graph(image.rsplit(':', 1)[0], args.image_tag, args.build_args)
+
+    context_excludes: List[str] = []
+    if args.build and not args.no_context_check:
+        dockerfiles = sorted({node["dockerfile"] for node in graph.values()}) if graph else ['Dockerfile.base' if args.base else 'Dockerfile']
+        # Dockerfiles sharing an ignore file upload the same context, analyse it once per ignore file
+        by_ignore: Dict[Optional[str], List[str]] = {}
+        for dockerfile in dockerfiles:
+            by_ignore.setdefault(DockerIgnore.path('.', dockerfile), []).append(dockerfile)
+        for group in by_ignore.values():
+            context_report = analyze_context('.', dockerfile=group[0], heavy_mb=args.context_heavy_mb,
+                                             content_digest=args.context_digest)
+            log_context_report(context_report, dockerfiles=group if len(by_ignore) > 1 else None)
+            if args.context_auto_exclude:
+                context_excludes += write_context_excludes(group, context_report)
+
+    try:
+        if graph:
+            if not build_graph(graph, jobs=max(1, args.jobs), retry=args.retry):
+                exit(1)
+        elif args.build:
+            if not build(image=image, dockerfile='Dockerfile.base' if args.base else 'Dockerfile', build_args=args.build_args, retry=args.retry):
+                exit(1)
+    finally:
+        for path in context_excludes:
+            os.remove(path)
 
-if args.build:
-    build(image=image, dockerfile='Dockerfile.base' if args.base else 'Dockerfile', build_args=args.build_args, retry=args.retry)
+    if args.run:
+        run(project_path=args.project_path, image=image, container_name=args.container_name, recreate=args.recreate)
 
-if args.run:
-    run(project_path=args.project_path, image=image, container_name=args.container_name)
+    if args.push:
+        push(image=image)
 
-if args.push:
-    push(image=image)
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,352 @@
+#!/usr/bin/env python3
+"""
+Offline stand-in for the docker CLI, for exercising build_run.py without a daemon:
+
+    python3 build_run.py --build --graph --docker ./fake_docker.py
+
+`run`, `start`, `stop`, `rm`, `exec`, `ps` and `inspect` keep simulated containers in the state
+directory; image ids come from the last layer of the latest `build` of a tag. `image inspect` only
+knows built or pulled images; `pull` fetches any image from a simulated registry.
+
+`build` walks the Dockerfile and prints BuildKit-style plain progress, one step per instruction.
+Steps whose cache key (previous key + instruction + build args + COPY sources) was seen before
+print CACHED instead of running, like the BuildKit layer cache.
+
+Environment:
+    FAKE_DOCKER_STEP_SECONDS  simulated time per build step (default 0.02)
+    FAKE_DOCKER_STATE         directory holding the simulated layer cache (default /tmp/fake-docker)
+    FAKE_DOCKER_BUILDX        when set, `buildx version` succeeds and `buildx build` is available; the
+                              value is the driver `buildx inspect` reports (`docker` rejects --cache-to,
+                              any other value means docker-container)
+    FAKE_DOCKER_CONTAINERD    when set, `info` reports the containerd image store
+    FAKE_DOCKER_OFFLINE       when set, `pull` fails with a network error
+    FAKE_DOCKER_FAIL          SUBSTRING=KIND[*COUNT]: the first step containing SUBSTRING fails with a
+                              network or compile error, COUNT times (default always)
+"""
+import os
+import json
+import hashlib
+import re
+import sys
+import time
+
+from typing import Dict, List
+
+
+STEP_SECONDS: float = float(os.getenv("FAKE_DOCKER_STEP_SECONDS", "0.02"))
+STATE_DIR: str = os.getenv("FAKE_DOCKER_STATE", "/tmp/fake-docker")
+
+FAILURE_OUTPUT = {
+    "network": ["Connecting to sdk.lunarg.com... failed: Temporary failure in name resolution.",
+                "wget: unable to resolve host address 'sdk.lunarg.com'"],
+    "compile": ["/tmp/src/main.cpp:12:5: error: 'vkCreateThing' was not declared in this scope",
+                "make[2]: *** [CMakeFiles/app.dir/build.make:76: main.o] Error 1"],
+}
+
+
+def option(argv: List[str], *names: str, default: str = "") -> str:
+    for i, arg in enumerate(argv):
+        for name in names:
+            if arg == name and i + 1 < len(argv):
+                return argv[i + 1]
+            if arg.startswith(f"{name}="):
+                return arg.split('=', 1)[1]
+    return default
+
+def options(argv: List[str], name: str) -> List[str]:
+    return [argv[i + 1] for i, arg in enumerate(argv[:-1]) if arg == name]
+
+def step_key(previous: str, step: str, build_args: List[str]) -> str:
+    digest = hashlib.sha256(f"{previous}\n{step}\n{sorted(build_args)}".encode())
+    words = step.split()
+    if words[0].upper() in ("COPY", "ADD"):
+        for source in words[1:-1]:
+            if os.path.isfile(source):
+                with open(source, 'rb') as f:
+                    digest.update(f.read())
+    return digest.hexdigest()
+
+def load_layers() -> set:
+    try:
+        with open(os.path.join(STATE_DIR, "layers")) as f:
+            return set(f.read().split())
+    except OSError:
+        return set()
+
+def save_layers(layers: set) -> None:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(os.path.join(STATE_DIR, "layers"), 'w') as f:
+        f.write("\n".join(sorted(layers)))
+
+def dockerfile_steps(path: str) -> List[str]:
+    """Instructions of a Dockerfile with continuation lines joined and comments dropped"""
+    with open(path) as f:
+        text = re.sub(r'\\\n', ' ', f.read())
+    steps = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith('#'):
+            steps.append(re.sub(r'\s+', ' ', line))
+    return steps
+
+def load_state(name: str) -> Dict:
+    try:
+        with open(os.path.join(STATE_DIR, f"{name}.json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def save_state(name: str, state: Dict) -> None:
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(os.path.join(STATE_DIR, f"{name}.json"), 'w') as f:
+        json.dump(state, f, indent=1)
+
+def image_tag(image: str) -> str:
+    return image if ':' in image.rsplit('/', 1)[-1] else f"{image}:latest"
+
+def image_id(image: str) -> str:
+    """Id of the last build or pull of this tag, or a stable id derived from the name for unknown images"""
+    image = image_tag(image)
+    return load_state("images").get(image) or "sha256:" + hashlib.sha256(image.encode()).hexdigest()
+
+def injected_failure(step: str) -> str:
+    """Failure kind to simulate for this step, if FAKE_DOCKER_FAIL targets it and has budget left"""
+    spec = os.getenv("FAKE_DOCKER_FAIL", "")
+    if "=" not in spec:
+        return ""
+    needle, kind = spec.split("=", 1)
+    kind, _, count = kind.partition("*")
+    if needle not in step:
+        return ""
+    counter = os.path.join(STATE_DIR, "failures")
+    try:
+        with open(counter) as f:
+            failed = int(f.read() or 0)
+    except OSError:
+        failed = 0
+    if count and failed >= int(count):
+        return ""
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(counter, 'w') as f:
+        f.write(str(failed + 1))
+    return kind
+
+def build(argv: List[str]) -> int:
+    dockerfile = option(argv, "-f", "--file", default="Dockerfile")
+    image = option(argv, "-t", "--tag")
+    build_args = options(argv, "--build-arg")
+    steps = [s for s in dockerfile_steps(dockerfile) if s.split()[0].upper() in ("FROM", "RUN", "COPY", "ADD", "WORKDIR")]
+    layers = set() if "--no-cache" in argv else load_layers()
+
+    print(f"#1 [internal] load build definition from {os.path.basename(dockerfile)}", flush=True)
+    print("#1 DONE 0.0s", flush=True)
+    key = ""
+    for n, step in enumerate(steps, 2):
+        key = step_key(key, step, build_args)
+        print(f"#{n} [{n - 1}/{len(steps)}] {step[:120]}", flush=True)
+        if key in layers:
+            print(f"#{n} CACHED", flush=True)
+            continue
+        time.sleep(STEP_SECONDS)
+        kind = injected_failure(step)
+        if kind:
+            for line in FAILURE_OUTPUT.get(kind, [f"simulated {kind} failure"]):
+                print(f"#{n} {STEP_SECONDS:.3f} {line}", flush=True)
+            error = f'process "/bin/sh -c {step[4:60]}..." did not complete successfully: exit code: 1'
+            print(f"#{n} ERROR: {error}", flush=True)
+            print(f"------\n > [{n - 1}/{len(steps)}] {step[:60]}:\n------", flush=True)
+            print(f"ERROR: failed to solve: {error}", file=sys.stderr, flush=True)
+            save_layers(layers)
+            return 1
+        print(f"#{n} DONE {STEP_SECONDS:.1f}s", flush=True)
+        layers.add(key)
+    n = len(steps) + 2
+    print(f"#{n} exporting to image", flush=True)
+    print(f"#{n} naming to docker.io/{image} done", flush=True)
+    print(f"#{n} DONE 0.0s", flush=True)
+    cache_to = option(argv, "--cache-to")
+    if cache_to:
+        dest = dict(kv.split('=', 1) for kv in cache_to.split(',') if '=' in kv).get("dest")
+        if dest:
+            os.makedirs(dest, exist_ok=True)
+            with open(os.path.join(dest, "index.json"), 'w') as f:
+                f.write('{"schemaVersion": 2, "manifests": []}\n')
+    save_layers(layers)
+    images = load_state("images")
+    images[image] = f"sha256:{key}"
+    save_state("images", images)
+    return 0
+
+def run(argv: List[str]) -> int:
+    with_value = ("--name", "--label", "-v", "--volume", "-e", "--env", "-w", "--workdir", "--device", "--gpus", "--mount")
+    options: Dict[str, List[str]] = {}
+    i = 0
+    while i < len(argv) and argv[i].startswith('-'):
+        if argv[i] in with_value:
+            options.setdefault(argv[i], []).append(argv[i + 1])
+            i += 2
+        else:
+            i += 1
+    image = argv[i]
+    name = options.get("--name", [f"fake_{int(time.time() * 1000)}"])[0]
+
+    containers = load_state("containers")
+    if name in containers:
+        print(f'docker: Error response from daemon: Conflict. The container name "/{name}" is already in use.', file=sys.stderr)
+        return 125
+    container_id = hashlib.sha256(f"{name}{time.time()}".encode()).hexdigest()
+    containers[name] = {
+        "Id": container_id,
+        "Name": f"/{name}",
+        "Image": image_id(image),
+        "Config": {"Image": image, "Labels": dict(l.split('=', 1) for l in options.get("--label", [])), "Env": options.get("-e", [])},
+        "Mounts": [{"Source": v.split(':')[0], "Destination": v.split(':')[1]} for v in options.get("-v", [])],
+        "State": {"Status": "running", "Running": True},
+    }
+    save_state("containers", containers)
+    time.sleep(STEP_SECONDS * 10)
+    print(container_id)
+    return 0
+
+def set_running(argv: List[str], running: bool) -> int:
+    containers = load_state("containers")
+    names = [a for a in argv if not a.startswith('-')]
+    for name in names:
+        if name not in containers:
+            print(f"Error response from daemon: No such container: {name}", file=sys.stderr)
+            return 1
+        containers[name]["State"] = {"Status": "running" if running else "exited", "Running": running}
+        print(name)
+    save_state("containers", containers)
+    return 0
+
+def start(argv: List[str]) -> int:
+    time.sleep(STEP_SECONDS * 2)
+    return set_running(argv, True)
+
+def stop(argv: List[str]) -> int:
+    return set_running(argv, False)
+
+def rm(argv: List[str]) -> int:
+    containers = load_state("containers")
+    for name in [a for a in argv if not a.startswith('-')]:
+        if name not in containers:
+            print(f"Error response from daemon: No such container: {name}", file=sys.stderr)
+            return 1
+        if containers[name]["State"]["Running"] and "-f" not in argv and "--force" not in argv:
+            print(f"Error response from daemon: cannot remove container \"/{name}\": container is running", file=sys.stderr)
+            return 1
+        del containers[name]
+        print(name)
+    save_state("containers", containers)
+    return 0
+
+def exec_(argv: List[str]) -> int:
+    name = next(a for a in argv if not a.startswith('-'))
+    container = load_state("containers").get(name)
+    if not container or not container["State"]["Running"]:
+        print(f"Error response from daemon: container {name} is not running", file=sys.stderr)
+        return 1
+    return 0
+
+def ps(argv: List[str]) -> int:
+    print("CONTAINER ID   IMAGE   STATUS   NAMES")
+    for name, container in load_state("containers").items():
+        if container["State"]["Running"] or "-a" in argv or "--all" in argv:
+            print(f"{container['Id'][:12]}   {container['Config']['Image']}   {container['State']['Status']}   {name}")
+    return 0
+
+def inspect(argv: List[str]) -> int:
+    kind = argv[0] if argv and argv[0] in ("image", "container") else ""
+    names = [a for a in argv[1 if kind else 0:] if not a.startswith('-')]
+    containers = load_state("containers")
+    found = []
+    for name in names:
+        if kind != "image" and name in containers:
+            found.append(containers[name])
+        elif kind == "image" and image_tag(name) in load_state("images"):
+            found.append({"Id": image_id(name), "RepoTags": [image_tag(name)]})
+        elif kind == "image":
+            print(f"Error response from daemon: No such image: {name}", file=sys.stderr)
+            print("[]")
+            return 1
+        else:
+            print(f"Error response from daemon: No such container: {name}", file=sys.stderr)
+            print("[]")
+            return 1
+    print(json.dumps(found, indent=4))
+    return 0
+
+def pull(argv: List[str]) -> int:
+    name = next(a for a in argv if not a.startswith('-'))
+    if os.getenv("FAKE_DOCKER_OFFLINE"):
+        print(f"Error response from daemon: Get \"https://registry-1.docker.io/v2/\": dial tcp: lookup registry-1.docker.io: "
+              f"Temporary failure in name resolution", file=sys.stderr)
+        return 1
+    tag = image_tag(name)
+    images = load_state("images")
+    images[tag] = image_id(tag)
+    save_state("images", images)
+    time.sleep(STEP_SECONDS * 5)
+    print(f"{tag.rsplit(':', 1)[1]}: Pulling from {tag.rsplit(':', 1)[0]}\nStatus: Downloaded newer image for {tag}")
+    return 0
+
+def image(argv: List[str]) -> int:
+    if argv[:1] != ["inspect"]:
+        print(f"fake docker: unsupported image command {' '.join(argv[:1])!r}", file=sys.stderr)
+        return 1
+    return inspect(["image"] + argv[1:])
+
+def container(argv: List[str]) -> int:
+    if argv[:1] != ["inspect"]:
+        print(f"fake docker: unsupported container command {' '.join(argv[:1])!r}", file=sys.stderr)
+        return 1
+    return inspect(["container"] + argv[1:])
+
+def buildx(argv: List[str]) -> int:
+    if not os.getenv("FAKE_DOCKER_BUILDX"):
+        print("docker: 'buildx' is not a docker command.", file=sys.stderr)
+        return 1
+    if argv[:1] == ["version"]:
+        print("github.com/docker/buildx v0.0.0-fake")
+        return 0
+    driver = "docker" if os.getenv("FAKE_DOCKER_BUILDX") == "docker" else "docker-container"
+    if argv[:1] == ["inspect"]:
+        print(f"Name:          {option(argv, '--builder', default='default')}\nDriver:        {driver}")
+        return 0
+    if argv[:1] == ["build"]:
+        if option(argv, "--cache-to") and driver == "docker" and not os.getenv("FAKE_DOCKER_CONTAINERD"):
+            print("ERROR: failed to build: Cache export is not supported for the docker driver.", file=sys.stderr)
+            return 1
+        return build(argv[1:])
+    print(f"fake docker: unsupported buildx command {' '.join(argv[:1])!r}", file=sys.stderr)
+    return 1
+
+def info(argv: List[str]) -> int:
+    if os.getenv("FAKE_DOCKER_CONTAINERD"):
+        print('[["driver-type","io.containerd.snapshotter.v1"]]')
+    else:
+        print('[["Backing Filesystem","extfs"],["Supports d_type","true"]]')
+    return 0
+
+COMMANDS = {
+    "build": build,
+    "buildx": buildx,
+    "run": run,
+    "start": start,
+    "stop": stop,
+    "rm": rm,
+    "exec": exec_,
+    "ps": ps,
+    "inspect": inspect,
+    "image": image,
+    "container": container,
+    "info": info,
+    "pull": pull,
+}
+
+if __name__ == "__main__":
+    if len(sys.argv) < 2 or sys.argv[1] not in COMMANDS:
+        print(f"fake docker: unsupported command {' '.join(sys.argv[1:2])!r}", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(COMMANDS[sys.argv[1]](sys.argv[2:]))
@@ -7,7 +7,38 @@ from datetime import datetime
 import signal
 import sys
 import re
-from collections import deque
+import ctypes
+import threading
+import heapq
+import random
+import contextlib
+import bisect
+import cProfile
+import pstats
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import json
+import gzip
+import mmap
+import shutil
+import unicodedata
+import tempfile
+import queue
+import shlex
+import urllib.request
+import urllib.parse
+import http.client
+import socket
+import glob
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from array import array
+from collections import deque, namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Force terminal colors if not set in the container
 if not os.environ.get('TERM'):
@@ -16,24 +47,55 @@ if not os.environ.get('TERM'):
 # Configuration
 CONFIG = {
     "container_name": "VULKAN-DEV",
+    # Dashboard refresh; with adaptive sampling this is the ceiling, refreshes follow the fastest collector
     "log_interval": 60,
+    # Publish interval when running headless (no TUI)
+    "export_interval": 5,
+    "export_listen": "127.0.0.1:9464",
+    # Poll interval of the --targets fleet view
+    "fleet_interval": 2,
     "history_size": 15,
+    # Ring buffer capacities per tier: raw samples, 1 minute averages, 10 minute min/avg/max
+    "history_tiers": {"raw": 3600, "1m": 2880, "10m": 1008},
+    "history_path": "~/.cache/vulkan-dev-monitor/history",
+    # Seconds covered by each sparkline; 0 shows the last `history_size` raw samples
+    "sparkline_window": 0,
+    # Trend estimator used for predictions: linear (sliding least squares), ewma or holt
+    "trend_mode": "linear",
+    "trend_window": 900,
+    "top_processes": 7,
+    # Rank the process table by "load" (CPU + RAM) or "vram"
+    "process_sort": "load",
+    # Max per-disk / per-NIC rows shown on the dashboard
+    "breakdown_rows": 4,
+    "gpu_backend": "auto",
+    "gpu_replay": None,
+    "gpu_process_replay": None,
+    "static_cache_ttl": 3600,
+    "static_cache_path": "~/.cache/vulkan-dev-monitor/static.json",
+    # Seconds between samples of each collector, independent of the dashboard refresh
+    "collector_intervals": {
+        "system": 5, "cpu": 1, "memory": 1, "gpu": 2, "disk": 2, "network": 2, "top_processes": 3, "pressure": 2,
+        "gpu_processes": 5,
+    },
+    # Where cpu/memory/io come from: auto (cgroup v2 when available), cgroup or psutil (host-wide)
+    "collector_backend": "auto",
+    "cgroup_root": "/sys/fs/cgroup",
+    # Adaptive sampling: intervals range over [min, max] x base, and everything backs off
+    # while the monitor itself uses more than cpu_budget_percent of one core
+    "adaptive_sampling": True,
+    "sampling_factors": (0.25, 8.0),
+    "cpu_budget_percent": 2.0,
+    # Show the self profile on the dashboard; SIGUSR1 dumps cProfile/tracemalloc output here
+    "profile": False,
+    "profile_dir": tempfile.gettempdir(),
     "alert_thresholds": {
         "cpu": 85, "memory": 85, "gpu_memory": 85, "gpu_temp": 80, "disk": 90,
     }
 }
 
-# Advanced historical tracking & state
-history = {
-    "cpu": deque([0]*CONFIG["history_size"], maxlen=CONFIG["history_size"]),
-    "memory": deque([0]*CONFIG["history_size"], maxlen=CONFIG["history_size"]),
-    "gpu_util": deque([0]*CONFIG["history_size"], maxlen=CONFIG["history_size"]),
-    "gpu_memory": deque([0]*CONFIG["history_size"], maxlen=CONFIG["history_size"]),
-}
-
-# Store previous network/disk states to calculate speed/deltas
-last_net = {"recv": 0, "sent": 0, "time": time.time()}
-last_disk = {"read": 0, "write": 0, "time": time.time()}
+# Advanced historical tracking & state: metric history lives in `history` (a MetricStore),
+# previous cpu/disk/network counter snapshots in the CounterDelta instances next to the collectors
 
 class UI:
     """Terminal aesthetics and ANSI codes"""
@@ -73,27 +135,16 @@ def generate_sparkline(data, max_val=100):
         sparkline += f"{color}{bars[bar_idx]}{UI.ENDC}"
     return sparkline
 
-def predictive_analysis(data_list, metric_name, threshold):
-    if len(data_list) < 5 or all(x == 0 for x in data_list):
+def predictive_analysis(trend, metric_name, threshold):
+    if trend.size() < 5 or trend.all_zero:
         return ""
     
-    x = list(range(len(data_list)))
-    y = list(data_list)
-    n = len(x)
-    
-    sum_x = sum(x)
-    sum_y = sum(y)
-    sum_xy = sum(i*j for i,j in zip(x, y))
-    sum_xx = sum(i**2 for i in x)
-    
-    denominator = (n * sum_xx - sum_x**2)
-    if denominator == 0: return f"{UI.GREY}Stable trajectory{UI.ENDC}"
-    
-    slope = (n * sum_xy - sum_x * sum_y) / denominator
+    # Real %/min from sample timestamps, not one sample per minute
+    slope = trend.slope()
     
     if slope > 1.5:
-        minutes_to_critical = max(0, (threshold - y[-1]) / slope) if slope > 0 else 0
-        if minutes_to_critical < 15 and y[-1] > 50:
+        minutes_to_critical = max(0, (threshold - trend.last) / slope) if slope > 0 else 0
+        if minutes_to_critical < 15 and trend.last > 50:
             return f"{UI.RED}▲ Warning: Predicting critical {metric_name} in ~{int(minutes_to_critical)} mins{UI.ENDC}"
         return f"{UI.ORANGE}▲ Trending Upwards (+{slope:.1f}%/min){UI.ENDC}"
     elif slope < -1.5:
@@ -117,266 +168,2090 @@ def format_bytes(bytes_val):
             return f"{bytes_val:5.1f} {unit}"
         bytes_val /= 1024.0
 
+ANSI_ESCAPE = re.compile(r'(\033\[[0-9;?]*[A-Za-z])')
+
+def visible_len(text):
+    plain = ANSI_ESCAPE.sub('', text)
+    # Wide glyphs (the ⚡ in the title) take two terminal columns
+    return len(plain) + sum(1 for ch in plain if ord(ch) > 0x2000 and unicodedata.east_asian_width(ch) == 'W')
+
+def fit_line(text, width):
+    # Truncate to `width` visible columns without cutting escape sequences, so lines never wrap
+    if visible_len(text) <= width:
+        return text
+    parts = []
+    remaining = width
+    for part in ANSI_ESCAPE.split(text):
+        if ANSI_ESCAPE.fullmatch(part):
+            parts.append(part)
+        elif remaining > 0:
+            parts.append(part[:remaining])
+            remaining -= len(part[:remaining])
+    return "".join(parts) + UI.ENDC
+
 def signal_handler(sig, frame):
-    print(f"\n{UI.YELLOW}Terminating Dev Monitor...{UI.ENDC}")
+    if renderer is not None:
+        renderer.close()
+    # Headless stdout may be a JSON-lines stream, keep it clean
+    print(f"\n{UI.YELLOW}Terminating Dev Monitor...{UI.ENDC}", file=sys.stdout if renderer is not None else sys.stderr)
+    for consumer in consumers:
+        if hasattr(consumer, "close"):
+            consumer.close()
+    if gpu_backend is not None:
+        gpu_backend.close()
+    if cgroup:
+        cgroup.close()
+    if trace_recorder is not None:
+        trace_recorder.close()
+    history.close()
+    if CONFIG["profile"]:
+        print("\n".join(format_profile(profiler.report())), file=sys.stderr)
     sys.exit(0)
 
-def get_vulkan_info():
+def run_vulkaninfo():
     vulkan_info = {}
     try:
-        result = sp.run("vulkaninfo --summary", shell=True, capture_output=True, text=True)
+        result = sp.run(["vulkaninfo", "--summary"], capture_output=True, text=True, timeout=10)
         if result.returncode == 0:
             version_match = re.search(r'Vulkan API Version: (\d+\.\d+\.\d+)', result.stdout)
             if version_match: vulkan_info['api_version'] = version_match.group(1)
             device_matches = re.findall(r'GPU(\d+): (.*?)\n', result.stdout)
             vulkan_info['devices'] = [{'id': m[0], 'name': m[1].strip()} for m in device_matches]
-    except:
+    except (OSError, sp.TimeoutExpired):
         pass
     return vulkan_info
 
-def get_system_metrics():
-    global last_net, last_disk
-    metrics = {}
-    current_time = time.time()
-    
-    # System Info
-    try:
-        load1, load5, load15 = os.getloadavg()
-    except AttributeError:
-        load1, load5, load15 = 0.0, 0.0, 0.0
-    
-    boot_time = datetime.fromtimestamp(psutil.boot_time())
-    uptime = datetime.now() - boot_time
-    
-    metrics["system"] = {
-        "load": (load1, load5, load15),
-        "uptime": str(uptime).split('.')[0]
-    }
+# Static facts cache
+# Values that rarely change (Vulkan devices, core counts, boot time) are computed once and
+# reused until their TTL expires or a watched path changes. Entries marked persist=True are
+# also written to disk so a restarted monitor skips the expensive probes entirely.
+VULKAN_ICD_DIRS = [
+    "/usr/share/vulkan/icd.d",
+    "/usr/local/share/vulkan/icd.d",
+    "/etc/vulkan/icd.d",
+]
+
+def path_fingerprint(paths):
+    # mtime of each directory plus its newest entry: catches added, removed and edited manifests
+    fingerprint = []
+    for path in paths:
+        try:
+            newest = os.stat(path).st_mtime
+            if os.path.isdir(path):
+                with os.scandir(path) as entries:
+                    for entry in entries:
+                        newest = max(newest, entry.stat().st_mtime)
+            fingerprint.append(newest)
+        except OSError:
+            fingerprint.append(None)
+    return fingerprint
+
+class StaticFactsCache:
+    """TTL/mtime-invalidated cache for slow, rarely changing facts, optionally backed by a JSON file"""
+
+    def __init__(self, path=None, ttl=3600):
+        self.path = os.path.expanduser(path) if path else None
+        self.ttl = ttl
+        self.entries = {}
+        if self.path:
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def get(self, key, loader, ttl=None, watch=(), persist=True):
+        ttl = self.ttl if ttl is None else ttl
+        fingerprint = path_fingerprint(watch)
+        entry = self.entries.get(key)
+        if entry and time.time() - entry["stamp"] < ttl and entry["fingerprint"] == fingerprint:
+            return entry["value"]
+
+        value = loader()
+        self.entries[key] = {"value": value, "stamp": time.time(), "fingerprint": fingerprint, "persist": persist}
+        if persist:
+            self.save()
+        return value
+
+    def invalidate(self, key=None):
+        if key is None:
+            self.entries.clear()
+        else:
+            self.entries.pop(key, None)
+        self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({k: v for k, v in self.entries.items() if v.get("persist")}, f)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            # Read-only home inside the container: keep working from memory
+            pass
+
+static_cache = None
+
+def get_static_cache():
+    global static_cache
+    if static_cache is None:
+        static_cache = StaticFactsCache(CONFIG["static_cache_path"], CONFIG["static_cache_ttl"])
+    return static_cache
 
-    # CPU
-    overall_cpu = psutil.cpu_percent(interval=0.5)
-    metrics["cpu"] = {
-        "overall_percent": overall_cpu,
+def vulkan_icd_paths():
+    paths = list(VULKAN_ICD_DIRS)
+    for var in ("VK_DRIVER_FILES", "VK_ICD_FILENAMES"):
+        if os.environ.get(var):
+            paths.extend(os.environ[var].split(os.pathsep))
+    return paths
+
+def get_vulkan_info(cache=None):
+    return (cache or get_static_cache()).get("vulkan", run_vulkaninfo, watch=vulkan_icd_paths())
+
+def load_cpu_topology():
+    return {
         "core_count": psutil.cpu_count(logical=False),
         "thread_count": psutil.cpu_count(logical=True),
     }
-    history["cpu"].append(overall_cpu)
-    
-    # Memory & Swap
-    memory = psutil.virtual_memory()
-    swap = psutil.swap_memory()
-    metrics["memory"] = {
-        "total_gb": memory.total / (1024**3),
-        "used_gb": memory.used / (1024**3),
-        "percent": memory.percent,
-        "swap_percent": swap.percent,
-        "swap_used_gb": swap.used / (1024**3)
-    }
-    history["memory"].append(memory.percent)
-  
+
+def get_cpu_topology(cache=None):
+    return (cache or get_static_cache()).get("cpu_topology", load_cpu_topology)
+
+def get_boot_time(cache=None):
+    # Never persisted: a cached value from before a reboot would be wrong
+    return (cache or get_static_cache()).get("boot_time", psutil.boot_time, ttl=float("inf"), persist=False)
+
+def load_boot_id():
+    try:
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            return f.read().strip()
+    except OSError:
+        return socket.gethostname()
+
+def get_boot_id(cache=None):
+    # Shared by the host and every container on its kernel, so it identifies the node
+    return (cache or get_static_cache()).get("boot_id", load_boot_id, ttl=float("inf"), persist=False)
+
+def bench_startup(rounds=3):
+    """Compares cold (probing) and warm (disk cache) startup cost of the static facts"""
+    def load_all(cache):
+        get_vulkan_info(cache)
+        get_cpu_topology(cache)
+        get_boot_time(cache)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "static.json")
+        cold, warm = [], []
+        for _ in range(rounds):
+            if os.path.exists(path):
+                os.remove(path)
+            start = time.perf_counter()
+            load_all(StaticFactsCache(path))
+            cold.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            load_all(StaticFactsCache(path))
+            warm.append(time.perf_counter() - start)
+
+    cold_ms = sum(cold) / rounds * 1000
+    warm_ms = sum(warm) / rounds * 1000
+    print(f"{UI.BOLD}Static facts startup ({rounds} rounds){UI.ENDC}")
+    print(f" Cold (probe):      {cold_ms:8.2f} ms")
+    print(f" Warm (disk cache): {warm_ms:8.2f} ms")
+    print(f" Speedup:           {cold_ms / warm_ms if warm_ms > 0 else float('inf'):8.1f}x")
+
+# GPU backends
+# Every backend returns the same shape: a status string plus one dict per device.
+# Long-lived backends (NVML, nvidia-smi --loop-ms) keep the driver initialised between
+# polls, the one-shot backend is the original per-tick nvidia-smi call kept as a fallback.
+GPU_QUERY_FIELDS = "index,name,utilization.gpu,memory.used,memory.total,temperature.gpu"
+
+def parse_gpu_csv_line(line):
+    fields = [f.strip() for f in line.split(',')]
+    if len(fields) < 6:
+        return None
+    try:
+        used, total = float(fields[3]), float(fields[4])
+        return {
+            "index": int(fields[0]),
+            "name": fields[1],
+            "utilization": float(fields[2]),
+            "memory_used_mb": used,
+            "memory_total_mb": total,
+            "memory_percent": (used / total) * 100 if total > 0 else 0,
+            "temperature": float(fields[5]),
+        }
+    except ValueError:
+        # "[N/A]" / "[Not Supported]" fields on some boards
+        return None
+
+def parse_gpu_process_line(line):
+    """`pid, used_memory_mb[, sm_percent]` -> tuple, None for headers and "[N/A]" rows"""
+    fields = [f.strip() for f in line.split(',')]
+    if len(fields) < 2:
+        return None
+    try:
+        sm = float(fields[2]) if len(fields) > 2 and fields[2] not in ("", "-") else None
+        return int(fields[0]), float(fields[1]), sm
+    except ValueError:
+        return None
+
+def exception_status(error):
+    """Status code for an exception escaping a GPU query, in the same vocabulary as classify_smi_error"""
+    if isinstance(error, sp.TimeoutExpired):
+        return "TIMEOUT"
+    if isinstance(error, FileNotFoundError):
+        return "SMI_MISSING"
+    return type(error).__name__
+
+def classify_smi_error(stderr):
+    error_msg = (stderr or "").lower()
+    if "mismatch" in error_msg:
+        return "VER_MISMATCH"
+    elif "initialized" in error_msg or "communication" in error_msg:
+        return "DRIVER_ERROR"
+    return "OFFLINE"
+
+class GpuBackend:
+    """Base class for GPU metric sources"""
+    name = "none"
+
+    def sample(self):
+        return "OFFLINE", []
+
+    def processes(self):
+        """{pid: {"gpu_memory_mb", "gpu_sm_percent"}} summed over every device; SM is None when unknown"""
+        return {}
+
+    def close(self):
+        pass
+
+def add_gpu_process(usage, pid, memory_mb, sm_percent=None):
+    entry = usage.setdefault(pid, {"gpu_memory_mb": 0.0, "gpu_sm_percent": None})
+    entry["gpu_memory_mb"] += memory_mb
+    if sm_percent is not None:
+        entry["gpu_sm_percent"] = (entry["gpu_sm_percent"] or 0.0) + sm_percent
+
+def smi_gpu_processes():
+    """Per-process VRAM from `nvidia-smi --query-compute-apps`; pmon would add SM% but blocks for a second"""
+    result = sp.run(
+        ["nvidia-smi", "--query-compute-apps=pid,used_memory", "--format=csv,noheader,nounits"],
+        capture_output=True, text=True, timeout=3
+    )
+    usage = {}
+    if result.returncode != 0:
+        return usage
+    for row in map(parse_gpu_process_line, result.stdout.splitlines()):
+        if row is not None:
+            add_gpu_process(usage, *row)
+    return usage
+
+class NvmlBackend(GpuBackend):
+    """Persistent NVML handle through ctypes, no fork per tick"""
+    name = "nvml"
+
+    NVML_TEMPERATURE_GPU = 0
+    NVML_ERROR_INSUFFICIENT_SIZE = 7
+    NVML_ERROR_DRIVER_NOT_LOADED = 9
+    NVML_ERROR_TIMEOUT = 10
+    NVML_ERROR_LIB_RM_VERSION_MISMATCH = 18
+
+    class _Utilization(ctypes.Structure):
+        _fields_ = [("gpu", ctypes.c_uint), ("memory", ctypes.c_uint)]
+
+    class _Memory(ctypes.Structure):
+        _fields_ = [("total", ctypes.c_ulonglong), ("free", ctypes.c_ulonglong), ("used", ctypes.c_ulonglong)]
+
+    class _ProcessInfo(ctypes.Structure):
+        _fields_ = [("pid", ctypes.c_uint), ("usedGpuMemory", ctypes.c_ulonglong),
+                    ("gpuInstanceId", ctypes.c_uint), ("computeInstanceId", ctypes.c_uint)]
+
+    class _ProcessSample(ctypes.Structure):
+        _fields_ = [("pid", ctypes.c_uint), ("timeStamp", ctypes.c_ulonglong), ("smUtil", ctypes.c_uint),
+                    ("memUtil", ctypes.c_uint), ("encUtil", ctypes.c_uint), ("decUtil", ctypes.c_uint)]
+
+    # usedGpuMemory when the driver cannot attribute memory (e.g. under WDDM or without privileges)
+    NVML_VALUE_NOT_AVAILABLE = 2**64 - 1
+
+    def __init__(self):
+        # Raises OSError when the library is absent, so create_gpu_backend() can fall through
+        self.lib = ctypes.CDLL("libnvidia-ml.so.1")
+        self._check(self.lib.nvmlInit_v2())
+        count = ctypes.c_uint(0)
+        self._check(self.lib.nvmlDeviceGetCount_v2(ctypes.byref(count)))
+        self.handles = []
+        self.names = []
+        for i in range(count.value):
+            handle = ctypes.c_void_p()
+            self._check(self.lib.nvmlDeviceGetHandleByIndex_v2(ctypes.c_uint(i), ctypes.byref(handle)))
+            name = ctypes.create_string_buffer(96)
+            self.lib.nvmlDeviceGetName(handle, name, ctypes.c_uint(96))
+            self.handles.append(handle)
+            self.names.append(name.value.decode(errors="replace"))
+        # Compute (CUDA, ONNX Runtime) and graphics (Vulkan, Qt) clients; older drivers lack the _v3 entry points
+        self.process_queries = [getattr(self.lib, fn) for fn in
+                                ("nvmlDeviceGetComputeRunningProcesses_v3", "nvmlDeviceGetGraphicsRunningProcesses_v3")
+                                if hasattr(self.lib, fn)]
+        # Per-process utilisation is sampled by the driver; ask only for samples newer than the last seen
+        self.last_seen = [0] * len(self.handles)
+
+    def _check(self, ret):
+        if ret != 0:
+            raise RuntimeError(self._status(ret))
+
+    def _status(self, ret):
+        if ret == self.NVML_ERROR_LIB_RM_VERSION_MISMATCH:
+            return "VER_MISMATCH"
+        elif ret == self.NVML_ERROR_DRIVER_NOT_LOADED:
+            return "DRIVER_ERROR"
+        elif ret == self.NVML_ERROR_TIMEOUT:
+            return "TIMEOUT"
+        return "UNKNOWN_ERR"
+
+    def sample(self):
+        devices = []
+        util = self._Utilization()
+        mem = self._Memory()
+        temp = ctypes.c_uint(0)
+        for i, handle in enumerate(self.handles):
+            for ret in (self.lib.nvmlDeviceGetUtilizationRates(handle, ctypes.byref(util)),
+                        self.lib.nvmlDeviceGetMemoryInfo(handle, ctypes.byref(mem)),
+                        self.lib.nvmlDeviceGetTemperature(handle, self.NVML_TEMPERATURE_GPU, ctypes.byref(temp))):
+                if ret != 0:
+                    return self._status(ret), []
+            used, total = mem.used / (1024**2), mem.total / (1024**2)
+            devices.append({
+                "index": i,
+                "name": self.names[i],
+                "utilization": float(util.gpu),
+                "memory_used_mb": used,
+                "memory_total_mb": total,
+                "memory_percent": (used / total) * 100 if total > 0 else 0,
+                "temperature": float(temp.value),
+            })
+        return ("OPERATIONAL" if devices else "OFFLINE"), devices
+
+    def _running(self, query, handle):
+        count = ctypes.c_uint(16)
+        for _ in range(2):
+            infos = (self._ProcessInfo * count.value)()
+            ret = query(handle, ctypes.byref(count), infos)
+            if ret != self.NVML_ERROR_INSUFFICIENT_SIZE:
+                break
+            count = ctypes.c_uint(count.value + 8)  # processes may start between the two calls
+        return infos[:count.value] if ret == 0 else []
+
+    def _sm_samples(self, i, handle):
+        count = ctypes.c_uint(0)
+        last_seen = ctypes.c_ulonglong(self.last_seen[i])
+        ret = self.lib.nvmlDeviceGetProcessUtilization(handle, None, ctypes.byref(count), last_seen)
+        if ret != self.NVML_ERROR_INSUFFICIENT_SIZE or count.value == 0:
+            return {}
+        samples = (self._ProcessSample * count.value)()
+        if self.lib.nvmlDeviceGetProcessUtilization(handle, samples, ctypes.byref(count), last_seen) != 0:
+            return {}
+        sm = {}
+        for sample in samples[:count.value]:
+            sm[sample.pid] = max(sm.get(sample.pid, 0), sample.smUtil)
+            self.last_seen[i] = max(self.last_seen[i], sample.timeStamp)
+        return sm
+
+    def processes(self):
+        usage = {}
+        for i, handle in enumerate(self.handles):
+            sm = self._sm_samples(i, handle)
+            seen = set()
+            for query in self.process_queries:
+                for info in self._running(query, handle):
+                    # A process with both a compute and a graphics context is listed twice with the same memory
+                    if info.pid in seen:
+                        continue
+                    seen.add(info.pid)
+                    used = 0.0 if info.usedGpuMemory == self.NVML_VALUE_NOT_AVAILABLE else info.usedGpuMemory / (1024**2)
+                    add_gpu_process(usage, info.pid, used, sm.get(info.pid))
+        return usage
+
+    def close(self):
+        self.lib.nvmlShutdown()
+
+class SmiLoopBackend(GpuBackend):
+    """Single long-lived `nvidia-smi --loop-ms` child, CSV stream parsed incrementally"""
+    name = "smi-loop"
+
+    def __init__(self, interval_ms=1000):
+        self.proc = sp.Popen(
+            ["nvidia-smi", f"--query-gpu={GPU_QUERY_FIELDS}", "--format=csv,noheader,nounits", f"--loop-ms={interval_ms}"],
+            stdout=sp.PIPE, stderr=sp.PIPE, text=True, bufsize=1
+        )
+        self.latest = {}
+        self.lock = threading.Lock()
+        self.reader = threading.Thread(target=self._read, daemon=True)
+        self.reader.start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            device = parse_gpu_csv_line(line)
+            if device is not None:
+                with self.lock:
+                    self.latest[device["index"]] = device
+
+    def sample(self):
+        if self.proc.poll() is not None:
+            return classify_smi_error(self.proc.stderr.read()), []
+        with self.lock:
+            devices = [self.latest[i] for i in sorted(self.latest)]
+        return ("OPERATIONAL" if devices else "INITIALIZING"), devices
+
+    def processes(self):
+        # The loop child only streams device rows; process attribution runs at its own, slower cadence
+        return smi_gpu_processes()
+
+    def close(self):
+        if self.proc.poll() is None:
+            self.proc.terminate()
+            try:
+                self.proc.wait(timeout=2)
+            except sp.TimeoutExpired:
+                self.proc.kill()
+
+class SmiOneShotBackend(GpuBackend):
+    """Original behaviour: one nvidia-smi invocation per poll"""
+    name = "smi"
+
+    def sample(self):
+        try:
+            result = sp.run(
+                ["nvidia-smi", f"--query-gpu={GPU_QUERY_FIELDS}", "--format=csv,noheader,nounits"],
+                capture_output=True, text=True, timeout=3
+            )
+        except sp.TimeoutExpired:
+            return "TIMEOUT", []
+        except FileNotFoundError:
+            return "SMI_MISSING", []
+
+        if result.returncode != 0 or not result.stdout.strip():
+            return classify_smi_error(result.stderr), []
+        devices = [d for d in map(parse_gpu_csv_line, result.stdout.splitlines()) if d is not None]
+        return ("OPERATIONAL" if devices else "OFFLINE"), devices
+
+    def processes(self):
+        return smi_gpu_processes()
+
+class FakeGpuBackend(GpuBackend):
+    """Replays a recorded nvidia-smi CSV (GPU_QUERY_FIELDS order), for hosts without a GPU.
+    A frame ends when a device index repeats; the recording loops when exhausted.
+    An optional second CSV of `pid, used_memory_mb[, sm_percent]` rows replays per-process usage,
+    framed the same way on repeating PIDs."""
+    name = "fake"
+
+    def __init__(self, path, process_path=None):
+        self.process_frames = []
+        if process_path:
+            with open(process_path) as f:
+                frame = {}
+                for row in filter(None, map(parse_gpu_process_line, f)):
+                    if row[0] in frame:
+                        self.process_frames.append(frame)
+                        frame = {}
+                    add_gpu_process(frame, *row)
+                if frame:
+                    self.process_frames.append(frame)
+        self.process_position = 0
+        with open(path) as f:
+            rows = [d for d in map(parse_gpu_csv_line, f) if d is not None]
+        self.frames = []
+        frame = {}
+        for row in rows:
+            if row["index"] in frame:
+                self.frames.append(list(frame.values()))
+                frame = {}
+            frame[row["index"]] = row
+        if frame:
+            self.frames.append(list(frame.values()))
+        self.position = 0
+
+    def sample(self):
+        if not self.frames:
+            return "OFFLINE", []
+        frame = self.frames[self.position % len(self.frames)]
+        self.position += 1
+        return "OPERATIONAL", frame
+
+    def processes(self):
+        if not self.process_frames:
+            return {}
+        frame = self.process_frames[self.process_position % len(self.process_frames)]
+        self.process_position += 1
+        return {pid: dict(usage) for pid, usage in frame.items()}
+
+GPU_BACKENDS = {
+    "nvml": NvmlBackend,
+    "smi-loop": SmiLoopBackend,
+    "smi": SmiOneShotBackend,
+}
+
+def create_gpu_backend(kind="auto", replay_path=None, process_replay_path=None):
+    if kind == "fake":
+        return FakeGpuBackend(replay_path, process_replay_path)
+    order = ["nvml", "smi-loop", "smi"] if kind == "auto" else [kind]
+    for name in order:
+        try:
+            return GPU_BACKENDS[name]()
+        except (OSError, RuntimeError, AttributeError):
+            # Library missing, driver not loaded or nvidia-smi absent: try the next one
+            continue
+    return SmiOneShotBackend()
+
+gpu_backend = None
+gpu_backend_lock = threading.Lock()
+
+def get_gpu_backend():
+    # Device and per-process collectors run on different pipeline threads but share one backend
+    global gpu_backend
+    with gpu_backend_lock:
+        if gpu_backend is None:
+            gpu_backend = create_gpu_backend(CONFIG["gpu_backend"], CONFIG["gpu_replay"], CONFIG["gpu_process_replay"])
+        return gpu_backend
+
+def get_gpu_metrics():
     gpu_metrics = {
         "available": False,
         "status": "INITIALIZING",
+        "backend": inputs.read("gpu_backend", lambda: get_gpu_backend().name),
         "utilization": 0.0,
         "memory_used_mb": 0.0,
         "memory_total_mb": 0.0,
         "memory_percent": 0.0,
-        "temperature": 0.0
+        "temperature": 0.0,
+        "devices": []
     }
-    
+
     try:
-        # Use a slightly longer timeout for the first run, then 2s for subsequent
-        result = sp.run(
-            "nvidia-smi --query-gpu=utilization.gpu,memory.used,memory.total,temperature.gpu --format=csv,noheader,nounits", 
-            shell=True, capture_output=True, text=True, timeout=3
-        )
-        
-        if result.returncode == 0 and result.stdout.strip():
-            gpu_data = result.stdout.strip().split(',')
-            if len(gpu_data) >= 4:
-                gpu_metrics.update({
-                    "available": True,
-                    "status": "OPERATIONAL",
-                    "utilization": float(gpu_data[0].strip()),
-                    "memory_used_mb": float(gpu_data[1].strip()),
-                    "memory_total_mb": float(gpu_data[2].strip()),
-                    "memory_percent": (float(gpu_data[1].strip()) / float(gpu_data[2].strip())) * 100 if float(gpu_data[2].strip()) > 0 else 0,
-                    "temperature": float(gpu_data[3].strip())
-                })
+        status, devices = inputs.read("gpu", lambda: get_gpu_backend().sample())
+    except (OSError, RuntimeError, ValueError, sp.SubprocessError) as e:
+        status, devices = exception_status(e), []
+    if status not in ("OPERATIONAL", "INITIALIZING", "OFFLINE"):
+        profiler.error("gpu", status)
+
+    gpu_metrics["status"] = status
+    if devices:
+        # Aggregate across every board: mean utilisation, summed VRAM, hottest temperature
+        used = sum(d["memory_used_mb"] for d in devices)
+        total = sum(d["memory_total_mb"] for d in devices)
+        gpu_metrics.update({
+            "available": True,
+            "utilization": sum(d["utilization"] for d in devices) / len(devices),
+            "memory_used_mb": used,
+            "memory_total_mb": total,
+            "memory_percent": (used / total) * 100 if total > 0 else 0,
+            "temperature": max(d["temperature"] for d in devices),
+            "devices": devices
+        })
+    return gpu_metrics
+
+# Long-horizon history
+# Each metric is a set of float64 ring buffers laid over one memory-mapped file:
+#   raw  -> (t, value) per recorded sample
+#   1m   -> (t, avg) per minute
+#   10m  -> (t, min, avg, max) per 10 minutes
+# Writes go straight into the mapping, so a restarted monitor resumes its history for free.
+class RingBuffer:
+    """Fixed-capacity ring of float64 records over a shared buffer; head/count live in the file header"""
+
+    def __init__(self, data, header, slot, capacity, width):
+        self.data = data
+        self.header = header
+        self.slot = slot
+        self.capacity = capacity
+        self.width = width
+
+    def __len__(self):
+        return self.header[self.slot + 1]
+
+    def append(self, record):
+        head = self.header[self.slot]
+        base = head * self.width
+        for i, value in enumerate(record):
+            self.data[base + i] = value
+        self.header[self.slot] = (head + 1) % self.capacity
+        self.header[self.slot + 1] = min(self.header[self.slot + 1] + 1, self.capacity)
+
+    def record(self, age):
+        # age 0 is the newest record
+        base = ((self.header[self.slot] - 1 - age) % self.capacity) * self.width
+        return tuple(self.data[base:base + self.width])
+
+    def latest(self, count):
+        """Newest `count` records, oldest first"""
+        count = min(count, len(self))
+        return [self.record(age) for age in range(count - 1, -1, -1)]
+
+    def since(self, cutoff):
+        """Records with t >= cutoff, oldest first; walks back from the head only as far as needed"""
+        records = []
+        for age in range(len(self)):
+            record = self.record(age)
+            if record[0] < cutoff:
+                break
+            records.append(record)
+        records.reverse()
+        return records
+
+class MetricSeries:
+    """Raw, 1 minute and 10 minute tiers of one metric in a single mmap (file-backed or anonymous)"""
+    MAGIC = b"VDMRING1"
+    HEADER_SIZE = 256
+    WIDTHS = (2, 2, 4)
+    BUCKETS = (60, 600)
+
+    def __init__(self, path, capacities):
+        self.capacities = tuple(capacities)
+        size = self.HEADER_SIZE + sum(c * w * 8 for c, w in zip(self.capacities, self.WIDTHS))
+
+        if path:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                fresh = os.fstat(fd).st_size != size
+                if fresh:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                self.mm = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
         else:
-            # Check for common NVIDIA errors in stderr
-            error_msg = result.stderr.lower()
-            if "mismatch" in error_msg:
-                gpu_metrics["status"] = "VER_MISMATCH"
-            elif "initialized" in error_msg or "communication" in error_msg:
-                gpu_metrics["status"] = "DRIVER_ERROR"
-            else:
-                gpu_metrics["status"] = "OFFLINE"
-
-    except sp.TimeoutExpired:
-        gpu_metrics["status"] = "TIMEOUT"
-    except FileNotFoundError:
-        gpu_metrics["status"] = "SMI_MISSING"
-    except Exception as e:
-        gpu_metrics["status"] = "UNKNOWN_ERR"
-        
-    metrics["gpu"] = gpu_metrics
-    # Only append to history if valid data exists, else append last known or 0
-    history["gpu_util"].append(gpu_metrics["utilization"])
-    history["gpu_memory"].append(gpu_metrics["memory_percent"])
-        
-    # Disk & Net (with speed calculations)
-    disk_usage = psutil.disk_usage('/')
-    disk_io = psutil.disk_io_counters()
-    net_io = psutil.net_io_counters()
-    
-    time_delta = current_time - last_disk["time"]
-    read_speed = (disk_io.read_bytes - last_disk["read"]) / time_delta if time_delta > 0 else 0
-    write_speed = (disk_io.write_bytes - last_disk["write"]) / time_delta if time_delta > 0 else 0
-    
-    last_disk = {"read": disk_io.read_bytes, "write": disk_io.write_bytes, "time": current_time}
-    
-    metrics["disk"] = {
-        "percent": disk_usage.percent, 
-        "total_gb": disk_usage.total / (1024**3), 
+            fresh = True
+            self.mm = mmap.mmap(-1, size)
+
+        view = memoryview(self.mm)
+        # ints: [0:3] capacities, [3:9] head/count per tier; accum: 5 doubles per aggregate tier
+        self.ints = view[8:80].cast('q')
+        self.accum = view[128:208].cast('d')
+        if fresh or self.mm[:8] != self.MAGIC or tuple(self.ints[0:3]) != self.capacities:
+            self.mm[:self.HEADER_SIZE] = bytes(self.HEADER_SIZE)
+            self.mm[:8] = self.MAGIC
+            self.ints[0:3] = array('q', self.capacities)
+
+        self.rings = []
+        offset = self.HEADER_SIZE
+        for tier, (capacity, width) in enumerate(zip(self.capacities, self.WIDTHS)):
+            length = capacity * width * 8
+            self.rings.append(RingBuffer(view[offset:offset + length].cast('d'), self.ints, 3 + tier * 2, capacity, width))
+            offset += length
+        self.raw, self.minute, self.ten_minute = self.rings
+
+    def append(self, t, value):
+        self.raw.append((t, value))
+        for i, (ring, seconds) in enumerate(zip(self.rings[1:], self.BUCKETS)):
+            a = i * 5
+            bucket = t - t % seconds
+            if self.accum[a + 2] > 0 and bucket != self.accum[a]:
+                avg = self.accum[a + 1] / self.accum[a + 2]
+                ring.append((self.accum[a], avg) if ring.width == 2 else (self.accum[a], self.accum[a + 3], avg, self.accum[a + 4]))
+                self.accum[a + 2] = 0
+            if self.accum[a + 2] == 0:
+                self.accum[a:a + 5] = array('d', [bucket, 0.0, 0.0, value, value])
+            self.accum[a + 1] += value
+            self.accum[a + 2] += 1
+            self.accum[a + 3] = min(self.accum[a + 3], value)
+            self.accum[a + 4] = max(self.accum[a + 4], value)
+
+    def window(self, seconds, now=None):
+        """(t, avg) pairs covering the last `seconds`, from the finest tier that reaches that far back"""
+        cutoff = (now or time.time()) - seconds
+        for ring in self.rings:
+            if len(ring) < ring.capacity or (len(ring) and ring.record(len(ring) - 1)[0] <= cutoff):
+                break
+        avg_index = 2 if ring.width == 4 else 1
+        points = [(r[0], r[avg_index]) for r in ring.since(cutoff)]
+        if ring is not self.raw:
+            # Include the bucket still being accumulated, otherwise coarse windows lag by up to 10 min
+            a = (self.rings.index(ring) - 1) * 5
+            if self.accum[a + 2] > 0:
+                points.append((self.accum[a], self.accum[a + 1] / self.accum[a + 2]))
+        return points
+
+    def close(self):
+        for ring in self.rings:
+            ring.data.release()
+        self.ints.release()
+        self.accum.release()
+        self.mm.flush()
+        self.mm.close()
+
+class MetricStore:
+    """Named MetricSeries, created on first append; `directory=None` keeps everything in memory"""
+
+    def __init__(self, directory=None, capacities=None):
+        self.directory = os.path.expanduser(directory) if directory else None
+        self.capacities = capacities or CONFIG["history_tiers"]
+        self.series = {}
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def get(self, name):
+        series = self.series.get(name)
+        if series is None:
+            path = os.path.join(self.directory, re.sub(r'[^\w.-]', '_', name) + ".ring") if self.directory else None
+            series = self.series[name] = MetricSeries(path, (self.capacities["raw"], self.capacities["1m"], self.capacities["10m"]))
+        return series
+
+    def append(self, name, value, t=None):
+        self.get(name).append(t or time.time(), float(value))
+
+    def last(self, name, count):
+        """Newest `count` raw values, oldest first"""
+        return [v for _, v in self.get(name).raw.latest(count)]
+
+    def window(self, name, seconds, now=None):
+        return self.get(name).window(seconds, now)
+
+    def resample(self, name, seconds, points, now=None):
+        """`points` bucket averages over the last `seconds` (None for empty buckets), for sparklines"""
+        now = now or time.time()
+        start = now - seconds
+        sums = [0.0] * points
+        counts = [0] * points
+        for t, v in self.window(name, seconds, now):
+            i = min(points - 1, int((t - start) / seconds * points))
+            sums[i] += v
+            counts[i] += 1
+        return [s / c if c else None for s, c in zip(sums, counts)]
+
+    def close(self):
+        for series in self.series.values():
+            series.close()
+        self.series.clear()
+
+# Trend estimation
+# Streaming estimators updated in O(1) per sample with real timestamps, so slopes are true
+# %/min whatever the sampling interval. Modes: "linear" (least squares over a sliding time
+# window, running sums), "ewma" (smoothed rate of change) and "holt" (double exponential).
+class TrendEstimator:
+    MODES = ("linear", "ewma", "holt")
+
+    def __init__(self, mode="linear", window=900, alpha=0.3, beta=0.1):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown trend mode {mode!r}")
+        self.mode = mode
+        self.window = window
+        self.alpha = alpha
+        self.beta = beta
+        self.count = 0
+        self.last = 0.0
+        self.last_t = None
+        self.all_zero = True
+        # linear: samples in the window and their running sums, x relative to `origin`
+        self.samples = deque()
+        self.origin = None
+        self.n = self.sx = self.sy = self.sxy = self.sxx = 0.0
+        # ewma / holt
+        self.level = None
+        self.trend = 0.0
+
+    def update(self, t, y):
+        if self.last_t is not None and t <= self.last_t:
+            return
+        if self.mode == "linear":
+            self._update_linear(t, y)
+        else:
+            self._update_smoothed(t, y)
+        self.count += 1
+        self.last = y
+        self.last_t = t
+        self.all_zero = self.all_zero and y == 0
+
+    def _add(self, x, y, sign):
+        self.n += sign
+        self.sx += sign * x
+        self.sy += sign * y
+        self.sxy += sign * x * y
+        self.sxx += sign * x * x
+
+    def _update_linear(self, t, y):
+        if self.origin is None:
+            self.origin = t
+        x = t - self.origin
+        self.samples.append((x, y))
+        self._add(x, y, 1)
+        while self.samples[0][0] < x - self.window:
+            self._add(*self.samples.popleft(), -1)
+        if self.samples[0][0] > 4 * self.window:
+            # Re-centre so the x*x sums stay small; amortised O(1), once every few windows
+            shift = self.samples[0][0]
+            self.origin += shift
+            self.samples = deque((sx - shift, sy) for sx, sy in self.samples)
+            self.n = self.sx = self.sy = self.sxy = self.sxx = 0.0
+            for sx, sy in self.samples:
+                self._add(sx, sy, 1)
+
+    def _update_smoothed(self, t, y):
+        if self.level is None:
+            self.level = y
+            return
+        dt = t - self.last_t
+        if self.mode == "ewma":
+            self.trend = self.alpha * (y - self.last) / dt + (1 - self.alpha) * self.trend
+            self.level = self.alpha * y + (1 - self.alpha) * self.level
+        else:
+            previous = self.level
+            self.level = self.alpha * y + (1 - self.alpha) * (self.level + self.trend * dt)
+            self.trend = self.beta * (self.level - previous) / dt + (1 - self.beta) * self.trend
+
+    def size(self):
+        return int(self.n) if self.mode == "linear" else self.count
+
+    def slope(self):
+        """Rate of change per minute"""
+        if self.mode != "linear":
+            return self.trend * 60
+        denominator = self.n * self.sxx - self.sx ** 2
+        if self.n < 2 or denominator <= 1e-9:
+            return 0.0
+        return (self.n * self.sxy - self.sx * self.sy) / denominator * 60
+
+    def forecast(self, seconds_ahead):
+        if self.mode != "linear":
+            return (self.level or 0.0) + self.trend * seconds_ahead
+        if self.n == 0:
+            return 0.0
+        # Fitted value at the newest sample, projected forward
+        x_last = self.samples[-1][0]
+        mean_x, mean_y = self.sx / self.n, self.sy / self.n
+        return mean_y + self.slope() / 60 * (x_last + seconds_ahead - mean_x)
+
+trends = {}
+# Collector threads record their own samples while the render loop reads sparklines and trends
+history_lock = threading.RLock()
+
+def get_trend(name):
+    with history_lock:
+        trend = trends.get(name)
+        if trend is None:
+            trend = trends[name] = TrendEstimator(CONFIG["trend_mode"], CONFIG["trend_window"])
+            # Resume from the persisted history instead of starting cold
+            for t, v in history.window(name, CONFIG["trend_window"]):
+                trend.update(t, v)
+        return trend
+
+def score_trends(names):
+    """Slopes (%/min) of many series in one pass over their estimators' running sums. Linear
+    estimators are scored as one batched NumPy least-squares step, otherwise one slope() each."""
+    with history_lock:
+        estimators = [get_trend(name) for name in names]
+        if np is None or not all(trend.mode == "linear" for trend in estimators):
+            return {name: trend.slope() for name, trend in zip(names, estimators)}
+        sums = np.array([(trend.n, trend.sx, trend.sy, trend.sxy, trend.sxx) for trend in estimators]).reshape(-1, 5)
+    n, sx, sy, sxy, sxx = sums.T
+    denominator = n * sxx - sx ** 2
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slopes = np.where((n >= 2) & (denominator > 1e-9), (n * sxy - sx * sy) / denominator * 60, 0.0)
+    return dict(zip(names, slopes.tolist()))
+
+# In-memory until main() opens the file-backed store at CONFIG["history_path"]
+history = MetricStore()
+
+# Collector inputs
+# Every raw reading a collector takes (psutil counters, cgroup files, the GPU backend, process
+# rows) goes through `inputs`, named. A recorded collector run keeps what it read, and replay
+# swaps in ReplayInputs, so the real collectors, CounterDelta and ProcessTable run on a trace.
+class LiveInputs:
+    """Reads straight from the system; capture() keeps the values one collector run read, per thread"""
+
+    def __init__(self):
+        self.local = threading.local()
+
+    def now(self):
+        return time.monotonic()
+
+    def time(self):
+        return time.time()
+
+    def read(self, name, source, *args):
+        value = source(*args)
+        captured = getattr(self.local, "captured", None)
+        if captured is not None:
+            captured[name] = value
+        return value
+
+    def capturing(self):
+        return getattr(self.local, "captured", None) is not None
+
+    @contextlib.contextmanager
+    def capture(self):
+        self.local.captured = captured = {}
+        try:
+            yield captured
+        finally:
+            self.local.captured = None
+
+inputs = LiveInputs()
+
+# Collectors
+# Each source samples one section of the metrics dict and keeps its own delta state, so the
+# pipeline below can run them independently at different rates.
+class CounterDelta:
+    """Previous snapshot of a keyed set of psutil counter tuples; update() returns per-key deltas.
+    One psutil read per tick feeds every view (per-device, per-core and the aggregates)."""
+
+    def __init__(self):
+        self.previous = None
+        self.time = None
+
+    def update(self, current, now=None):
+        now = now or time.monotonic()
+        previous, previous_time = self.previous, self.time
+        self.previous, self.time = current, now
+        if previous is None or now <= previous_time:
+            return 0.0, {}
+        deltas = {
+            # Clamp at zero: counters reset when a device or NIC is re-created
+            key: value._make(max(0, c - p) for c, p in zip(value, previous[key]))
+            for key, value in current.items() if key in previous
+        }
+        return now - previous_time, deltas
+
+cpu_counters = CounterDelta()
+disk_counters = CounterDelta()
+net_counters = CounterDelta()
+
+def cpu_busy_percent(delta):
+    # Same accounting as psutil.cpu_percent: guest time is already part of user time
+    total = sum(delta) - getattr(delta, "guest", 0) - getattr(delta, "guest_nice", 0)
+    idle = delta.idle + getattr(delta, "iowait", 0)
+    return round(min(100.0, max(0.0, (total - idle) / total * 100)), 1) if total > 0 else 0.0
+
+def block_devices():
+    try:
+        return sorted(os.listdir("/sys/block"))
+    except OSError:
+        return None
+
+def whole_disks(names):
+    # Partitions (sda1, nvme0n1p2) are already counted in their parent device
+    block = inputs.read("block_devices", block_devices)
+    if block is None:
+        return list(names)
+    block = set(block)
+    return [name for name in names if name in block]
+
+# cgroup v2 accounting
+# Inside a limited container psutil reports host-wide CPU and memory. When the monitor runs in
+# a cgroup v2 hierarchy these readers report the container's own usage against its limits.
+# Descriptors stay open and are re-read with pread(), no open/close per tick.
+class PreadFile:
+    """A pseudo-file (cgroupfs, procfs) opened once and re-read from offset 0 on every call"""
+
+    def __init__(self, path):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+
+    def read(self):
+        return os.pread(self.fd, 65536, 0).decode()
+
+    def close(self):
+        os.close(self.fd)
+
+CgroupCpu = namedtuple("CgroupCpu", ["usage_usec", "throttled_usec"])
+CgroupIo = namedtuple("CgroupIo", ["rbytes", "wbytes", "rios", "wios"])
+
+def parse_pressure(text):
+    # "some avg10=0.12 avg60=0.05 avg300=0.01 total=1234" (+ a "full" line)
+    pressure = {}
+    for line in text.splitlines():
+        kind, *fields = line.split()
+        pressure[kind] = {k: float(v) for k, v in (f.split('=') for f in fields)}
+    return pressure
+
+def own_cgroup_path():
+    try:
+        with open("/proc/self/cgroup") as f:
+            for line in f:
+                if line.startswith("0::"):
+                    return line[3:].strip()
+    except OSError:
+        pass
+    return "/"
+
+class CgroupReader:
+    """cpu/memory/io/PSI files of the monitor's own cgroup v2 (or any tree, e.g. a fake sysfs for testing)"""
+    FILES = ("cpu.stat", "cpu.max", "cpuset.cpus.effective", "memory.current", "memory.max", "memory.stat",
+             "io.stat", "cpu.pressure", "memory.pressure", "io.pressure")
+
+    def __init__(self, root="/sys/fs/cgroup", path=None):
+        path = own_cgroup_path() if path is None else path
+        directory = os.path.join(root, path.lstrip('/'))
+        if not os.path.isfile(os.path.join(directory, "cgroup.controllers")):
+            # With a private cgroup namespace our cgroup is mounted at the root
+            directory = root
+        if not os.path.isfile(os.path.join(directory, "cgroup.controllers")):
+            raise OSError(f"{root} is not a cgroup v2 hierarchy")
+
+        self.directory = directory
+        self.files = {}
+        for name in self.FILES:
+            try:
+                self.files[name] = PreadFile(os.path.join(directory, name))
+            except OSError:
+                # Controller not enabled for this cgroup
+                pass
+        if "cpu.stat" not in self.files and "memory.current" not in self.files:
+            self.close()
+            raise OSError(f"no cpu/memory accounting in {directory}")
+
+    def read(self, name):
+        f = self.files.get(name)
+        return f.read() if f else None
+
+    def cpu(self):
+        text = self.read("cpu.stat")
+        if text is None:
+            return None
+        stat = dict(line.split() for line in text.splitlines())
+        return CgroupCpu(int(stat.get("usage_usec", 0)), int(stat.get("throttled_usec", 0)))
+
+    def cpu_limit(self):
+        """Cores available to the cgroup: cpu.max quota, else the effective cpuset, else None"""
+        text = self.read("cpu.max")
+        if text:
+            quota, period = text.split()
+            if quota != "max":
+                return int(quota) / int(period)
+        text = self.read("cpuset.cpus.effective")
+        if text and text.strip():
+            count = 0
+            for part in text.strip().split(','):
+                low, _, high = part.partition('-')
+                count += int(high or low) - int(low) + 1
+            return count
+        return None
+
+    def memory(self):
+        """(used bytes, limit bytes or None when unlimited). Used excludes inactive page cache,
+        like `docker stats`, so file I/O under the limit does not read as memory pressure."""
+        current = self.read("memory.current")
+        if current is None:
+            return None
+        used = int(current)
+        stat = self.read("memory.stat")
+        if stat:
+            for line in stat.splitlines():
+                key, _, value = line.partition(' ')
+                if key == "inactive_file":
+                    used = max(0, used - int(value))
+                    break
+        limit = (self.read("memory.max") or "max").strip()
+        return used, None if limit == "max" else int(limit)
+
+    def io(self):
+        text = self.read("io.stat")
+        if text is None:
+            return None
+        totals = dict.fromkeys(CgroupIo._fields, 0)
+        for line in text.splitlines():
+            for field in line.split()[1:]:
+                key, _, value = field.partition('=')
+                if key in totals:
+                    totals[key] += int(value)
+        return CgroupIo(**totals)
+
+    def pressure(self):
+        return {resource: parse_pressure(text) for resource in ("cpu", "memory", "io")
+                if (text := self.read(f"{resource}.pressure"))}
+
+    def close(self):
+        for f in self.files.values():
+            f.close()
+        self.files = {}
+
+class HostPressure:
+    """System-wide PSI from /proc/pressure when no cgroup v2 reader is active"""
+
+    def __init__(self):
+        self.files = {}
+        for resource in ("cpu", "memory", "io"):
+            try:
+                self.files[resource] = PreadFile(f"/proc/pressure/{resource}")
+            except OSError:
+                pass
+
+    def pressure(self):
+        pressure = {}
+        for resource, f in self.files.items():
+            try:
+                pressure[resource] = parse_pressure(f.read())
+            except OSError:
+                # PSI compiled in but disabled (psi=0) fails on read
+                pass
+        return pressure
+
+cgroup = None
+host_pressure = None
+cgroup_cpu_counters = CounterDelta()
+cgroup_io_counters = CounterDelta()
+
+def get_cgroup():
+    """CgroupReader per CONFIG["collector_backend"]: "psutil" never, "cgroup" always, "auto" when available"""
+    global cgroup
+    if cgroup is None:
+        backend = CONFIG["collector_backend"]
+        if backend == "psutil":
+            cgroup = False
+        elif backend == "cgroup":
+            cgroup = CgroupReader(CONFIG["cgroup_root"])
+        else:
+            try:
+                cgroup = CgroupReader(CONFIG["cgroup_root"])
+            except OSError:
+                cgroup = False
+    return cgroup or None
+
+def cgroup_value(method):
+    """CgroupReader.<method>() of the active cgroup reader, None without one"""
+    cg = get_cgroup()
+    return getattr(cg, method)() if cg else None
+
+def read_pressure():
+    global host_pressure
+    cg = get_cgroup()
+    if cg:
+        return cg.pressure()
+    if host_pressure is None:
+        host_pressure = HostPressure()
+    return host_pressure.pressure()
+
+def collect_pressure():
+    return inputs.read("pressure", read_pressure)
+
+def collect_system():
+    try:
+        load1, load5, load15 = inputs.read("loadavg", os.getloadavg)
+    except AttributeError:
+        load1, load5, load15 = 0.0, 0.0, 0.0
+
+    boot_time = datetime.fromtimestamp(inputs.read("boot_time", get_boot_time))
+    uptime = datetime.fromtimestamp(inputs.time()) - boot_time
+
+    return {
+        "load": (load1, load5, load15),
+        "uptime": str(uptime).split('.')[0],
+        "boot_id": inputs.read("boot_id", get_boot_id),
+        "vulkan": inputs.read("vulkan", get_vulkan_info),
+    }
+
+def collect_cpu():
+    # Non-blocking: usage since the previous tick, per core and overall from one cpu_times read
+    topology = inputs.read("cpu_topology", get_cpu_topology)
+    cpu_times = inputs.read("cpu_times", psutil.cpu_times, True)
+    _, deltas = cpu_counters.update(dict(enumerate(cpu_times)), inputs.now())
+    per_core = [cpu_busy_percent(deltas[i]) for i in sorted(deltas)]
+    overall = 0.0
+    if deltas:
+        cores = list(deltas.values())
+        overall = cpu_busy_percent(type(cores[0])(*map(sum, zip(*cores))))
+    cpu_metrics = {
+        "overall_percent": overall,
+        "per_core": per_core,
+        "core_count": topology["core_count"],
+        "thread_count": topology["thread_count"],
+        "scope": "host",
+    }
+
+    usage = inputs.read("cgroup_cpu", cgroup_value, "cpu")
+    if usage is not None:
+        # Percent of the container's CPU allowance rather than of the whole host
+        limit = inputs.read("cgroup_cpu_limit", cgroup_value, "cpu_limit") or topology["thread_count"]
+        time_delta, delta = cgroup_cpu_counters.update({"cpu": usage}, inputs.now())
+        if "cpu" in delta:
+            cpu_metrics["overall_percent"] = round(min(100.0, delta["cpu"].usage_usec / (time_delta * 1e6 * limit) * 100), 1)
+            cpu_metrics["throttled_percent"] = min(100.0, delta["cpu"].throttled_usec / (time_delta * 1e6) * 100)
+        cpu_metrics.update({"scope": "cgroup", "limit_cpus": limit})
+    return cpu_metrics
+
+def collect_memory():
+    memory = inputs.read("virtual_memory", psutil.virtual_memory)
+    swap = inputs.read("swap_memory", psutil.swap_memory)
+    memory_metrics = {
+        "total_gb": memory.total / (1024**3),
+        "used_gb": memory.used / (1024**3),
+        "percent": memory.percent,
+        "swap_percent": swap.percent,
+        "swap_used_gb": swap.used / (1024**3),
+        "scope": "host",
+    }
+
+    usage = inputs.read("cgroup_memory", cgroup_value, "memory")
+    if usage is not None:
+        current, limit = usage
+        # Unlimited cgroups are bounded by the host's RAM
+        limit = min(limit or memory.total, memory.total)
+        memory_metrics.update({
+            "total_gb": limit / (1024**3),
+            "used_gb": current / (1024**3),
+            "percent": round(current / limit * 100, 1),
+            "scope": "cgroup",
+        })
+    return memory_metrics
+
+def collect_disk():
+    disk_usage = inputs.read("disk_usage", psutil.disk_usage, '/')
+    counters = inputs.read("disk_io", psutil.disk_io_counters, True) or {}
+    time_delta, deltas = disk_counters.update(counters, inputs.now())
+
+    devices = {}
+    for name, d in deltas.items():
+        ops = d.read_count + d.write_count
+        devices[name] = {
+            "read_iops": d.read_count / time_delta,
+            "write_iops": d.write_count / time_delta,
+            "read_speed": d.read_bytes / time_delta,
+            "write_speed": d.write_bytes / time_delta,
+            # Average time per completed request over the interval
+            "latency_ms": (d.read_time + d.write_time) / ops if ops else 0.0,
+            "util_percent": min(100.0, getattr(d, "busy_time", 0) / (time_delta * 1000) * 100),
+        }
+
+    disks = whole_disks(counters)
+    disk_metrics = {
+        "percent": disk_usage.percent,
+        "total_gb": disk_usage.total / (1024**3),
         "used_gb": disk_usage.used / (1024**3),
-        "read_speed": read_speed,
-        "write_speed": write_speed,
-        "read_total": disk_io.read_bytes,
-        "write_total": disk_io.write_bytes
+        "read_speed": sum(devices[n]["read_speed"] for n in disks if n in devices),
+        "write_speed": sum(devices[n]["write_speed"] for n in disks if n in devices),
+        "read_total": sum(counters[n].read_bytes for n in disks),
+        "write_total": sum(counters[n].write_bytes for n in disks),
+        "devices": devices,
+        "scope": "host",
     }
-    
-    recv_speed = (net_io.bytes_recv - last_net["recv"]) / time_delta if time_delta > 0 else 0
-    sent_speed = (net_io.bytes_sent - last_net["sent"]) / time_delta if time_delta > 0 else 0
-    
-    last_net = {"recv": net_io.bytes_recv, "sent": net_io.bytes_sent, "time": current_time}
-    
-    metrics["network"] = {
-        "recv_total": net_io.bytes_recv,
-        "sent_total": net_io.bytes_sent,
-        "recv_speed": recv_speed,
-        "sent_speed": sent_speed,
-        "packets": f"{net_io.packets_recv} RX / {net_io.packets_sent} TX"
+
+    io = inputs.read("cgroup_io", cgroup_value, "io")
+    if io is not None:
+        # Aggregates from the cgroup's io.stat; the per-device breakdown stays host-wide
+        io_delta_time, io_delta = cgroup_io_counters.update({"io": io}, inputs.now())
+        disk_metrics.update({
+            "read_speed": io_delta["io"].rbytes / io_delta_time if io_delta else 0.0,
+            "write_speed": io_delta["io"].wbytes / io_delta_time if io_delta else 0.0,
+            "read_total": io.rbytes,
+            "write_total": io.wbytes,
+            "scope": "cgroup",
+        })
+    return disk_metrics
+
+def collect_network():
+    counters = inputs.read("net_io", psutil.net_io_counters, True)
+    time_delta, deltas = net_counters.update(counters, inputs.now())
+
+    interfaces = {
+        name: {
+            "recv_speed": d.bytes_recv / time_delta,
+            "sent_speed": d.bytes_sent / time_delta,
+            "packets_recv_rate": d.packets_recv / time_delta,
+            "packets_sent_rate": d.packets_sent / time_delta,
+            "errors": d.errin + d.errout,
+            "drops": d.dropin + d.dropout,
+        }
+        for name, d in deltas.items()
     }
-    
-    # Process Analysis (Expanded Categorization)
-    processes = []
-    for proc in sorted(psutil.process_iter(['pid', 'name', 'cpu_percent', 'memory_percent', 'cmdline']), 
-                       key=lambda p: p.info['cpu_percent'] + p.info['memory_percent'], 
-                       reverse=True)[:7]:
-        try:
-            cat = "SYSTEM"
-            name = proc.info['name'].lower()
-            cmdline = " ".join(proc.info.get('cmdline', [])).lower()
-            full_check = name + " " + cmdline
-            
-            if any(x in full_check for x in ['g++', 'clang', 'cmake', 'make', 'ninja', 'gcc', 'ld']): cat = "BUILD"
-            elif any(x in full_check for x in ['python', 'jupyter', 'qmemscanner']): cat = "SCRIPT/AI"
-            elif any(x in full_check for x in ['qt', 'qml', 'vulkan', 'gl', 'wayland', 'xorg']): cat = "ENGINE/GUI"
-            elif any(x in full_check for x in ['postgres', 'pg_']): cat = "DATABASE"
-            elif any(x in full_check for x in ['docker', 'containerd']): cat = "CONTAINER"
-            elif any(x in full_check for x in ['pacman', 'yay']): cat = "PKG_MGR"
-            
-            processes.append({
-                "pid": proc.info['pid'],
-                "name": proc.info['name'],
-                "cpu_percent": proc.info['cpu_percent'],
-                "memory_percent": proc.info['memory_percent'],
-                "category": cat
-            })
-        except (psutil.NoSuchProcess, psutil.AccessDenied):
-            pass
-    metrics["top_processes"] = processes
+
+    nics = counters.values()
+    packets_recv = sum(n.packets_recv for n in nics)
+    packets_sent = sum(n.packets_sent for n in nics)
+    return {
+        "recv_total": sum(n.bytes_recv for n in nics),
+        "sent_total": sum(n.bytes_sent for n in nics),
+        "recv_speed": sum(i["recv_speed"] for i in interfaces.values()),
+        "sent_speed": sum(i["sent_speed"] for i in interfaces.values()),
+        "packets": f"{packets_recv} RX / {packets_sent} TX",
+        "interfaces": interfaces
+    }
+
+# Process categorization
+# Ordered category -> token patterns; earlier categories win. Patterns are regexes matched
+# against whole tokens of the name/cmdline, so 'ld' no longer matches 'build' or 'world'.
+DEFAULT_CATEGORY_RULES = {
+    "BUILD": [r"g\+\+(-\d+)?", r"c\+\+", r"cc1(plus)?", r"clang(\+\+)?(-\d+)?", r"cmake", r"g?make",
+              r"ninja", r"gcc(-\d+)?", r"ld", r"ld\.\w+", r"lld", r"collect2", r"ccache", r"cargo", r"rustc"],
+    "SCRIPT/AI": [r"python[\d.]*", r"jupyter(-[\w-]+)?", r"qmemscanner"],
+    "ENGINE/GUI": [r"qt\w*", r"qml\w*", r"vulkan\w*", r"vkcube", r"glx\w*", r"glfw\w*", r"opengl\w*",
+                   r"wayland", r"xwayland", r"xorg"],
+    "DATABASE": [r"postgres\w*", r"pg_\w+"],
+    "CONTAINER": [r"docker\w*", r"containerd(-[\w-]+)?"],
+    "PKG_MGR": [r"pacman", r"yay", r"apt(-get)?", r"dpkg"],
+}
+
+class CategoryEngine:
+    """Compiles every category rule into one alternation and memoizes results per
+    (pid, create_time), so each process is classified once in its lifetime"""
+    TOKEN_SPLIT = re.compile(r"[\s/=:,;]+")
+
+    def __init__(self, rules=None, default="SYSTEM"):
+        self.rules = rules or DEFAULT_CATEGORY_RULES
+        self.default = default
+        self.categories = list(self.rules)
+        self.pattern = re.compile("|".join(
+            f"(?P<c{i}>{'|'.join(patterns)})" for i, patterns in enumerate(self.rules.values())
+        ))
+        self.cache = {}
+
+    @classmethod
+    def from_file(cls, path):
+        """JSON file: {"default": "SYSTEM", "rules": {"CATEGORY": ["token regex", ...], ...}}"""
+        with open(path) as f:
+            config = json.load(f)
+        return cls(config["rules"], config.get("default", "SYSTEM"))
+
+    def match(self, name, cmdline):
+        best = len(self.categories)
+        for token in set(self.TOKEN_SPLIT.split(" ".join([name, *(cmdline or [])]).lower())):
+            m = self.pattern.fullmatch(token)
+            if m:
+                # Alternation order already prefers the higher priority category for this token
+                best = min(best, int(m.lastgroup[1:]))
+                if best == 0:
+                    break
+        return self.categories[best] if best < len(self.categories) else self.default
+
+    def classify(self, key, name, cmdline):
+        category = self.cache.get(key)
+        if category is None:
+            category = self.cache[key] = self.match(name, cmdline)
+        return category
+
+    def forget(self, key):
+        self.cache.pop(key, None)
+
+category_engine = CategoryEngine()
+
+def ns_pids(pid, proc_root="/proc"):
+    """NSpid of a process: its PID in every namespace from the /proc mount's down to its own"""
+    try:
+        with open(f"{proc_root}/{pid}/status") as f:
+            for line in f:
+                if line.startswith("NSpid:"):
+                    return [int(p) for p in line.split()[1:]]
+    except (OSError, ValueError):
+        pass
+    return []
+
+def in_host_pid_namespace(proc_root="/proc"):
+    """Kernel threads (kthreadd is PID 2) are only visible from the initial PID namespace"""
+    try:
+        with open(f"{proc_root}/2/comm") as f:
+            return f.read().strip() == "kthreadd"
+    except OSError:
+        return False
+
+class ProcessTable:
+    """PID-keyed table of live Process objects kept across ticks.
+    Static fields (name, cmdline, category) are read once when a PID first appears; every tick
+    only refreshes cpu/memory, and cpu_percent is a real delta because the object persists.
+    While a collector run is recorded, update() hands the rows it read to `inputs` as "processes"."""
+
+    def __init__(self, pid_source=psutil.pids, process_factory=psutil.Process, host_namespace=None, ns_source=ns_pids):
+        self.pid_source = pid_source
+        self.process_factory = process_factory
+        self.ns_source = ns_source
+        self.entries = {}
+        self.gpu_pids = set()
+        # NVML and nvidia-smi report host PIDs. Outside the host PID namespace (a container without
+        # --pid=host) they are mapped through NSpid, never joined directly: an unrelated local
+        # process may have the same number.
+        self.host_namespace = in_host_pid_namespace() if host_namespace is None else host_namespace
+        self.host_pids = {}
+
+    def _add(self, pid, added=None):
+        proc = self.process_factory(pid)
+        with proc.oneshot():
+            name = proc.name()
+            key = (pid, proc.create_time())
+            try:
+                cmdline = proc.cmdline()
+            except psutil.AccessDenied:
+                cmdline = []
+            # First call only arms the counter, the next tick yields a real value
+            proc.cpu_percent(interval=None)
+        host_pid = pid
+        if not self.host_namespace:
+            outer = self.ns_source(pid)
+            # More than one level is only visible when /proc comes from an ancestor namespace
+            host_pid = outer[0] if len(outer) > 1 else None
+            if host_pid is not None:
+                self.host_pids[host_pid] = pid
+        if added is not None:
+            added.append([pid, name, cmdline, key[1], host_pid])
+        return {
+            "pid": pid,
+            "key": key,
+            "name": name,
+            "category": category_engine.classify(key, name, cmdline),
+            "proc": proc,
+            "cpu_percent": 0.0,
+            "memory_percent": 0.0,
+            "gpu_memory_mb": 0.0,
+            "gpu_sm_percent": None,
+            "vram_trend": None,
+        }
+
+    def update(self):
+        live = set(self.pid_source())
+        # New processes as [pid, name, cmdline, create_time, host pid], kept only for a recording
+        added = [] if inputs.capturing() else None
+        for pid in self.entries.keys() - live:
+            category_engine.forget(self.entries.pop(pid)["key"])
+        if self.host_pids:
+            self.host_pids = {host: pid for host, pid in self.host_pids.items() if pid in self.entries}
+
+        for pid in live:
+            entry = self.entries.get(pid)
+            try:
+                if entry is None:
+                    self.entries[pid] = self._add(pid, added)
+                    continue
+                proc = entry["proc"]
+                with proc.oneshot():
+                    entry["cpu_percent"] = proc.cpu_percent(interval=None)
+                    entry["memory_percent"] = proc.memory_percent()
+            except (psutil.NoSuchProcess, psutil.ZombieProcess):
+                if pid in self.entries:
+                    category_engine.forget(self.entries.pop(pid)["key"])
+            except psutil.AccessDenied:
+                pass
+
+        if added is not None:
+            inputs.read("processes", self.trace_rows, added)
+
+    def trace_rows(self, added):
+        """What this update read, enough for ReplayProcesses to rebuild it"""
+        new = {row[0] for row in added}
+        return {
+            "pids": list(self.entries),
+            "new": [row for row in added if row[0] in self.entries],
+            "load": [[pid, e["cpu_percent"], e["memory_percent"]] for pid, e in self.entries.items() if pid not in new],
+        }
+
+    def local_entry(self, host_pid):
+        """Table entry of a host-namespace PID, None when it is not one of ours"""
+        if self.host_namespace:
+            return self.entries.get(host_pid)
+        pid = self.host_pids.get(host_pid)
+        return self.entries.get(pid) if pid is not None else None
+
+    def attach_gpu(self, t, usage):
+        """Join per-process GPU usage sampled at `t` onto the table through the PID index.
+        Costs O(GPU processes), not O(table); each entry keeps a VRAM trend so leaks show as a slope."""
+        for pid in self.gpu_pids - usage.keys():
+            entry = self.local_entry(pid)
+            if entry is not None:
+                entry["gpu_memory_mb"], entry["gpu_sm_percent"] = 0.0, None
+        for pid, gpu in usage.items():
+            entry = self.local_entry(pid)
+            if entry is None:
+                continue
+            entry["gpu_memory_mb"], entry["gpu_sm_percent"] = gpu["gpu_memory_mb"], gpu["gpu_sm_percent"]
+            if entry["vram_trend"] is None:
+                entry["vram_trend"] = TrendEstimator(CONFIG["trend_mode"], CONFIG["trend_window"])
+            # Repeated calls with the same sample time are ignored by the estimator
+            entry["vram_trend"].update(t, gpu["gpu_memory_mb"])
+        self.gpu_pids = set(usage)
+
+    def row(self, entry):
+        row = {k: entry[k] for k in ("pid", "name", "cpu_percent", "memory_percent", "category", "gpu_memory_mb", "gpu_sm_percent")}
+        row["gpu_memory_slope"] = entry["vram_trend"].slope() if entry["vram_trend"] else 0.0
+        return row
+
+    def top(self, n, by="load"):
+        # O(P log N) heap selection instead of sorting the whole table
+        if by == "vram":
+            key = lambda e: (e["gpu_memory_mb"], e["cpu_percent"] + e["memory_percent"])
+        else:
+            key = lambda e: e["cpu_percent"] + e["memory_percent"]
+        return [self.row(e) for e in heapq.nlargest(n, self.entries.values(), key=key)]
+
+    def gpu_rows(self, usage):
+        """GPU processes largest VRAM first, named from the table; PIDs outside our namespace stay unnamed"""
+        rows = []
+        for pid, gpu in usage.items():
+            entry = self.local_entry(pid)
+            if entry is not None:
+                rows.append({**self.row(entry), **gpu})
+            else:
+                rows.append({"pid": pid, "name": "?", "category": "UNKNOWN", "cpu_percent": 0.0, "memory_percent": 0.0,
+                             "gpu_memory_slope": 0.0, **gpu})
+        return sorted(rows, key=lambda r: r["gpu_memory_mb"], reverse=True)
+
+process_table = ProcessTable()
+
+# Latest per-process GPU sample as (time, {pid: usage}), replaced whole by collect_gpu_processes
+gpu_process_sample = (0.0, {})
+
+def collect_processes():
+    process_table.update()
+    process_table.attach_gpu(*gpu_process_sample)
+    return process_table.top(CONFIG["top_processes"], CONFIG["process_sort"])
+
+def collect_gpu_processes():
+    global gpu_process_sample
+    try:
+        usage = inputs.read("gpu_processes", lambda: get_gpu_backend().processes())
+    except (OSError, RuntimeError, ValueError, sp.SubprocessError) as e:
+        profiler.error("gpu_processes", exception_status(e))
+        usage = {}
+    gpu_process_sample = (inputs.time(), usage)
+    return process_table.gpu_rows(usage)
+
+class SyntheticProcess:
+    """psutil.Process stand-in used by the process table benchmark"""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.rng = random.Random(pid)
+        self._name = self.rng.choice(["cc1plus", "ninja", "python3", "qtcreator", "bash", "ld.lld", "clangd"])
+
+    @contextlib.contextmanager
+    def oneshot(self):
+        yield
+
+    def name(self):
+        return self._name
+
+    def cmdline(self):
+        return [self._name, f"/workspace/src/file_{self.pid}.cpp", "-O2", "-c"]
+
+    def cpu_percent(self, interval=None):
+        return self.rng.random() * 100
+
+    def memory_percent(self):
+        return self.rng.random() * 2
+
+    def create_time(self):
+        return 0.0
+
+def bench_processes(count=5000, ticks=20):
+    """Per-tick cost of the persistent process table vs recreating and sorting every process"""
+    pids = list(range(1, count + 1))
+
+    table = ProcessTable(pid_source=lambda: pids, process_factory=SyntheticProcess, host_namespace=True)
+    table.update()
+    start = time.perf_counter()
+    for _ in range(ticks):
+        table.update()
+        table.top(CONFIG["top_processes"])
+    table_ms = (time.perf_counter() - start) / ticks * 1000
+
+    start = time.perf_counter()
+    for _ in range(ticks):
+        rows = []
+        for pid in pids:
+            proc = SyntheticProcess(pid)
+            name, cmdline = proc.name(), proc.cmdline()
+            rows.append((proc.cpu_percent() + proc.memory_percent(), pid, category_engine.match(name, cmdline)))
+        sorted(rows, reverse=True)[:CONFIG["top_processes"]]
+    rescan_ms = (time.perf_counter() - start) / ticks * 1000
+
+    print(f"{UI.BOLD}Process tracking, {count} synthetic processes ({ticks} ticks){UI.ENDC}")
+    print(f" Recreate + sort all: {rescan_ms:8.2f} ms/tick")
+    print(f" Persistent table:    {table_ms:8.2f} ms/tick")
+    print(f" Speedup:             {rescan_ms / table_ms if table_ms > 0 else float('inf'):8.1f}x")
+
+# metrics key -> collector, sampled at CONFIG["collector_intervals"][key]
+COLLECTORS = {
+    "system": collect_system,
+    "cpu": collect_cpu,
+    "memory": collect_memory,
+    "gpu": get_gpu_metrics,
+    "disk": collect_disk,
+    "network": collect_network,
+    "top_processes": collect_processes,
+    "gpu_processes": collect_gpu_processes,
+    "pressure": collect_pressure,
+}
+
+def record_metric(name, value, t):
+    with history_lock:
+        trend = get_trend(name)  # primed from stored history before this sample lands
+        history.append(name, value, t)
+        trend.update(t, float(value))
+
+def record_sample(key, value, t):
+    """History/trend series fed by one collector's sample, stamped with that sample's own time"""
+    if key == "cpu":
+        record_metric("cpu", value["overall_percent"], t)
+        for core, percent in enumerate(value.get("per_core", [])):
+            record_metric(f"cpu{core}", percent, t)
+    elif key == "memory":
+        record_metric("memory", value["percent"], t)
+    elif key == "gpu":
+        record_metric("gpu_util", value["utilization"], t)
+        record_metric("gpu_memory", value["memory_percent"], t)
+        for dev in value["devices"]:
+            record_metric(f"gpu{dev['index']}_util", dev["utilization"], t)
+            record_metric(f"gpu{dev['index']}_memory", dev["memory_percent"], t)
+
+def record_history(metrics, t=None):
+    t = t or time.time()
+    for key in ("cpu", "memory", "gpu"):
+        record_sample(key, metrics[key], t)
+
+def sparkline_data(name):
+    size = CONFIG["history_size"]
+    with history_lock:
+        if CONFIG["sparkline_window"]:
+            return history.resample(name, CONFIG["sparkline_window"], size)
+        values = history.last(name, size)
+    return [0] * (size - len(values)) + values
+
+def get_system_metrics():
+    """Runs every collector once, in series. The dashboard loop uses CollectorPipeline instead."""
+    metrics = {key: collector() for key, collector in COLLECTORS.items()}
+    record_history(metrics)
     return metrics
 
-def print_dashboard(metrics):
-    os.system('clear' if os.name == 'posix' else 'cls')
+def sampling_signal(key, value):
+    """(fraction of the alert threshold, level used for rate-of-change) for collectors that adapt"""
+    thresholds = CONFIG["alert_thresholds"]
+    if key == "cpu":
+        return value["overall_percent"] / thresholds["cpu"], value["overall_percent"]
+    if key == "memory":
+        return value["percent"] / thresholds["memory"], value["percent"]
+    if key == "gpu" and value["available"]:
+        ratio = max(value["memory_percent"] / thresholds["gpu_memory"], value["temperature"] / thresholds["gpu_temp"])
+        return ratio, max(value["utilization"], value["memory_percent"])
+    if key == "disk":
+        return value["percent"] / thresholds["disk"], value["percent"]
+    return None
+
+class AdaptiveSampler:
+    """Per-collector sampling intervals that shrink near alert thresholds or on fast changes and
+    grow while values are stable, all scaled up when the monitor exceeds its own CPU budget"""
+
+    def __init__(self, base_intervals, min_factor=0.25, max_factor=8.0, cpu_budget=2.0):
+        self.base = dict(base_intervals)
+        self.min_factor = min_factor
+        self.max_factor = max_factor
+        self.cpu_budget = cpu_budget
+        self.factors = {key: 1.0 for key in self.base}
+        self.levels = {}
+        self.budget_factor = 1.0
+        self.self_cost = 0.0
+        self.last_wall = time.monotonic()
+        self.last_cpu = time.process_time()
+
+    def observe(self, key, value):
+        signal_value = sampling_signal(key, value)
+        if signal_value is None:
+            return
+        ratio, level = signal_value
+        change = abs(level - self.levels.get(key, level))
+        self.levels[key] = level
+        factor = self.factors.get(key, 1.0)
+        if ratio >= 0.9 or change >= 5:
+            factor /= 2
+        elif ratio < 0.7 and change < 1:
+            factor *= 1.5
+        else:
+            # Neither hot nor idle: drift back to the base interval
+            factor = 1.0 + (factor - 1.0) / 2
+        self.factors[key] = min(self.max_factor, max(self.min_factor, factor))
+
+    def update_budget(self):
+        """Measures the process' own CPU share since the last call and adjusts the global back-off"""
+        now, cpu = time.monotonic(), time.process_time()
+        wall = now - self.last_wall
+        if wall < 1.0:
+            return
+        self.self_cost = (cpu - self.last_cpu) / wall * 100
+        self.last_wall, self.last_cpu = now, cpu
+        if self.self_cost > self.cpu_budget:
+            self.budget_factor = min(self.max_factor, self.budget_factor * 1.5)
+        else:
+            self.budget_factor = max(1.0, self.budget_factor / 1.2)
+
+    def interval(self, key):
+        return self.base.get(key, 1.0) * self.factors.get(key, 1.0) * self.budget_factor
+
+    def fastest(self, keys=("cpu", "memory", "gpu")):
+        return min(self.interval(key) for key in keys if key in self.base)
+
+    def report(self):
+        return {
+            "cpu_percent": self.self_cost,
+            "budget_percent": self.cpu_budget,
+            "budget_factor": self.budget_factor,
+            "intervals": {key: self.interval(key) for key in self.base},
+        }
+
+class LatencyHistogram:
+    """Log-spaced buckets from 50 us to ~80 s (quarter-octave steps, <19% quantile error), O(1) memory"""
+    BOUNDS = tuple(5e-5 * 2 ** (i / 4) for i in range(84))
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect.bisect_left(self.BOUNDS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the q-th sample, capped at the largest value seen"""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.BOUNDS[i] if i < len(self.BOUNDS) else self.max, self.max)
+        return self.max
+
+class SelfProfiler:
+    """What the monitor itself costs: latency histograms per collector and for rendering, error
+    counters by status, and on demand a cProfile + tracemalloc capture of the collector threads"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.errors = {}
+        # Deep profiling: one cProfile.Profile per thread, merged when dumped
+        self.deep = False
+        self.local = threading.local()
+        self.profiles = []
+
+    def observe(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = LatencyHistogram()
+            histogram.observe(seconds)
+
+    def error(self, name, status):
+        with self.lock:
+            counts = self.errors.setdefault(name, {})
+            counts[status] = counts.get(status, 0) + 1
+
+    def call(self, name, fn, *args):
+        """Runs fn under the latency histogram `name`, and under cProfile while deep profiling"""
+        start = time.perf_counter()
+        try:
+            if not self.deep:
+                return fn(*args)
+            profile = getattr(self.local, "profile", None)
+            if profile is None:
+                profile = self.local.profile = cProfile.Profile()
+                with self.lock:
+                    self.profiles.append(profile)
+            return profile.runcall(fn, *args)
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def start_deep(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(10)
+        self.deep = True
+
+    def dump(self, directory):
+        """Writes <prefix>.prof (pstats) and <prefix>.txt (top allocations); returns the paths"""
+        prefix = os.path.join(directory, f"vulkan-dev-monitor-{os.getpid()}-{int(time.time())}")
+        paths = []
+        with self.lock:
+            profiles = list(self.profiles)
+        if profiles:
+            stats = pstats.Stats(profiles[0])
+            for profile in profiles[1:]:
+                stats.add(profile)
+            stats.dump_stats(prefix + ".prof")
+            paths.append(prefix + ".prof")
+        if tracemalloc.is_tracing():
+            top = tracemalloc.take_snapshot().statistics("lineno")[:30]
+            current, peak = tracemalloc.get_traced_memory()
+            with open(prefix + ".txt", "w") as f:
+                f.write(f"traced memory: {current / 1024:.0f} KiB, peak {peak / 1024:.0f} KiB\n")
+                f.writelines(f"{stat}\n" for stat in top)
+            paths.append(prefix + ".txt")
+        return paths
+
+    def report(self):
+        with self.lock:
+            return {
+                "latency": {name: {
+                    "count": h.count,
+                    "mean_ms": h.total / h.count * 1000 if h.count else 0.0,
+                    "p50_ms": h.quantile(0.5) * 1000,
+                    "p99_ms": h.quantile(0.99) * 1000,
+                    "max_ms": h.max * 1000,
+                } for name, h in self.histograms.items()},
+                "errors": {name: dict(counts) for name, counts in self.errors.items()},
+                "deep": self.deep,
+            }
+
+profiler = SelfProfiler()
+
+def format_profile(report):
+    """Plain-text table of a profiler report, slowest p99 first"""
+    rows = [f"{'source':<16} {'runs':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}  errors"]
+    for name, h in sorted(report["latency"].items(), key=lambda item: item[1]["p99_ms"], reverse=True):
+        errors = " ".join(f"{status}={n}" for status, n in report["errors"].get(name, {}).items())
+        rows.append(f"{name:<16} {h['count']:>7} {h['p50_ms']:>8.2f} {h['p99_ms']:>8.2f} {h['max_ms']:>8.2f}  {errors}")
+    for name in report["errors"].keys() - report["latency"].keys():
+        rows.append(f"{name:<16} {'':>7} {'':>8} {'':>8} {'':>8}  " + " ".join(f"{s}={n}" for s, n in report["errors"][name].items()))
+    return rows
+
+def profile_signal_handler(sig, frame):
+    # First SIGUSR1 starts cProfile + tracemalloc, every later one writes a dump
+    if not profiler.deep:
+        profiler.start_deep()
+        print(f"{UI.YELLOW}Deep profiling on; send the signal again to dump{UI.ENDC}", file=sys.stderr)
+        return
+    for path in profiler.dump(CONFIG["profile_dir"]):
+        print(f"{UI.YELLOW}Profile written to {path}{UI.ENDC}", file=sys.stderr)
+
+class CollectorPipeline:
+    """Runs each collector on its own interval in a thread pool and publishes into a shared snapshot.
+    A collector is never queued twice, so a slow source (nvidia-smi) only delays itself."""
+
+    def __init__(self, collectors=None, intervals=None, sampler=None, recorder=None):
+        self.collectors = collectors or COLLECTORS
+        self.intervals = intervals or CONFIG["collector_intervals"]
+        self.sampler = sampler
+        self.recorder = recorder
+        self.pool = ThreadPoolExecutor(max_workers=len(self.collectors), thread_name_prefix="collector")
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.metrics = {}
+        self.updated = {}
+        self.errors = {}
+        self.in_flight = set()
+        self.next_due = {key: 0.0 for key in self.collectors}
+        self.scheduler = threading.Thread(target=self._schedule, name="collector-scheduler", daemon=True)
+
+    def start(self):
+        self.scheduler.start()
+        return self
+
+    def _run(self, key):
+        try:
+            # A recording keeps the raw inputs the collector read, not the metrics it derived
+            with inputs.capture() if self.recorder else contextlib.nullcontext() as captured:
+                value = profiler.call(key, self.collectors[key])
+            with self.lock:
+                self.metrics[key] = value
+                self.updated[key] = time.time()
+                self.errors.pop(key, None)
+                if self.sampler:
+                    self.sampler.observe(key, value)
+            record_sample(key, value, self.updated[key])
+            if self.recorder:
+                self.recorder.write(key, captured, self.updated[key])
+        except Exception as e:
+            # Keep publishing the last good value, surface the failure separately
+            profiler.error(key, type(e).__name__)
+            with self.lock:
+                self.errors[key] = str(e)
+        finally:
+            with self.lock:
+                self.in_flight.discard(key)
+
+    def _schedule(self):
+        while not self.stop_event.is_set():
+            now = time.monotonic()
+            for key in self.collectors:
+                if now >= self.next_due[key] and key not in self.in_flight:
+                    with self.lock:
+                        self.in_flight.add(key)
+                    self.next_due[key] = now + self.interval(key)
+                    self.pool.submit(self._run, key)
+            if self.sampler:
+                self.sampler.update_budget()
+            self.stop_event.wait(max(0.01, min(self.next_due.values()) - time.monotonic()))
+
+    def interval(self, key):
+        return self.sampler.interval(key) if self.sampler else self.intervals.get(key, 1.0)
+
+    def tick_interval(self, ceiling):
+        """How often consumers should take a snapshot: follows the fastest adaptive collector"""
+        if not self.sampler:
+            return ceiling
+        return min(ceiling, max(0.25, self.sampler.fastest()))
+
+    def snapshot(self):
+        with self.lock:
+            metrics = dict(self.metrics)
+            metrics["sampled_at"] = dict(self.updated)
+            if self.sampler:
+                metrics["monitor"] = self.sampler.report()
+        metrics["profile"] = profiler.report()
+        return metrics
+
+    def ready(self):
+        with self.lock:
+            return all(key in self.metrics for key in self.collectors)
+
+    def wait_ready(self, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not self.ready() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        return self.ready()
+
+    def stop(self):
+        self.stop_event.set()
+        self.pool.shutdown(wait=False, cancel_futures=True)
+
+def format_vram_slope(slope):
+    """Per-process VRAM growth suffix, blank while flat"""
+    if abs(slope) < 1:
+        return ""
+    return f" {UI.RED if slope > 0 else UI.GREEN}({slope:+.0f}/min){UI.ENDC}"
+
+def build_frame(metrics, width=72):
+    """Renders the dashboard into a list of lines, `width` columns wide including the borders"""
+    lines = []
+    out = lines.append
+    inner = width - 2
     now = datetime.now().strftime("%H:%M:%S")
-    vulkan = get_vulkan_info()
+    # From the system snapshot, so a replayed frame shows the recorded host's devices
+    vulkan = metrics["system"].get("vulkan") or {}
     
-    print(f"{UI.PURPLE}{UI.TL}{UI.H*70}{UI.TR}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}{UI.CYAN}⚡ VULKAN-DEV TELEMETRY DASHBOARD ⚡{UI.ENDC}".ljust(79) + f"{UI.PURPLE}{UI.V}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.TL}{UI.H*inner}{UI.TR}{UI.ENDC}")
+    title = f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}{UI.CYAN}⚡ VULKAN-DEV TELEMETRY DASHBOARD ⚡{UI.ENDC}"
+    out(title + " " * max(0, width - 1 - visible_len(title)) + f"{UI.PURPLE}{UI.V}{UI.ENDC}")
+    
+    for alert in metrics.get("alerts", []):
+        alert_color = UI.RED if alert["severity"] == "critical" else UI.ORANGE
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {alert_color}{UI.BOLD}⚠ {alert['rule']}{UI.ENDC}{alert_color}: {alert['metric']} = {alert['value']:.1f} (threshold {alert['threshold']:g}){UI.ENDC}")
     
     # 0. SYSTEM OVERVIEW
     sys_info = metrics["system"]
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}SYSTEM STATE{UI.ENDC} [{now}]")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Uptime:    {sys_info['uptime']}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Load Avg:  {sys_info['load'][0]:.2f} (1m) | {sys_info['load'][1]:.2f} (5m) | {sys_info['load'][2]:.2f} (15m)")
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}SYSTEM STATE{UI.ENDC} [{now}]")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Uptime:    {sys_info['uptime']}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Load Avg:  {sys_info['load'][0]:.2f} (1m) | {sys_info['load'][1]:.2f} (5m) | {sys_info['load'][2]:.2f} (15m)")
+    
+    monitor = metrics.get("monitor")
+    if monitor:
+        cost_color = UI.RED if monitor["cpu_percent"] > monitor["budget_percent"] else UI.GREY
+        rates = " ".join(f"{k} {monitor['intervals'][k]:.1f}s" for k in ("cpu", "memory", "gpu", "disk") if k in monitor["intervals"])
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Monitor:   {cost_color}{monitor['cpu_percent']:.1f}% CPU (budget {monitor['budget_percent']:g}%){UI.ENDC} | {UI.GREY}{rates}{UI.ENDC}")
+    
+    pressure = metrics.get("pressure", {})
+    if pressure:
+        psi = " | ".join(f"{r} {p['some']['avg10']:.1f}%" for r, p in pressure.items() if "some" in p)
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Pressure:  {psi} {UI.GREY}(PSI some, avg10){UI.ENDC}")
     
     if vulkan.get('api_version'):
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Vulkan API: {vulkan['api_version']} | Devices: {len(vulkan.get('devices', []))}")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Vulkan API: {vulkan['api_version']} | Devices: {len(vulkan.get('devices', []))}")
 
     # 1. CORE COMPUTE
     cpu = metrics["cpu"]
-    cpu_pred = predictive_analysis(history["cpu"], "CPU", CONFIG["alert_thresholds"]["cpu"])
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}CORE COMPUTE{UI.ENDC} ({cpu['core_count']} Physical / {cpu['thread_count']} Logical)")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} CPU Load:  {generate_progress_bar(cpu['overall_percent'], 25)} {cpu['overall_percent']:>5.1f}%")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} History:   [{generate_sparkline(history['cpu'])}] {cpu_pred}")
+    cpu_pred = predictive_analysis(get_trend("cpu"), "CPU", CONFIG["alert_thresholds"]["cpu"])
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    cpu_scope = f" {UI.GREY}[cgroup: {cpu['limit_cpus']:g} CPUs]{UI.ENDC}" if cpu.get("scope") == "cgroup" else ""
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}CORE COMPUTE{UI.ENDC} ({cpu['core_count']} Physical / {cpu['thread_count']} Logical){cpu_scope}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} CPU Load:  {generate_progress_bar(cpu['overall_percent'], 25)} {cpu['overall_percent']:>5.1f}%")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} History:   [{generate_sparkline(sparkline_data('cpu'))}] {cpu_pred}")
+    if cpu.get("throttled_percent", 0) > 0:
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Throttled: {UI.ORANGE}{cpu['throttled_percent']:.1f}% of wall time (cpu.max quota){UI.ENDC}")
+    per_core = cpu.get("per_core", [])
+    # Per-core and per-GPU VRAM slopes, scored in one batched call
+    devices = metrics["gpu"]["devices"] if metrics["gpu"]["available"] else []
+    slopes = score_trends([f"cpu{core}" for core in range(len(per_core))] +
+                          [f"gpu{dev['index']}_memory" for dev in devices]) if len(per_core) > 1 or len(devices) > 1 else {}
+    if len(per_core) > 1:
+        # One glyph per logical core, wrapped to the box width
+        row_width = max(8, inner - 36)
+        hottest = max(range(len(per_core)), key=per_core.__getitem__)
+        for start in range(0, len(per_core), row_width):
+            label = "Per Core:" if start == 0 else ""
+            suffix = f" max {per_core[hottest]:.0f}% (cpu{hottest})" if start == 0 else ""
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {label:<10} [{generate_sparkline(per_core[start:start + row_width])}]{suffix}")
+        steepest = sorted(range(len(per_core)), key=lambda core: abs(slopes[f"cpu{core}"]), reverse=True)[:3]
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Slopes:    " + ", ".join(f"cpu{core} {slopes[f'cpu{core}']:+.1f}%/min" for core in steepest))
     
     # 2. MEMORY SUBSYSTEM
     mem = metrics["memory"]
-    mem_pred = predictive_analysis(history["memory"], "RAM", CONFIG["alert_thresholds"]["memory"])
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}MEMORY SUBSYSTEM{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} RAM Usage: {generate_progress_bar(mem['percent'], 25)} {mem['percent']:>5.1f}%")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} History:   [{generate_sparkline(history['memory'])}] {mem_pred}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} RAM Cap:   {UI.CYAN}{mem['used_gb']:.2f} GB / {mem['total_gb']:.2f} GB{UI.ENDC}")
+    mem_pred = predictive_analysis(get_trend("memory"), "RAM", CONFIG["alert_thresholds"]["memory"])
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    mem_scope = f" {UI.GREY}[cgroup]{UI.ENDC}" if mem.get("scope") == "cgroup" else ""
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}MEMORY SUBSYSTEM{UI.ENDC}{mem_scope}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} RAM Usage: {generate_progress_bar(mem['percent'], 25)} {mem['percent']:>5.1f}%")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} History:   [{generate_sparkline(sparkline_data('memory'))}] {mem_pred}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} RAM Cap:   {UI.CYAN}{mem['used_gb']:.2f} GB / {mem['total_gb']:.2f} GB{UI.ENDC}")
     if mem['swap_used_gb'] > 0:
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Swap Use:  {UI.ORANGE}{mem['swap_used_gb']:.2f} GB ({mem['swap_percent']}%) - Watch for paging!{UI.ENDC}")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Swap Use:  {UI.ORANGE}{mem['swap_used_gb']:.2f} GB ({mem['swap_percent']}%) - Watch for paging!{UI.ENDC}")
 
     # 3. GRAPHICS SUBSYSTEM
     gpu = metrics["gpu"]
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}GRAPHICS SUBSYSTEM{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}GRAPHICS SUBSYSTEM{UI.ENDC} {UI.GREY}[{gpu['backend']}]{UI.ENDC}")
     
     if gpu["available"]:
-        gpu_pred = predictive_analysis(history["gpu_memory"], "VRAM", CONFIG["alert_thresholds"]["gpu_memory"])
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} GPU Core:  {generate_progress_bar(gpu['utilization'], 25)} {gpu['utilization']:>5.1f}%")
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} VRAM Use:  {generate_progress_bar(gpu['memory_percent'], 25)} {gpu['memory_percent']:>5.1f}%")
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} VRAM Cap:  {UI.CYAN}{gpu['memory_used_mb']:.0f} MB / {gpu['memory_total_mb']:.0f} MB{UI.ENDC}")
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} History:   [{generate_sparkline(history['gpu_memory'])}] {gpu_pred}")
+        gpu_pred = predictive_analysis(get_trend("gpu_memory"), "VRAM", CONFIG["alert_thresholds"]["gpu_memory"])
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} GPU Core:  {generate_progress_bar(gpu['utilization'], 25)} {gpu['utilization']:>5.1f}%")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} VRAM Use:  {generate_progress_bar(gpu['memory_percent'], 25)} {gpu['memory_percent']:>5.1f}%")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} VRAM Cap:  {UI.CYAN}{gpu['memory_used_mb']:.0f} MB / {gpu['memory_total_mb']:.0f} MB{UI.ENDC}")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} History:   [{generate_sparkline(sparkline_data('gpu_memory'))}] {gpu_pred}")
         
-        temp_color = UI.RED if gpu['temperature'] > 80 else UI.GREEN
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Temp:      {temp_color}{gpu['temperature']}°C{UI.ENDC}")
+        temp_color = UI.RED if gpu['temperature'] > CONFIG["alert_thresholds"]["gpu_temp"] else UI.GREEN
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Temp:      {temp_color}{gpu['temperature']}°C{UI.ENDC}")
+        if len(gpu["devices"]) > 1:
+            for dev in gpu["devices"]:
+                slope = slopes[f"gpu{dev['index']}_memory"]
+                out(f"{UI.PURPLE}{UI.V}{UI.ENDC}  GPU{dev['index']} {dev['name'][:22]:<22} | {dev['utilization']:>5.1f}% | VRAM {dev['memory_percent']:>5.1f}% ({slope:+.1f}%/min) | {dev['temperature']:.0f}°C")
+        for proc in metrics.get("gpu_processes", [])[:CONFIG["breakdown_rows"]]:
+            sm = f"{proc['gpu_sm_percent']:>3.0f}% SM" if proc["gpu_sm_percent"] is not None else "  - SM"
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC}  {proc['pid']:>7} {proc['name'][:16]:<16} {UI.GREY}{proc['category'][:10]:<10}{UI.ENDC} | {proc['gpu_memory_mb']:>6.0f} MB{format_vram_slope(proc['gpu_memory_slope'])} | {sm}")
     else:
         # Dynamic error messaging based on the status code we set in get_system_metrics
         status = gpu.get("status", "OFFLINE")
         status_color = UI.RED if status in ["VER_MISMATCH", "DRIVER_ERROR"] else UI.GREY
         
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Status:    {status_color}[{status}]{UI.ENDC}")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Status:    {status_color}[{status}]{UI.ENDC}")
         
         if status == "VER_MISMATCH":
-            print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.YELLOW}⚠ Kernel/Library mismatch detected. Reboot required.{UI.ENDC}")
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.YELLOW}⚠ Kernel/Library mismatch detected. Reboot required.{UI.ENDC}")
         elif status == "SMI_MISSING":
-            print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.GREY}Command 'nvidia-smi' not found in path.{UI.ENDC}")
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.GREY}Command 'nvidia-smi' not found in path.{UI.ENDC}")
         else:
-            print(f"{UI.PURPLE}{UI.V}{UI.ENDC} GPU Core:  {UI.GREY}No active NVIDIA device found.{UI.ENDC}")
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC} GPU Core:  {UI.GREY}No active NVIDIA device found.{UI.ENDC}")
             
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} VRAM:      {UI.GREY}N/A{UI.ENDC}")
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Temp:      {UI.GREY}N/A{UI.ENDC}")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} VRAM:      {UI.GREY}N/A{UI.ENDC}")
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Temp:      {UI.GREY}N/A{UI.ENDC}")
 
     # 4. STORAGE & I/O
     disk = metrics["disk"]
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}STORAGE & I/O{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Root Disk: {generate_progress_bar(disk['percent'], 25)} {disk['percent']:>5.1f}%")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Space:     {UI.CYAN}{disk['used_gb']:.1f} GB / {disk['total_gb']:.1f} GB{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Speed:     ▼ {format_bytes(disk['read_speed'])}/s  |  ▲ {format_bytes(disk['write_speed'])}/s")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Total I/O: {format_bytes(disk['read_total'])} Read | {format_bytes(disk['write_total'])} Written")
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}STORAGE & I/O{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Root Disk: {generate_progress_bar(disk['percent'], 25)} {disk['percent']:>5.1f}%")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Space:     {UI.CYAN}{disk['used_gb']:.1f} GB / {disk['total_gb']:.1f} GB{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Speed:     ▼ {format_bytes(disk['read_speed'])}/s  |  ▲ {format_bytes(disk['write_speed'])}/s")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Total I/O: {format_bytes(disk['read_total'])} Read | {format_bytes(disk['write_total'])} Written")
+    busy_disks = sorted((d for d in disk.get("devices", {}).items() if d[1]["read_iops"] + d[1]["write_iops"] > 0),
+                        key=lambda d: (d[1]["util_percent"], d[1]["read_speed"] + d[1]["write_speed"]), reverse=True)
+    for name, dev in busy_disks[:CONFIG["breakdown_rows"]]:
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC}  {name[:10]:<10} {dev['read_iops'] + dev['write_iops']:>6.0f} IOPS | ▼ {format_bytes(dev['read_speed'])}/s ▲ {format_bytes(dev['write_speed'])}/s | {dev['latency_ms']:>5.1f} ms | {dev['util_percent']:>3.0f}% busy")
 
     # 5. NETWORK TELEMETRY
     net = metrics["network"]
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}NETWORK TELEMETRY{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Throughput:▼ {format_bytes(net['recv_speed'])}/s  |  ▲ {format_bytes(net['sent_speed'])}/s")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Total Data: {format_bytes(net['recv_total'])} RX   | {format_bytes(net['sent_total'])} TX")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} Packets:    {net['packets']}")
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}NETWORK TELEMETRY{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Throughput:▼ {format_bytes(net['recv_speed'])}/s  |  ▲ {format_bytes(net['sent_speed'])}/s")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Total Data: {format_bytes(net['recv_total'])} RX   | {format_bytes(net['sent_total'])} TX")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} Packets:    {net['packets']}")
+    busy_nics = sorted((i for i in net.get("interfaces", {}).items() if i[0] != "lo" and i[1]["recv_speed"] + i[1]["sent_speed"] > 0),
+                       key=lambda i: i[1]["recv_speed"] + i[1]["sent_speed"], reverse=True)
+    for name, nic in busy_nics[:CONFIG["breakdown_rows"]]:
+        errors = f" | {UI.RED}{nic['errors']} err {nic['drops']} drop{UI.ENDC}" if nic["errors"] or nic["drops"] else ""
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC}  {name[:10]:<10} ▼ {format_bytes(nic['recv_speed'])}/s ▲ {format_bytes(nic['sent_speed'])}/s{errors}")
 
     # 6. HEAVY PROCESSES
-    print(f"{UI.PURPLE}{UI.L_T}{UI.H*70}{UI.R_T}{UI.ENDC}")
-    print(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}ACTIVE PROCESS HEURISTICS (TOP 7){UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    ranking = " BY VRAM" if CONFIG["process_sort"] == "vram" else ""
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}ACTIVE PROCESS HEURISTICS (TOP {CONFIG['top_processes']}{ranking}){UI.ENDC}")
     for proc in metrics.get("top_processes", []):
         cat_color = {
             "BUILD": UI.ORANGE, 
@@ -388,26 +2263,1399 @@ def print_dashboard(metrics):
         }.get(proc["category"], UI.GREEN)
         
         line = f" {cat_color}[{proc['category']:<10}]{UI.ENDC} {proc['name'][:18]:<18} | CPU: {proc['cpu_percent']:>4.1f}% | RAM: {proc['memory_percent']:>4.1f}%"
-        print(f"{UI.PURPLE}{UI.V}{UI.ENDC}{line}")
+        if proc.get("gpu_memory_mb"):
+            line += f" | VRAM: {proc['gpu_memory_mb']:>5.0f} MB{format_vram_slope(proc['gpu_memory_slope'])}"
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC}{line}")
+
+    # 7. SELF PROFILE (--profile)
+    if CONFIG["profile"] and "profile" in metrics:
+        out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+        deep = f" {UI.ORANGE}[cProfile + tracemalloc]{UI.ENDC}" if metrics["profile"]["deep"] else ""
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}MONITOR PROFILE{UI.ENDC}{deep}")
+        header, *rows = format_profile(metrics["profile"])
+        out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.GREY}{header}{UI.ENDC}")
+        for row in rows:
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {row}")
+
+    out(f"{UI.PURPLE}{UI.BL}{UI.H*inner}{UI.BR}{UI.ENDC}")
+    return lines
+
+class FrameRenderer:
+    """Writes a whole frame with one os.write. On a TTY it switches to the alternate screen,
+    draws the first frame in full and afterwards only rewrites the rows that changed.
+    Non-TTY output (docker logs) gets plain full frames."""
+
+    def __init__(self, fd=None, tty=None):
+        self.fd = sys.stdout.fileno() if fd is None else fd
+        self.tty = os.isatty(self.fd) if tty is None else tty
+        self.previous = None
+        self.previous_width = None
+        self.previous_height = None
+        self.active = False
+
+    def width(self):
+        return shutil.get_terminal_size((72, 24)).columns
+
+    def height(self):
+        return shutil.get_terminal_size((72, 24)).lines
+
+    def compose(self, lines, width, height=None):
+        lines = [fit_line(line, width) for line in lines]
+        if not self.tty:
+            return "\n".join(lines) + "\n\n"
+        # Rows past the bottom of the alternate screen would overwrite the last line
+        if height and len(lines) > height:
+            hidden = len(lines) - height + 1
+            lines = lines[:height - 1] + [fit_line(f"{UI.GREY}… {hidden} more rows, enlarge the terminal{UI.ENDC}", width)]
+
+        buf = []
+        previous = self.previous
+        if not self.active:
+            # Alternate screen + hidden cursor, restored by close()
+            buf.append("\033[?1049h\033[?25l")
+            self.active = True
+        if previous is None or width != self.previous_width or height != self.previous_height:
+            buf.append("\033[H\033[2J")
+            previous = []
+
+        for row, line in enumerate(lines, 1):
+            if row > len(previous) or previous[row - 1] != line:
+                buf.append(f"\033[{row};1H{line}\033[K")
+        if len(previous) > len(lines):
+            buf.append(f"\033[{len(lines) + 1};1H\033[J")
+
+        self.previous = lines
+        self.previous_width = width
+        self.previous_height = height
+        return "".join(buf)
+
+    def write(self, data):
+        view = memoryview(data)
+        while view:
+            written = os.write(self.fd, view)
+            view = view[written:]
+        return len(data)
+
+    def render(self, lines, width=None, height=None):
+        """Returns the number of bytes written for this frame"""
+        data = self.compose(lines, width or self.width(), height or self.height()).encode()
+        return self.write(data) if data else 0
+
+    def close(self):
+        if self.active:
+            self.write(b"\033[?25h\033[?1049l")
+            self.active = False
+
+renderer = None
+
+def print_dashboard(metrics):
+    global renderer
+    if renderer is None:
+        sys.stdout.flush()
+        renderer = FrameRenderer()
+    width = renderer.width()
+    return profiler.call("render", lambda: renderer.render(build_frame(metrics, width), width))
+
+def bench_render(frames=200, width=72):
+    """Bytes and time per frame: clear + line-by-line print vs the differential renderer"""
+    metrics = get_system_metrics()
+    devnull = os.open(os.devnull, os.O_WRONLY)
+    clear_cmd = shutil.which("clear")
+
+    def vary(i):
+        metrics["cpu"]["overall_percent"] = (i * 7) % 100
+        metrics["memory"]["percent"] = 40 + (i % 5)
+
+    try:
+        legacy_bytes = 0
+        start = time.perf_counter()
+        for i in range(frames):
+            vary(i)
+            if clear_cmd:
+                sp.run([clear_cmd], stdout=devnull, stderr=devnull)
+            legacy_bytes += len(b"\033[H\033[2J")
+            for line in build_frame(metrics, width):
+                legacy_bytes += os.write(devnull, (line + "\n").encode())
+        legacy_ms = (time.perf_counter() - start) / frames * 1000
+
+        frame_renderer = FrameRenderer(fd=devnull, tty=True)
+        diff_bytes = 0
+        start = time.perf_counter()
+        for i in range(frames):
+            vary(i)
+            diff_bytes += frame_renderer.render(build_frame(metrics, width), width, height=1000)
+        diff_ms = (time.perf_counter() - start) / frames * 1000
+    finally:
+        os.close(devnull)
+
+    print(f"{UI.BOLD}Dashboard rendering ({frames} frames, {width} cols){UI.ENDC}")
+    print(f" clear + print:  {legacy_bytes / frames:8.0f} B/frame  {legacy_ms:7.3f} ms/frame")
+    print(f" Differential:   {diff_bytes / frames:8.0f} B/frame  {diff_ms:7.3f} ms/frame")
+
+# Headless exporters
+# Consumers receive every published snapshot; the TUI is just one of them. Exporters
+# serialise once per snapshot so scrapes and log lines never re-walk the metrics dict.
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+def openmetrics_families(metrics):
+    """(name, type, help, [(labels, value), ...]) for every exported family"""
+    cpu, mem, gpu = metrics["cpu"], metrics["memory"], metrics["gpu"]
+    disk, net, sys_info = metrics["disk"], metrics["network"], metrics["system"]
+    gib = 1024**3
+    mib = 1024**2
+    devices = gpu["devices"]
+    disks = disk.get("devices", {})
+    nics = net.get("interfaces", {})
+
+    def per_gpu(key, scale=1):
+        return [({"gpu": str(d["index"]), "name": d["name"]}, d[key] * scale) for d in devices]
+
+    return [
+        ("vulkan_dev_load", "gauge", "System load average",
+         [({"period": p}, v) for p, v in zip(("1m", "5m", "15m"), sys_info["load"])]),
+        ("vulkan_dev_cpu_percent", "gauge", "Overall CPU utilisation", [({"scope": cpu.get("scope", "host")}, cpu["overall_percent"])]),
+        ("vulkan_dev_cpu_core_percent", "gauge", "Per logical core CPU utilisation",
+         [({"core": str(i)}, v) for i, v in enumerate(cpu.get("per_core", []))]),
+        ("vulkan_dev_cpu_throttled_percent", "gauge", "Share of wall time the cgroup was throttled",
+         [({}, cpu["throttled_percent"])] if "throttled_percent" in cpu else []),
+        ("vulkan_dev_memory_percent", "gauge", "RAM utilisation", [({"scope": mem.get("scope", "host")}, mem["percent"])]),
+        ("vulkan_dev_memory_used_bytes", "gauge", "RAM in use", [({}, mem["used_gb"] * gib)]),
+        ("vulkan_dev_memory_total_bytes", "gauge", "Installed RAM", [({}, mem["total_gb"] * gib)]),
+        ("vulkan_dev_swap_percent", "gauge", "Swap utilisation", [({}, mem["swap_percent"])]),
+        ("vulkan_dev_gpu_up", "gauge", "1 when the GPU backend reports data",
+         [({"status": gpu["status"], "backend": gpu["backend"]}, 1 if gpu["available"] else 0)]),
+        ("vulkan_dev_gpu_utilization_percent", "gauge", "GPU core utilisation", per_gpu("utilization")),
+        ("vulkan_dev_gpu_memory_used_bytes", "gauge", "VRAM in use", per_gpu("memory_used_mb", mib)),
+        ("vulkan_dev_gpu_memory_total_bytes", "gauge", "VRAM installed", per_gpu("memory_total_mb", mib)),
+        ("vulkan_dev_gpu_temperature_celsius", "gauge", "GPU temperature", per_gpu("temperature")),
+        ("vulkan_dev_disk_percent", "gauge", "Root filesystem utilisation", [({"mount": "/"}, disk["percent"])]),
+        ("vulkan_dev_disk_read_bytes", "counter", "Bytes read from disk", [({}, disk["read_total"])]),
+        ("vulkan_dev_disk_written_bytes", "counter", "Bytes written to disk", [({}, disk["write_total"])]),
+        ("vulkan_dev_disk_iops", "gauge", "Completed disk requests per second",
+         [({"device": n, "op": op}, d[f"{op}_iops"]) for n, d in disks.items() for op in ("read", "write")]),
+        ("vulkan_dev_disk_throughput_bytes_per_second", "gauge", "Disk throughput",
+         [({"device": n, "op": op}, d[f"{op}_speed"]) for n, d in disks.items() for op in ("read", "write")]),
+        ("vulkan_dev_disk_latency_milliseconds", "gauge", "Average time per disk request",
+         [({"device": n}, d["latency_ms"]) for n, d in disks.items()]),
+        ("vulkan_dev_disk_busy_percent", "gauge", "Share of time the device had I/O in flight",
+         [({"device": n}, d["util_percent"]) for n, d in disks.items()]),
+        ("vulkan_dev_network_received_bytes", "counter", "Bytes received", [({}, net["recv_total"])]),
+        ("vulkan_dev_network_sent_bytes", "counter", "Bytes sent", [({}, net["sent_total"])]),
+        ("vulkan_dev_network_throughput_bytes_per_second", "gauge", "Per interface network throughput",
+         [({"interface": n, "direction": "rx"}, i["recv_speed"]) for n, i in nics.items()] +
+         [({"interface": n, "direction": "tx"}, i["sent_speed"]) for n, i in nics.items()]),
+        ("vulkan_dev_pressure_percent", "gauge", "Pressure stall information (share of time stalled)",
+         [({"resource": r, "kind": k, "window": w}, v[w]) for r, p in metrics.get("pressure", {}).items()
+          for k, v in p.items() for w in ("avg10", "avg60", "avg300")]),
+        ("vulkan_dev_monitor_cpu_percent", "gauge", "CPU used by the monitor itself",
+         [({}, metrics["monitor"]["cpu_percent"])] if "monitor" in metrics else []),
+        ("vulkan_dev_monitor_sampling_interval_seconds", "gauge", "Current adaptive sampling interval per collector",
+         [({"collector": k}, v) for k, v in metrics.get("monitor", {}).get("intervals", {}).items()]),
+        ("vulkan_dev_monitor_latency_seconds", "gauge", "Collector and render latency quantiles",
+         [({"source": name, "quantile": q}, h[key] / 1000) for name, h in metrics.get("profile", {}).get("latency", {}).items()
+          for q, key in (("0.5", "p50_ms"), ("0.99", "p99_ms"))]),
+        ("vulkan_dev_monitor_runs", "counter", "Collector runs and rendered frames",
+         [({"source": name}, h["count"]) for name, h in metrics.get("profile", {}).get("latency", {}).items()]),
+        ("vulkan_dev_monitor_errors", "counter", "Collector failures by status",
+         [({"source": name, "status": status}, n) for name, counts in metrics.get("profile", {}).get("errors", {}).items()
+          for status, n in counts.items()]),
+        ("vulkan_dev_alert_firing", "gauge", "Alert rules currently firing",
+         [({"rule": a["rule"], "severity": a["severity"]}, 1) for a in metrics.get("alerts", [])]),
+        ("vulkan_dev_process_cpu_percent", "gauge", "CPU of the top processes",
+         [({"pid": str(p["pid"]), "name": p["name"], "category": p["category"]}, p["cpu_percent"])
+          for p in metrics["top_processes"]]),
+        ("vulkan_dev_process_memory_percent", "gauge", "RAM of the top processes",
+         [({"pid": str(p["pid"]), "name": p["name"], "category": p["category"]}, p["memory_percent"])
+          for p in metrics["top_processes"]]),
+        ("vulkan_dev_process_gpu_memory_bytes", "gauge", "VRAM held by each GPU process",
+         [({"pid": str(p["pid"]), "name": p["name"], "category": p["category"]}, p["gpu_memory_mb"] * mib)
+          for p in metrics.get("gpu_processes", [])]),
+        ("vulkan_dev_process_gpu_memory_growth_bytes_per_minute", "gauge", "Trend of each GPU process's VRAM",
+         [({"pid": str(p["pid"]), "name": p["name"], "category": p["category"]}, p["gpu_memory_slope"] * mib)
+          for p in metrics.get("gpu_processes", [])]),
+        ("vulkan_dev_process_gpu_sm_percent", "gauge", "SM utilisation of each GPU process",
+         [({"pid": str(p["pid"]), "name": p["name"], "category": p["category"]}, p["gpu_sm_percent"])
+          for p in metrics.get("gpu_processes", []) if p["gpu_sm_percent"] is not None]),
+    ]
+
+def escape_label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def format_openmetrics(families):
+    lines = []
+    for name, kind, help_text, samples in families:
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"# HELP {name} {help_text}")
+        suffix = "_total" if kind == "counter" else ""
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{escape_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+    lines.append("# EOF")
+    return ("\n".join(lines) + "\n").encode()
+
+class MetricsExporter:
+    """Serves the latest pre-serialised snapshot on http://host:port/metrics, and the raw snapshot
+    delta-encoded on /snapshot for fleet pollers"""
+
+    def __init__(self, host="127.0.0.1", port=9464):
+        self.payload = b"# EOF\n"
+        self.snapshots = SnapshotLog()
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # Keep-alive, so fleet pollers reuse one connection
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path, _, query = self.path.partition('?')
+                if path == "/snapshot":
+                    since = urllib.parse.parse_qs(query).get("since", ["0"])[0]
+                    payload, content_type = exporter.snapshots.delta(int(since) if since.isdigit() else 0), "application/json"
+                elif path == "/metrics":
+                    payload, content_type = exporter.payload, OPENMETRICS_CONTENT_TYPE
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, name="metrics-http", daemon=True)
+        self.thread.start()
+
+    def __call__(self, metrics):
+        # Swapping the reference is atomic, handlers always see a complete payload
+        self.payload = format_openmetrics(openmetrics_families(metrics))
+        self.snapshots.publish(metrics)
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+class JsonLinesWriter:
+    """One JSON object per snapshot, to stdout ("-") or an appended file"""
+
+    def __init__(self, path):
+        self.stream = sys.stdout if path == "-" else open(path, "a", buffering=1)
+
+    def __call__(self, metrics):
+        self.stream.write(json.dumps({"timestamp": time.time(), **metrics}, separators=(',', ':')) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self.stream is not sys.stdout:
+            self.stream.close()
+
+# Multi-target aggregation
+# `--targets` polls several sources concurrently and renders them as one table: remote monitors
+# through their /snapshot endpoint (delta-encoded), local containers through the Docker socket or
+# their cgroup v2 directories. Every source reduces to the same row shape.
+
+class UnixHTTPConnection(http.client.HTTPConnection):
+    """HTTP over a unix socket (the Docker API)"""
+
+    def __init__(self, socket_path, timeout=3):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+class HttpPool:
+    """Keep-alive HTTP/1.1 connections to one endpoint (host:port or a unix socket), reused across polls"""
+
+    def __init__(self, host="localhost", port=None, socket_path=None, timeout=3):
+        self.host, self.port, self.socket_path, self.timeout = host, port, socket_path, timeout
+        self.idle = queue.LifoQueue()
+
+    def _connect(self):
+        if self.socket_path:
+            return UnixHTTPConnection(self.socket_path, self.timeout)
+        return http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+
+    def get_json(self, path):
+        while True:
+            try:
+                connection, reused = self.idle.get_nowait(), True
+            except queue.Empty:
+                connection, reused = self._connect(), False
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                body = response.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if reused:
+                    # The peer dropped an idle keep-alive connection, retry on a fresh one
+                    continue
+                raise
+            if response.will_close:
+                connection.close()
+            else:
+                self.idle.put(connection)
+            if response.status != 200:
+                raise OSError(f"HTTP {response.status} for {path}")
+            return json.loads(body)
+
+    def close(self):
+        while not self.idle.empty():
+            self.idle.get_nowait().close()
 
-    print(f"{UI.PURPLE}{UI.BL}{UI.H*70}{UI.BR}{UI.ENDC}\n")
+class SnapshotLog:
+    """Serves /snapshot?since=N: each collector key carries the version at which its serialised value
+    last changed, so a poller only downloads the keys that changed since its previous poll"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # A restarted monitor starts at version 0 again; pollers see the new epoch and resync
+        self.epoch = f"{os.getpid()}-{int(time.time())}"
+        self.version = 0
+        self.entries = {}
+
+    def publish(self, metrics):
+        with self.lock:
+            for key, value in metrics.items():
+                text = json.dumps(value, separators=(',', ':'))
+                entry = self.entries.get(key)
+                if entry is None or entry[1] != text:
+                    self.version += 1
+                    self.entries[key] = (self.version, text)
+            for key in self.entries.keys() - metrics.keys():
+                del self.entries[key]
+
+    def delta(self, since):
+        with self.lock:
+            if since > self.version:
+                since = 0
+            changed = ",".join(f"{json.dumps(key)}:{text}" for key, (version, text) in self.entries.items() if version > since)
+            return (f'{{"epoch":{json.dumps(self.epoch)},"version":{self.version},'
+                    f'"keys":{json.dumps(list(self.entries))},"changed":{{{changed}}}}}').encode()
+
+def summarize_snapshot(metrics):
+    """Fleet row for a full monitor snapshot"""
+    cpu, mem, gpu, disk = metrics["cpu"], metrics["memory"], metrics["gpu"], metrics["disk"]
+    cores = cpu.get("limit_cpus") or cpu["thread_count"]
+    return {
+        "status": "OK",
+        "node": metrics["system"].get("boot_id"),
+        "scope": cpu.get("scope", "host"),
+        "cpu_percent": cpu["overall_percent"],
+        "cpu_cores": cpu["overall_percent"] / 100 * cores,
+        "cores_total": cores,
+        "memory_used_gb": mem["used_gb"],
+        "memory_limit_gb": mem["total_gb"],
+        "gpu_util": gpu["utilization"] if gpu["available"] else None,
+        "vram_used_mb": gpu["memory_used_mb"] if gpu["available"] else None,
+        "read_speed": disk["read_speed"],
+        "write_speed": disk["write_speed"],
+        "alerts": len(metrics.get("alerts", [])),
+    }
+
+class AgentSource:
+    """A remote monitor running with --listen; keeps the merged snapshot between delta polls"""
+    kind = "agent"
+
+    def __init__(self, url, timeout=3):
+        parts = urllib.parse.urlsplit(url)
+        self.name = parts.netloc
+        self.pool = HttpPool(parts.hostname, parts.port or 9464, timeout=timeout)
+        self.epoch = None
+        self.version = 0
+        self.metrics = {}
+
+    def poll(self):
+        delta = self.pool.get_json(f"/snapshot?since={self.version}")
+        if delta["epoch"] != self.epoch and self.version:
+            self.version, self.metrics = 0, {}
+            delta = self.pool.get_json("/snapshot?since=0")
+        changed = delta["changed"]
+        self.metrics = {key: changed[key] if key in changed else self.metrics[key] for key in delta["keys"]}
+        self.epoch, self.version = delta["epoch"], delta["version"]
+        return [{"target": self.name, "kind": self.kind, **summarize_snapshot(self.metrics)}]
+
+    def close(self):
+        self.pool.close()
+
+ContainerCounters = namedtuple("ContainerCounters", ["cpu_ns", "rbytes", "wbytes"])
+
+class DockerSource:
+    """Every running container on the Docker socket; stats are fetched one-shot and concurrently
+    over pooled keep-alive connections, rates come from the previous poll"""
+    kind = "docker"
+
+    def __init__(self, socket_path="/var/run/docker.sock", workers=4):
+        self.name = f"docker:{socket_path}"
+        self.pool = HttpPool(socket_path=socket_path)
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="docker-stats")
+        self.counters = CounterDelta()
+
+    def _stats(self, container):
+        return container, self.pool.get_json(f"/containers/{container['Id']}/stats?stream=false&one-shot=true")
+
+    def poll(self):
+        containers = self.pool.get_json("/containers/json")
+        samples = list(self.executor.map(self._stats, containers))
+        current = {}
+        for container, stats in samples:
+            io = {entry["op"].lower(): entry["value"] for entry in (stats.get("blkio_stats", {}).get("io_service_bytes_recursive") or [])}
+            current[container["Id"]] = ContainerCounters(stats["cpu_stats"]["cpu_usage"]["total_usage"], io.get("read", 0), io.get("write", 0))
+        elapsed, deltas = self.counters.update(current)
+
+        rows = []
+        for container, stats in samples:
+            delta = deltas.get(container["Id"])
+            cores = stats["cpu_stats"].get("online_cpus") or psutil.cpu_count()
+            memory = stats.get("memory_stats", {})
+            # Same "used" as `docker stats`: page cache that could be dropped is not counted
+            inactive = memory.get("stats", {}).get("inactive_file", memory.get("stats", {}).get("total_inactive_file", 0))
+            used_cores = delta.cpu_ns / (elapsed * 1e9) if delta else 0.0
+            rows.append({
+                "target": container["Names"][0].lstrip('/'),
+                "kind": self.kind,
+                "node": get_boot_id(),
+                "status": "OK",
+                "cpu_percent": used_cores / cores * 100,
+                "cpu_cores": used_cores,
+                "cores_total": cores,
+                "memory_used_gb": (memory.get("usage", 0) - inactive) / 1024**3,
+                "memory_limit_gb": memory.get("limit", 0) / 1024**3,
+                "gpu_util": None,
+                "vram_used_mb": None,
+                "read_speed": delta.rbytes / elapsed if delta else 0.0,
+                "write_speed": delta.wbytes / elapsed if delta else 0.0,
+                "alerts": 0,
+            })
+        return rows
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+class CgroupSource:
+    """cgroup v2 directories matching a glob under the cgroup root, e.g. system.slice/docker-*.scope"""
+    kind = "cgroup"
+
+    def __init__(self, pattern, root=None):
+        self.name = f"cgroup:{pattern}"
+        self.pattern = pattern
+        self.root = root or CONFIG["cgroup_root"]
+        self.readers = {}
+        self.counters = CounterDelta()
+
+    def poll(self):
+        directories = [d for d in glob.glob(os.path.join(self.root, self.pattern.lstrip('/')))
+                       if os.path.isfile(os.path.join(d, "cgroup.controllers"))]
+        for directory in self.readers.keys() - set(directories):
+            self.readers.pop(directory).close()
+        for directory in directories:
+            if directory not in self.readers:
+                self.readers[directory] = CgroupReader(self.root, os.path.relpath(directory, self.root))
+
+        current = {}
+        for directory, reader in self.readers.items():
+            usage, io = reader.cpu(), reader.io()
+            current[directory] = ContainerCounters((usage.usage_usec if usage else 0) * 1000,
+                                                   io.rbytes if io else 0, io.wbytes if io else 0)
+        elapsed, deltas = self.counters.update(current)
+
+        rows = []
+        host_memory = psutil.virtual_memory().total
+        for directory, reader in self.readers.items():
+            delta = deltas.get(directory)
+            cores = reader.cpu_limit() or psutil.cpu_count()
+            used, limit = reader.memory() or (0, None)
+            used_cores = delta.cpu_ns / (elapsed * 1e9) if delta else 0.0
+            rows.append({
+                "target": re.sub(r'^docker-([0-9a-f]{12})[0-9a-f]*\.scope$', r'docker-\1', os.path.basename(directory)),
+                "kind": self.kind,
+                "node": get_boot_id(),
+                "status": "OK",
+                "cpu_percent": used_cores / cores * 100,
+                "cpu_cores": used_cores,
+                "cores_total": cores,
+                "memory_used_gb": used / 1024**3,
+                "memory_limit_gb": (limit or host_memory) / 1024**3,
+                "gpu_util": None,
+                "vram_used_mb": None,
+                "read_speed": delta.rbytes / elapsed if delta else 0.0,
+                "write_speed": delta.wbytes / elapsed if delta else 0.0,
+                "alerts": 0,
+            })
+        return rows
+
+    def close(self):
+        for reader in self.readers.values():
+            reader.close()
+        self.readers = {}
+
+def create_fleet_source(spec):
+    """http://host:port -> remote monitor, docker[:socket] -> Docker API, cgroup:<glob> -> cgroup v2 dirs"""
+    if spec.startswith(("http://", "https://")):
+        return AgentSource(spec)
+    if spec == "docker" or spec.startswith("docker:"):
+        return DockerSource(spec.partition(':')[2] or "/var/run/docker.sock")
+    if spec.startswith("cgroup:"):
+        return CgroupSource(spec.partition(':')[2])
+    raise ValueError(f"unknown target {spec!r} (expected http://host:port, docker[:socket] or cgroup:<glob>)")
+
+def fleet_rollup(rows, label):
+    rows = [r for r in rows if r["status"] == "OK"]
+    gpus = [r["gpu_util"] for r in rows if r.get("gpu_util") is not None]
+    return {
+        "target": label,
+        "count": len(rows),
+        "cpu_cores": sum(r["cpu_cores"] for r in rows),
+        "cores_total": sum(r["cores_total"] for r in rows),
+        "memory_used_gb": sum(r["memory_used_gb"] for r in rows),
+        "memory_limit_gb": sum(r["memory_limit_gb"] for r in rows),
+        "gpu_util": sum(gpus) / len(gpus) if gpus else None,
+        "vram_used_mb": sum(r["vram_used_mb"] for r in rows if r.get("vram_used_mb") is not None) if gpus else None,
+        "read_speed": sum(r["read_speed"] for r in rows),
+        "write_speed": sum(r["write_speed"] for r in rows),
+        "alerts": sum(r["alerts"] for r in rows),
+    }
+
+class FleetPoller:
+    """Polls every source concurrently, one worker per source, and assembles a fleet snapshot"""
+
+    def __init__(self, sources):
+        self.sources = sources
+        self.executor = ThreadPoolExecutor(max_workers=max(1, len(sources)), thread_name_prefix="fleet")
+
+    def _poll(self, source):
+        start = time.perf_counter()
+        try:
+            rows = source.poll()
+        except (OSError, ValueError, KeyError, http.client.HTTPException) as e:
+            status = "TIMEOUT" if isinstance(e, socket.timeout) else type(e).__name__
+            profiler.error(f"fleet:{source.name}", status)
+            rows = [{"target": source.name, "kind": source.kind, "status": status}]
+        elapsed = time.perf_counter() - start
+        profiler.observe(f"fleet:{source.name}", elapsed)
+        for row in rows:
+            row["poll_ms"] = elapsed * 1000
+        return rows
+
+    def snapshot(self):
+        rows = [row for rows in self.executor.map(self._poll, self.sources) for row in rows]
+        kinds = sorted({r["kind"] for r in rows})
+        rollups = [fleet_rollup([r for r in rows if r["kind"] == kind], f"Σ {kind}") for kind in kinds] if len(kinds) > 1 else []
+        # A host-scope agent already counts the containers on its node; adding the local docker/cgroup
+        # rows for that node again would double their CPU and memory in the grand total
+        covered = {r.get("node") for r in rows if r["kind"] == "agent" and r.get("scope") == "host" and r.get("node")}
+        total = [r for r in rows if r["kind"] == "agent" or r.get("node") not in covered]
+        rollups.append(fleet_rollup(total, "Σ all" if len(total) == len(rows) else "Σ nodes"))
+        return {"targets": rows, "rollups": rollups}
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        for source in self.sources:
+            source.close()
+
+def build_fleet_frame(fleet, width=72):
+    lines = []
+    out = lines.append
+    inner = width - 2
+    now = datetime.now().strftime("%H:%M:%S")
+
+    def row(target, r, color=""):
+        gpu = f"{r['gpu_util']:>3.0f}%" if r.get("gpu_util") is not None else "   -"
+        vram = f"{r['vram_used_mb'] / 1024:>5.1f}G" if r.get("vram_used_mb") is not None else "     -"
+        mem_percent = r["memory_used_gb"] / r["memory_limit_gb"] * 100 if r["memory_limit_gb"] else 0
+        mem_color = UI.RED if mem_percent > CONFIG["alert_thresholds"]["memory"] else ""
+        return (f"{UI.PURPLE}{UI.V}{UI.ENDC} {color}{target[:16]:<16}{UI.ENDC} {r['cpu_cores']:>4.1f}/{r['cores_total']:<4g}"
+                f" {r['memory_used_gb']:>5.1f}/{r['memory_limit_gb']:<5.1f} {mem_color}{mem_percent:>3.0f}%{UI.ENDC} {gpu} {vram}"
+                f" {format_bytes(r['read_speed'] + r['write_speed'])}/s")
+
+    out(f"{UI.PURPLE}{UI.TL}{UI.H*inner}{UI.TR}{UI.ENDC}")
+    title = f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.BOLD}{UI.CYAN}⚡ VULKAN-DEV FLEET ⚡{UI.ENDC} [{now}] {len(fleet['targets'])} targets"
+    out(title + " " * max(0, width - 1 - visible_len(title)) + f"{UI.PURPLE}{UI.V}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {UI.GREY}{'TARGET':<16} {'CORES':<9} {'RAM GB':<11} {'RAM':>4} {'GPU':>4} {'VRAM':>6} {'I/O':>9}{UI.ENDC}")
+    for r in fleet["targets"]:
+        if r["status"] != "OK":
+            out(f"{UI.PURPLE}{UI.V}{UI.ENDC} {r['target'][:16]:<16} {UI.RED}[{r['status']}]{UI.ENDC}")
+            continue
+        alerts = f" {UI.RED}⚠{r['alerts']}{UI.ENDC}" if r["alerts"] else ""
+        out(row(r["target"], r) + alerts)
+    out(f"{UI.PURPLE}{UI.L_T}{UI.H*inner}{UI.R_T}{UI.ENDC}")
+    for r in fleet["rollups"]:
+        out(row(f"{r['target']} ({r['count']})", r, UI.BOLD))
+    out(f"{UI.PURPLE}{UI.BL}{UI.H*inner}{UI.BR}{UI.ENDC}")
+    return lines
+
+def print_fleet(fleet):
+    global renderer
+    if renderer is None:
+        sys.stdout.flush()
+        renderer = FrameRenderer()
+    width = renderer.width()
+    return profiler.call("render", lambda: renderer.render(build_fleet_frame(fleet, width), width))
+
+def run_stub_agent(listen):
+    """Serves synthetic snapshots in the live shape on HOST:PORT, for testing --targets without real hosts"""
+    host, _, port = listen.rpartition(':')
+    exporter = MetricsExporter(host or "127.0.0.1", int(port))
+    metrics = get_system_metrics()
+    rng = random.Random(port)
+    print(f"{UI.GREEN}Stub agent on http://{host or '127.0.0.1'}:{port}/snapshot{UI.ENDC}", file=sys.stderr)
+    try:
+        while True:
+            metrics["cpu"]["overall_percent"] = rng.uniform(5, 95)
+            metrics["memory"]["percent"] = rng.uniform(20, 80)
+            metrics["memory"]["used_gb"] = metrics["memory"]["total_gb"] * metrics["memory"]["percent"] / 100
+            metrics["disk"]["read_speed"] = rng.uniform(0, 50) * 1024**2
+            exporter(metrics)
+            time.sleep(1)
+    finally:
+        exporter.close()
+
+# Alerting
+# Rules are evaluated once per snapshot in O(rules). Each rule fires after its value has stayed
+# above `above` for `for` seconds and resolves only once it drops to `clear` (hysteresis).
+# Rate rules compare the per-minute rate of change instead of the value. Events go to sinks
+# through one background worker per sink, so a slow webhook never blocks the collection loop.
+def default_alert_rules():
+    thresholds = CONFIG["alert_thresholds"]
+    return [
+        {"name": "cpu_high", "metric": "cpu.overall_percent", "above": thresholds["cpu"], "for": 30},
+        {"name": "memory_high", "metric": "memory.percent", "above": thresholds["memory"], "for": 30},
+        {"name": "memory_growth", "metric": "memory.percent", "rate_above": 5, "for": 120},
+        {"name": "gpu_memory_high", "metric": "gpu.memory_percent", "above": thresholds["gpu_memory"], "for": 30},
+        {"name": "gpu_temp_high", "metric": "gpu.temperature", "above": thresholds["gpu_temp"], "for": 15,
+         "severity": "critical"},
+        {"name": "disk_full", "metric": "disk.percent", "above": thresholds["disk"], "severity": "critical"},
+    ]
+
+class AlertRule:
+    def __init__(self, name, metric, above=None, rate_above=None, clear=None, for_seconds=0, severity="warning"):
+        if (above is None) == (rate_above is None):
+            raise ValueError(f"alert rule {name!r} needs exactly one of 'above' or 'rate_above'")
+        self.name = name
+        self.path = metric.split('.')
+        self.metric = metric
+        self.rate = rate_above is not None
+        self.above = rate_above if self.rate else above
+        # Default hysteresis band: 5 points (or a fifth of a rate threshold) below the trigger
+        self.clear = clear if clear is not None else self.above - (self.above / 5 if self.rate else 5)
+        self.for_seconds = for_seconds
+        self.severity = severity
+        self.pending_since = None
+        self.firing = False
+        self.previous = None
+        self.last_value = None
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec["name"], spec["metric"], spec.get("above"), spec.get("rate_above"), spec.get("clear"),
+                   spec.get("for", 0), spec.get("severity", "warning"))
+
+    def value(self, metrics, t):
+        value = metrics
+        for key in self.path:
+            if not isinstance(value, dict) or key not in value:
+                return None
+            value = value[key]
+        if not self.rate:
+            return value
+        # Rates use the collector's own sample time: snapshots follow the fastest collector and
+        # repeat slower ones, and a repeated sample would otherwise read as a zero rate
+        sampled = metrics.get("sampled_at", {}).get(self.path[0], t)
+        if self.previous is not None and sampled <= self.previous[0]:
+            return None
+        previous, self.previous = self.previous, (sampled, value)
+        if previous is None:
+            return None
+        return (value - previous[1]) / (sampled - previous[0]) * 60
+
+    def evaluate(self, metrics, t):
+        """Returns "firing", "resolved" or None"""
+        value = self.value(metrics, t)
+        if value is None:
+            return None
+        self.last_value = value
+        if not self.firing:
+            if value < self.above:
+                self.pending_since = None
+                return None
+            if self.pending_since is None:
+                self.pending_since = t
+            if t - self.pending_since >= self.for_seconds:
+                self.firing = True
+                return "firing"
+        elif value <= self.clear:
+            self.firing = False
+            self.pending_since = None
+            return "resolved"
+        return None
+
+class LogFileSink:
+    """Appends one JSON object per event"""
+
+    def __init__(self, path):
+        self.path = os.path.expanduser(path)
+
+    def deliver(self, events):
+        with open(self.path, "a") as f:
+            f.writelines(json.dumps(event, separators=(',', ':')) + "\n" for event in events)
+
+class WebhookSink:
+    """POSTs each batch as a JSON array"""
+
+    def __init__(self, url, timeout=5):
+        self.url = url
+        self.timeout = timeout
+
+    def deliver(self, events):
+        request = urllib.request.Request(self.url, data=json.dumps(events).encode(),
+                                         headers={"Content-Type": "application/json"}, method="POST")
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            response.read()
+
+class CommandSink:
+    """Runs a desktop notifier (notify-send by default) once per batch: <cmd> <title> <body>"""
+
+    def __init__(self, command="notify-send"):
+        self.command = shlex.split(command)
+
+    def deliver(self, events):
+        title = f"VULKAN-DEV: {len(events)} alert event(s)"
+        body = "\n".join(event["message"] for event in events)
+        sp.run([*self.command, title, body], capture_output=True, timeout=10)
+
+class SinkWorker:
+    """Bounded queue + thread per sink; events are delivered in batches and dropped (counted) when full"""
+
+    def __init__(self, sink, batch_size=50, flush_interval=1.0, max_queue=1000):
+        self.sink = sink
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self._run, name=f"alert-{type(sink).__name__}", daemon=True)
+        self.thread.start()
+
+    def submit(self, event):
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            if event is None:
+                return
+            batch = [event]
+            deadline = time.monotonic() + self.flush_interval
+            stop = False
+            while len(batch) < self.batch_size:
+                try:
+                    event = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                except queue.Empty:
+                    break
+                if event is None:
+                    stop = True
+                    break
+                batch.append(event)
+            try:
+                self.sink.deliver(batch)
+            except Exception as e:
+                self.failures += 1
+                print(f"{UI.RED}Alert sink {type(self.sink).__name__} failed: {e}{UI.ENDC}", file=sys.stderr)
+            if stop:
+                return
+
+    def close(self, timeout=2):
+        try:
+            self.queue.put(None, timeout=timeout)
+        except queue.Full:
+            return
+        self.thread.join(timeout)
+
+class AlertEngine:
+    """Snapshot consumer: evaluates rules, annotates metrics["alerts"] and fans events out to sinks"""
+
+    def __init__(self, rules=None, sinks=()):
+        self.rules = [AlertRule.from_dict(spec) for spec in (rules or default_alert_rules())]
+        self.workers = [SinkWorker(sink) for sink in sinks]
+
+    @classmethod
+    def from_file(cls, path, sinks=()):
+        """JSON file: {"rules": [{"name", "metric": "cpu.overall_percent", "above" | "rate_above", "clear", "for", "severity"}]}"""
+        with open(path) as f:
+            return cls(json.load(f)["rules"], sinks)
+
+    def __call__(self, metrics, t=None):
+        t = t or time.time()
+        for rule in self.rules:
+            state = rule.evaluate(metrics, t)
+            if state is None:
+                continue
+            unit = "%/min" if rule.rate else ""
+            event = {
+                "timestamp": t,
+                "rule": rule.name,
+                "state": state,
+                "severity": rule.severity,
+                "metric": rule.metric,
+                "value": rule.last_value,
+                "threshold": rule.above,
+                "message": f"[{state.upper()}] {rule.name}: {rule.metric} = {rule.last_value:.1f}{unit} (threshold {rule.above:g}{unit})",
+            }
+            for worker in self.workers:
+                worker.submit(event)
+        metrics["alerts"] = [
+            {"rule": r.name, "severity": r.severity, "metric": r.metric, "value": r.last_value, "threshold": r.above}
+            for r in self.rules if r.firing
+        ]
+
+    def close(self):
+        for worker in self.workers:
+            worker.close()
+
+consumers = []
+
+# Record / replay
+# A trace holds the raw inputs of every collector run (psutil counters, cgroup readings, GPU
+# rows, process rows) as one compact JSON line {"t", "c", "v"} after a {"trace": version} header,
+# gzip when the path ends in .gz. Replaying feeds them back through the real collectors, so
+# CounterDelta, ProcessTable and CategoryEngine do the same work as live, then runs the snapshots
+# through history, trends, alerts and the consumers without touching psutil or the GPU.
+TRACE_VERSION = 3
+TRACE_REQUIRED = ("system", "cpu", "memory", "gpu", "disk", "network", "top_processes")
+
+def open_trace(path, mode):
+    return gzip.open(path, mode + "t") if path.endswith(".gz") else open(path, mode)
+
+def encode_input(value):
+    """JSON form of a collector input; psutil/cgroup namedtuples keep their type name and fields"""
+    if isinstance(value, tuple) and hasattr(value, "_fields"):
+        return {"_t": type(value).__name__, **{f: encode_input(v) for f, v in zip(value._fields, value)}}
+    if isinstance(value, dict):
+        if all(isinstance(k, str) for k in value):
+            return {k: encode_input(v) for k, v in value.items()}
+        # Non-string keys (PIDs of the GPU process sample) would come back as strings
+        return {"_items": [[k, encode_input(v)] for k, v in value.items()]}
+    if isinstance(value, (list, tuple)):
+        return [encode_input(v) for v in value]
+    return value
+
+input_types = {}
+
+def decode_input(value):
+    if isinstance(value, dict):
+        if "_t" in value:
+            fields = tuple(k for k in value if k != "_t")
+            cls = input_types.get((value["_t"], fields))
+            if cls is None:
+                cls = input_types[(value["_t"], fields)] = namedtuple(value["_t"], fields)
+            return cls(*(decode_input(value[f]) for f in fields))
+        if "_items" in value:
+            return {k: decode_input(v) for k, v in value["_items"]}
+        return {k: decode_input(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return [decode_input(v) for v in value]
+    return value
+
+class TraceRecorder:
+    """Appends the inputs of collector runs to a trace; written from the collector threads"""
+
+    def __init__(self, path):
+        self.stream = open_trace(path, "w")
+        self.stream.write(json.dumps({"trace": TRACE_VERSION}) + "\n")
+        self.lock = threading.Lock()
+        self.count = 0
+
+    def write(self, key, values, t):
+        line = json.dumps({"t": t, "c": key, "v": encode_input(values)}, separators=(',', ':')) + "\n"
+        with self.lock:
+            self.stream.write(line)
+            self.count += 1
+
+    def close(self):
+        with self.lock:
+            self.stream.close()
+
+trace_recorder = None
+
+def read_trace(path):
+    with open_trace(path, "r") as f:
+        header = json.loads(f.readline() or "{}")
+        if header.get("trace") != TRACE_VERSION:
+            raise ValueError(f"{path} is not a version {TRACE_VERSION} input trace, record it again with --record")
+        for line in f:
+            if line.strip():
+                sample = json.loads(line)
+                yield sample["t"], sample["c"], sample["v"]
+
+class ReplayInputs(LiveInputs):
+    """Serves the inputs recorded for one collector run, with the trace time as the clock"""
+
+    def __init__(self):
+        super().__init__()
+        self.t = 0.0
+        self.values = {}
+
+    def load(self, t, values):
+        self.t = t
+        self.values = decode_input(values)
+
+    def now(self):
+        return self.t
+
+    def time(self):
+        return self.t
+
+    def read(self, name, source, *args):
+        try:
+            return self.values[name]
+        except KeyError:
+            # The live read failed while recording, the collector handles it like any source error
+            raise RuntimeError(f"{name} not recorded") from None
+
+class ReplayProcess:
+    """psutil.Process stand-in answering from the process rows of the current trace sample"""
+
+    def __init__(self, source, pid):
+        if pid not in source.new:
+            raise psutil.NoSuchProcess(pid)
+        self.source = source
+        self.pid = pid
+
+    @contextlib.contextmanager
+    def oneshot(self):
+        yield
+
+    def name(self):
+        return self.source.new[self.pid][0]
+
+    def cmdline(self):
+        return self.source.new[self.pid][1]
+
+    def create_time(self):
+        return self.source.new[self.pid][2]
+
+    def cpu_percent(self, interval=None):
+        return self.source.load.get(self.pid, (0.0, 0.0))[0]
+
+    def memory_percent(self):
+        return self.source.load.get(self.pid, (0.0, 0.0))[1]
+
+class ReplayProcesses:
+    """pid_source/process_factory/ns_source of a ProcessTable fed from ReplayInputs"""
+
+    def __init__(self, replay):
+        self.replay = replay
+        self.new = {}
+        self.load = {}
+
+    def pids(self):
+        rows = self.replay.values["processes"]
+        self.new = {row[0]: row[1:] for row in rows["new"]}
+        self.load = {row[0]: row[1:] for row in rows["load"]}
+        return rows["pids"]
+
+    def process(self, pid):
+        return ReplayProcess(self, pid)
+
+    def ns_pids(self, pid):
+        host = self.new[pid][3]
+        return [host, pid] if host is not None else [pid]
+
+def start_replay():
+    """Swaps `inputs` for a ReplayInputs and gives the collectors fresh delta state and process table"""
+    global inputs, process_table, gpu_process_sample
+    global cpu_counters, disk_counters, net_counters, cgroup_cpu_counters, cgroup_io_counters
+    inputs = ReplayInputs()
+    processes = ReplayProcesses(inputs)
+    process_table = ProcessTable(pid_source=processes.pids, process_factory=processes.process,
+                                 host_namespace=False, ns_source=processes.ns_pids)
+    cpu_counters, disk_counters, net_counters = CounterDelta(), CounterDelta(), CounterDelta()
+    cgroup_cpu_counters, cgroup_io_counters = CounterDelta(), CounterDelta()
+    gpu_process_sample = (0.0, {})
+    return inputs
+
+def replay_snapshots(samples, tick=1.0):
+    """Runs each recorded collector run through its collector and yields (t, metrics, samples applied)
+    once per `tick` seconds of trace time, from the first moment every TRACE_REQUIRED collector has
+    reported. History and trends are recorded per sample, as the pipeline does."""
+    replay = start_replay()
+    metrics = {}
+    applied = 0
+    next_emit = None
+    sampled = {}
+    for t, key, values in samples:
+        if key not in COLLECTORS:
+            continue
+        replay.load(t, values)
+        try:
+            value = profiler.call(key, COLLECTORS[key])
+        except Exception as e:
+            # Like the pipeline: keep the last good value
+            profiler.error(key, type(e).__name__)
+            continue
+        metrics[key] = value
+        sampled[key] = t
+        record_sample(key, value, t)
+        applied += 1
+        if next_emit is None:
+            if not all(k in metrics for k in TRACE_REQUIRED):
+                continue
+            next_emit = t
+        if t >= next_emit:
+            yield t, {**metrics, "sampled_at": dict(sampled)}, applied
+            applied = 0
+            next_emit = t + tick
+
+def run_replay(path, speed=0.0, tick=1.0):
+    """Feeds a trace to the consumers; speed 0 replays as fast as possible, 1 in real time"""
+    previous = None
+    frames = 0
+    for t, metrics, _ in replay_snapshots(read_trace(path), tick):
+        if speed and previous is not None:
+            time.sleep((t - previous) / speed)
+        previous = t
+        for consumer in consumers:
+            # Alert durations and rates follow trace time, not the wall clock
+            if isinstance(consumer, AlertEngine):
+                consumer(metrics, t)
+            else:
+                consumer(metrics)
+        frames += 1
+    return frames
+
+BUILD_STORM_NAMES = ["cc1plus", "ninja", "python3", "qtcreator", "bash", "ld.lld", "clangd", "make", "rustc"]
+
+def synthesize_build_storm(path, processes=10000, seconds=300, churn=0.2):
+    """Writes an input trace of a parallel build: `processes` synthetic compiler processes with `churn`
+    of them replaced every second, CPU pinned, RAM climbing. The shapes of the other inputs come
+    from one live read of each collector."""
+    template = {}
+    for key, collector in COLLECTORS.items():
+        if key != "top_processes":
+            with inputs.capture() as captured:
+                collector()
+            template[key] = encode_input(captured)
+    rng = random.Random(7)
+    live = list(range(1000, 1000 + processes))
+    next_pid = live[-1] + 1
+    known = set()
+    recorder = TraceRecorder(path)
+    t0 = time.time() - seconds
+    try:
+        for second in range(seconds):
+            t = t0 + second
+            for _ in range(int(processes * churn)):
+                live[rng.randrange(processes)] = next_pid
+                next_pid += 1
+
+            cpu = template["cpu"]
+            for core in cpu["cpu_times"]:
+                busy = 0.75 + rng.random() * 0.25
+                core["user"] += busy
+                core["idle"] += 1 - busy
+            if cpu.get("cgroup_cpu"):
+                limit = cpu.get("cgroup_cpu_limit") or len(cpu["cpu_times"])
+                cpu["cgroup_cpu"]["usage_usec"] += int(limit * 1e6 * (0.75 + rng.random() * 0.25))
+            recorder.write("cpu", cpu, t)
+
+            memory = template["memory"]
+            percent = min(99.0, 40 + 50 * second / seconds + rng.random() * 2)
+            memory["virtual_memory"]["percent"] = percent
+            memory["virtual_memory"]["used"] = int(memory["virtual_memory"]["total"] * percent / 100)
+            if memory.get("cgroup_memory"):
+                limit = memory["cgroup_memory"][1] or memory["virtual_memory"]["total"]
+                memory["cgroup_memory"][0] = int(limit * percent / 100)
+            recorder.write("memory", memory, t)
+
+            if second % 2 == 0:
+                for counters in (template["disk"].get("disk_io") or {}).values():
+                    written = int(rng.random() * 800 * 1024**2)
+                    counters["write_bytes"] += written
+                    counters["write_count"] += written // 65536
+                for key in ("gpu", "disk", "network", "pressure", "gpu_processes"):
+                    recorder.write(key, template[key], t)
+            if second % 3 == 0:
+                new = [[pid, name, [name, f"/workspace/src/file_{pid}.cpp", "-O2", "-c"], t, pid]
+                       for pid in live if pid not in known
+                       for name in (BUILD_STORM_NAMES[pid % len(BUILD_STORM_NAMES)],)]
+                load = [[pid, rng.random() * 100, rng.random() * 2] for pid in live if pid in known]
+                known = set(live)
+                recorder.write("top_processes", {"processes": {"pids": list(live), "new": new, "load": load}}, t)
+            if second % 5 == 0:
+                recorder.write("system", template["system"], t)
+    finally:
+        recorder.close()
+
+def bench_replay(path=None, processes=10000, seconds=300):
+    """Replay throughput (samples/s), per-collector cost and memory for a recorded trace, or a
+    synthetic build storm"""
+    global history
+    with tempfile.TemporaryDirectory() as tmp:
+        title = path
+        if path is None:
+            path = os.path.join(tmp, "build-storm.jsonl")
+            title = f"synthetic build storm, {processes} processes, {seconds} s"
+            synthesize_build_storm(path, processes, seconds)
+        trace_bytes = os.path.getsize(path)
+
+        devnull = os.open(os.devnull, os.O_WRONLY)
+        try:
+            frame_renderer = FrameRenderer(fd=devnull, tty=True)
+            alerts = AlertEngine()
+            history = MetricStore()
+            trends.clear()
+            samples = frames = 0
+            analysis = render = 0.0
+            start = time.perf_counter()
+            for t, metrics, applied in replay_snapshots(read_trace(path)):
+                step = time.perf_counter()
+                alerts(metrics, t)
+                predictive_analysis(get_trend("memory"), "RAM", CONFIG["alert_thresholds"]["memory"])
+                analysed = time.perf_counter()
+                frame_renderer.render(build_frame(metrics), 72, height=1000)
+                render += time.perf_counter() - analysed
+                analysis += analysed - step
+                samples += applied
+                frames += 1
+            total = time.perf_counter() - start
+            collectors = profiler.report()["latency"]
+            table_size = len(process_table.entries)
+
+            # Second pass under tracemalloc, which would otherwise skew the timings
+            history = MetricStore()
+            trends.clear()
+            tracemalloc.start()
+            for t, metrics, _ in replay_snapshots(read_trace(path)):
+                alerts(metrics, t)
+                frame_renderer.render(build_frame(metrics), 72, height=1000)
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        finally:
+            os.close(devnull)
+
+    frames = max(frames, 1)
+    collect = sum(c["mean_ms"] * c["count"] for key, c in collectors.items() if key in COLLECTORS) / 1000
+    print(f"{UI.BOLD}Replay benchmark ({title}){UI.ENDC}")
+    print(f" Trace:          {samples:8d} samples  {format_bytes(trace_bytes)}")
+    print(f" Throughput:     {samples / total:8.0f} samples/s  {frames / total:8.0f} frames/s")
+    print(f" Decode:         {(total - collect - analysis - render) / frames * 1000:8.3f} ms/frame")
+    print(f" Collectors:     {collect / frames * 1000:8.3f} ms/frame (the real collectors on recorded inputs)")
+    for key in sorted(collectors, key=lambda k: collectors[k]["mean_ms"], reverse=True):
+        if key in COLLECTORS:
+            c = collectors[key]
+            print(f"   {key:<14} {c['mean_ms']:8.3f} ms mean  {c['p99_ms']:8.3f} ms p99  ({c['count']} runs)")
+    print(f" Process table:  {table_size:8d} live entries at the end")
+    print(f" Analysis:       {analysis / frames * 1000:8.3f} ms/frame (alerts, predictions)")
+    print(f" Render:         {render / frames * 1000:8.3f} ms/frame")
+    print(f" Memory:         {format_bytes(peak)} peak, {format_bytes(current)} retained (tracemalloc)")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Vulkan-dev telemetry dashboard")
+    parser.add_argument('--gpu-backend', dest='gpu_backend', choices=['auto', 'nvml', 'smi-loop', 'smi', 'fake'],
+                        default=CONFIG["gpu_backend"], help='GPU metric source (auto tries nvml, smi-loop, smi)')
+    parser.add_argument('--gpu-replay', dest='gpu_replay', type=str, default=None,
+                        help='Recorded nvidia-smi CSV replayed by the fake GPU backend')
+    parser.add_argument('--gpu-process-replay', dest='gpu_process_replay', type=str, default=None,
+                        help='CSV of pid,used_memory_mb[,sm_percent] rows replayed as per-process GPU usage (fake backend)')
+    parser.add_argument('--top-by', dest='top_by', choices=['load', 'vram'], default=CONFIG["process_sort"],
+                        help='Rank the top processes by CPU+RAM load or by VRAM')
+    parser.add_argument('--collector-backend', dest='collector_backend', choices=['auto', 'cgroup', 'psutil'],
+                        default=CONFIG["collector_backend"], help='cpu/memory/io source: cgroup v2 files or host-wide psutil')
+    parser.add_argument('--cgroup-root', dest='cgroup_root', type=str, default=CONFIG["cgroup_root"],
+                        help='cgroup v2 mount (point at a fake tree for testing)')
+    parser.add_argument('--no-adaptive', dest='no_adaptive', action='store_true',
+                        help='Sample every collector at its fixed base interval')
+    parser.add_argument('--cpu-budget', dest='cpu_budget', type=float, default=CONFIG["cpu_budget_percent"],
+                        help='Max CPU (percent of one core) the monitor may use before it slows sampling down')
+    parser.add_argument('--category-rules', dest='category_rules', type=str, default=None,
+                        help='JSON file with process category rules (replaces the built-in set)')
+    parser.add_argument('--trend-mode', dest='trend_mode', choices=list(TrendEstimator.MODES), default=CONFIG["trend_mode"],
+                        help='Trend estimator behind the predictions')
+    parser.add_argument('--no-disk-cache', dest='no_disk_cache', action='store_true',
+                        help='Keep static facts and metric history in memory only')
+    parser.add_argument('--sparkline-window', dest='sparkline_window', type=int, default=None,
+                        help='Seconds of history each sparkline covers (default: last samples)')
+    parser.add_argument('--headless', dest='headless', action='store_true',
+                        help='Run collectors without the TUI (use with --listen and/or --jsonl)')
+    parser.add_argument('--listen', dest='listen', type=str, nargs='?', const=CONFIG["export_listen"], default=None,
+                        help=f'Serve OpenMetrics on HOST:PORT/metrics (default {CONFIG["export_listen"]})')
+    parser.add_argument('--jsonl', dest='jsonl', type=str, default=None,
+                        help="Append one JSON snapshot per tick to a file, or '-' for stdout (headless only)")
+    parser.add_argument('--alert-rules', dest='alert_rules', type=str, default=None,
+                        help='JSON file with alert rules (default: one rule per alert threshold)')
+    parser.add_argument('--alert-log', dest='alert_log', type=str, default=None,
+                        help='Append alert events as JSON lines to this file')
+    parser.add_argument('--alert-webhook', dest='alert_webhook', type=str, default=None,
+                        help='POST batched alert events as JSON to this URL')
+    parser.add_argument('--alert-notify', dest='alert_notify', type=str, nargs='?', const='notify-send', default=None,
+                        help='Desktop notification command run per batch (default notify-send)')
+    parser.add_argument('--profile', dest='profile', action='store_true',
+                        help='Show collector/render latency (p50/p99) and error counts; printed again on exit')
+    parser.add_argument('--profile-dir', dest='profile_dir', type=str, default=CONFIG["profile_dir"],
+                        help='Where SIGUSR1 writes cProfile and tracemalloc dumps')
+    parser.add_argument('--targets', dest='targets', type=str, nargs='+', default=None,
+                        help='Fleet view over http://host:port monitors, docker[:socket] and/or cgroup:<glob> containers')
+    parser.add_argument('--stub-agent', dest='stub_agent', type=str, nargs='?', const=CONFIG["export_listen"], default=None,
+                        help='Serve synthetic snapshots on HOST:PORT for testing --targets')
+    parser.add_argument('--record', dest='record', type=str, default=None,
+                        help='Write the raw inputs of every collector run to a JSON-lines trace (.gz to compress)')
+    parser.add_argument('--replay', dest='replay', type=str, default=None,
+                        help='Feed a recorded trace to the dashboard/exporters/alerts instead of live collectors, then exit')
+    parser.add_argument('--replay-speed', dest='replay_speed', type=float, default=0.0,
+                        help='Replay speed relative to real time (default 0: as fast as possible)')
+    parser.add_argument('--bench-replay', dest='bench_replay', type=str, nargs='?', const='', default=None,
+                        help='Benchmark replay of a trace (default: a synthetic 10k-process build storm) and exit')
+    parser.add_argument('--bench-startup', dest='bench_startup', action='store_true',
+                        help='Benchmark cold vs warm static facts loading and exit')
+    parser.add_argument('--bench-render', dest='bench_render', action='store_true',
+                        help='Benchmark bytes and time per dashboard frame and exit')
+    parser.add_argument('--bench-processes', dest='bench_processes', type=int, nargs='?', const=5000, default=None,
+                        help='Benchmark the process table against N synthetic processes (default 5000) and exit')
+    return parser.parse_args()
+
+def run_fleet(args):
+    try:
+        sources = [create_fleet_source(spec) for spec in args.targets]
+    except ValueError as e:
+        print(f"{UI.RED}{e}{UI.ENDC}", file=sys.stderr)
+        sys.exit(1)
+    if args.jsonl:
+        consumers.append(JsonLinesWriter(args.jsonl))
+    if not args.headless:
+        consumers.append(print_fleet)
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    poller = FleetPoller(sources)
+    # The first poll only primes the counter baselines of local containers
+    poller.snapshot()
+    while True:
+        time.sleep(CONFIG["fleet_interval"])
+        fleet = poller.snapshot()
+        for consumer in consumers:
+            consumer(fleet)
 
 def main():
+    global category_engine, history, trace_recorder
+    args = parse_args()
+    if args.gpu_backend == "fake" and not args.gpu_replay:
+        print(f"{UI.RED}--gpu-backend fake requires --gpu-replay <csv>{UI.ENDC}")
+        sys.exit(1)
+    CONFIG["gpu_backend"] = args.gpu_backend
+    CONFIG["gpu_replay"] = args.gpu_replay
+    CONFIG["gpu_process_replay"] = args.gpu_process_replay
+    CONFIG["process_sort"] = args.top_by
+    CONFIG["trend_mode"] = args.trend_mode
+    CONFIG["collector_backend"] = args.collector_backend
+    CONFIG["cgroup_root"] = args.cgroup_root
+    CONFIG["adaptive_sampling"] = not args.no_adaptive
+    CONFIG["cpu_budget_percent"] = args.cpu_budget
+    CONFIG["profile"] = args.profile
+    CONFIG["profile_dir"] = args.profile_dir
+    if args.no_disk_cache:
+        CONFIG["static_cache_path"] = None
+        CONFIG["history_path"] = None
+    if args.sparkline_window is not None:
+        CONFIG["sparkline_window"] = args.sparkline_window
+    if args.category_rules:
+        category_engine = CategoryEngine.from_file(args.category_rules)
+    if args.bench_startup:
+        bench_startup()
+        return
+    if args.bench_processes:
+        bench_processes(args.bench_processes)
+        return
+    if args.bench_render:
+        bench_render()
+        return
+    if args.bench_replay is not None:
+        bench_replay(args.bench_replay or None)
+        return
+    if args.stub_agent:
+        run_stub_agent(args.stub_agent)
+        return
+    if args.targets:
+        run_fleet(args)
+        return
+
+    if args.replay:
+        # A replay must not mix its trace into the persistent history
+        CONFIG["history_path"] = None
+    history.close()
+    try:
+        history = MetricStore(CONFIG["history_path"])
+    except OSError:
+        history = MetricStore()
+
+    if args.jsonl == "-" and not args.headless:
+        print(f"{UI.RED}--jsonl - writes to stdout and needs --headless{UI.ENDC}")
+        sys.exit(1)
+    if args.listen:
+        host, _, port = args.listen.rpartition(':')
+        consumers.append(MetricsExporter(host or "127.0.0.1", int(port)))
+    if args.jsonl:
+        consumers.append(JsonLinesWriter(args.jsonl))
+    sinks = []
+    if args.alert_log:
+        sinks.append(LogFileSink(args.alert_log))
+    if args.alert_webhook:
+        sinks.append(WebhookSink(args.alert_webhook))
+    if args.alert_notify:
+        sinks.append(CommandSink(args.alert_notify))
+    # First consumer, so the dashboard and exporters see metrics["alerts"]
+    alerts = AlertEngine.from_file(args.alert_rules, sinks) if args.alert_rules else AlertEngine(sinks=sinks)
+    consumers.insert(0, alerts)
+    if not args.headless:
+        consumers.append(print_dashboard)
+    interval = CONFIG["export_interval"] if args.headless else CONFIG["log_interval"]
+
     signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    signal.signal(signal.SIGUSR1, profile_signal_handler)
+
+    if args.replay:
+        frames = run_replay(args.replay, args.replay_speed)
+        print(f"{UI.GREEN}Replayed {frames} snapshots from {args.replay}{UI.ENDC}", file=sys.stderr)
+        signal_handler(signal.SIGTERM, None)
     
-    print(f"{UI.GREEN}Initializing Telemetry... Gathering baseline history and I/O speeds.{UI.ENDC}")
+    if not args.headless:
+        print(f"{UI.GREEN}Initializing Telemetry... Gathering baseline history and I/O speeds.{UI.ENDC}")
     
-    # Do an initial throwaway poll to set the baseline for network and disk speeds
-    get_system_metrics()
-    time.sleep(2) 
+    # Prime the non-blocking CPU counters and the disk/network baselines, then let every
+    # collector publish once before the first frame
+    psutil.cpu_percent(interval=None)
+    # Resolve the cgroup reader once here rather than racing to open it from collector threads
+    get_cgroup()
+    sampler = None
+    if CONFIG["adaptive_sampling"]:
+        min_factor, max_factor = CONFIG["sampling_factors"]
+        sampler = AdaptiveSampler(CONFIG["collector_intervals"], min_factor, max_factor, CONFIG["cpu_budget_percent"])
+    if args.record:
+        trace_recorder = TraceRecorder(args.record)
+    pipeline = CollectorPipeline(sampler=sampler, recorder=trace_recorder).start()
+    time.sleep(2)
+    pipeline.wait_ready()
     
     while True:
         try:
-            metrics = get_system_metrics()
-            print_dashboard(metrics)
-            time.sleep(CONFIG["log_interval"])
+            metrics = pipeline.snapshot()
+            for consumer in consumers:
+                consumer(metrics)
+            time.sleep(pipeline.tick_interval(interval))
         except Exception as e:
-            print(f"{UI.RED}Error in telemetry loop: {e}{UI.ENDC}")
+            profiler.error("loop", type(e).__name__)
+            print(f"{UI.RED}Error in telemetry loop: {e}{UI.ENDC}", file=sys.stderr if args.headless else sys.stdout)
             time.sleep(5)
 
 if __name__ == "__main__":
@@ -0,0 +1,80 @@
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import monitor  # noqa: E402
+
+# nvidia-smi --query-gpu=index,name,utilization.gpu,memory.used,memory.total,temperature.gpu --format=csv,noheader,nounits
+GPU_CSV = """0, NVIDIA GeForce RTX 4090, 35, 4096, 24564, 52
+1, NVIDIA GeForce RTX 4090, 80, 12288, 24564, 71
+0, NVIDIA GeForce RTX 4090, 40, 4200, 24564, 53
+1, NVIDIA GeForce RTX 4090, 85, 12400, 24564, 72
+"""
+
+GPU_PROCESSES_CSV = """4242, 2048, 30
+4343, 512
+4242, 2100, 35
+4343, 512
+"""
+
+
+def write_gpu_replay(directory):
+    """(device CSV, process CSV) for the fake GPU backend"""
+    devices, processes = directory / "gpu.csv", directory / "gpu-processes.csv"
+    devices.write_text(GPU_CSV)
+    processes.write_text(GPU_PROCESSES_CSV)
+    return str(devices), str(processes)
+
+
+def use_fake_gpu(monkeypatch, replay):
+    monkeypatch.setattr(monitor, "gpu_backend", None)
+    monkeypatch.setitem(monitor.CONFIG, "gpu_backend", "fake")
+    monkeypatch.setitem(monitor.CONFIG, "gpu_replay", replay[0])
+    monkeypatch.setitem(monitor.CONFIG, "gpu_process_replay", replay[1])
+
+
+@pytest.fixture
+def gpu_replay(tmp_path):
+    return write_gpu_replay(tmp_path)
+
+
+@pytest.fixture
+def fake_cgroup(tmp_path):
+    """cgroup v2 tree as --cgroup-root would see it: 2 CPUs of quota, 1 GiB limit, 256 MiB inactive page cache"""
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    files = {
+        "cgroup.controllers": "cpu io memory\n",
+        "cpu.stat": "usage_usec 1000000\nuser_usec 800000\nsystem_usec 200000\nthrottled_usec 50000\n",
+        "cpu.max": "200000 100000\n",
+        "memory.current": str(768 * 1024**2) + "\n",
+        "memory.max": str(1024**3) + "\n",
+        "memory.stat": f"anon {256 * 1024**2}\nfile {512 * 1024**2}\ninactive_file {256 * 1024**2}\n",
+        "io.stat": "8:0 rbytes=4096 wbytes=8192 rios=1 wios=2 dbytes=0 dios=0\n",
+        "memory.pressure": "some avg10=1.50 avg60=0.50 avg300=0.10 total=1234\nfull avg10=0.00 avg60=0.00 avg300=0.00 total=0\n",
+    }
+    for name, text in files.items():
+        (root / name).write_text(text)
+    return root
+
+
+@pytest.fixture
+def mon(monkeypatch, gpu_replay):
+    """monitor with the fake GPU backend, in-memory history, and its collector globals restored afterwards"""
+    # Fresh collector state, as at startup; replay swaps these globals, the originals come back afterwards
+    monkeypatch.setattr(monitor, "inputs", monitor.LiveInputs())
+    monkeypatch.setattr(monitor, "process_table", monitor.ProcessTable())
+    monkeypatch.setattr(monitor, "gpu_process_sample", (0.0, {}))
+    for name in ("cpu_counters", "disk_counters", "net_counters", "cgroup_cpu_counters", "cgroup_io_counters"):
+        monkeypatch.setattr(monitor, name, monitor.CounterDelta())
+    monkeypatch.setattr(monitor, "cgroup", None)
+    monkeypatch.setattr(monitor, "host_pressure", None)
+    monkeypatch.setattr(monitor, "history", monitor.MetricStore())
+    monkeypatch.setattr(monitor, "trends", {})
+    monkeypatch.setattr(monitor, "profiler", monitor.SelfProfiler())
+    use_fake_gpu(monkeypatch, gpu_replay)
+    return monitor
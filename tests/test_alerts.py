@@ -0,0 +1,107 @@
+import json
+
+from monitor import AlertEngine, AlertRule, LogFileSink
+
+
+def memory(percent, sampled=None):
+    metrics = {"memory": {"percent": percent}}
+    if sampled is not None:
+        metrics["sampled_at"] = {"memory": sampled}
+    return metrics
+
+
+def test_threshold_rule_waits_for_duration():
+    rule = AlertRule("memory_high", "memory.percent", above=85, for_seconds=30)
+    assert rule.evaluate(memory(90), 0) is None
+    assert rule.evaluate(memory(90), 29) is None
+    assert rule.evaluate(memory(90), 30) == "firing"
+    assert rule.evaluate(memory(95), 31) is None
+
+
+def test_dip_below_threshold_restarts_pending():
+    rule = AlertRule("memory_high", "memory.percent", above=85, for_seconds=30)
+    rule.evaluate(memory(90), 0)
+    rule.evaluate(memory(70), 20)
+    assert rule.evaluate(memory(90), 40) is None
+    assert rule.evaluate(memory(90), 69) is None
+    assert rule.evaluate(memory(90), 70) == "firing"
+
+
+def test_hysteresis_resolves_only_below_clear():
+    rule = AlertRule("memory_high", "memory.percent", above=85, for_seconds=0)
+    assert rule.clear == 80
+    assert rule.evaluate(memory(86), 0) == "firing"
+    # Between clear and above: still firing
+    assert rule.evaluate(memory(82), 1) is None
+    assert rule.firing
+    assert rule.evaluate(memory(80), 2) == "resolved"
+    assert not rule.firing
+
+
+def test_missing_metric_is_ignored():
+    rule = AlertRule("gpu_temp_high", "gpu.temperature", above=80)
+    assert rule.evaluate({"gpu": {}}, 0) is None
+    assert rule.evaluate({}, 1) is None
+
+
+def test_rate_rule_fires_on_sustained_growth():
+    rule = AlertRule("memory_growth", "memory.percent", rate_above=5, for_seconds=60)
+    # 10 %/min growth, one sample per second
+    fired = None
+    for t in range(0, 300):
+        if rule.evaluate(memory(40 + t / 6), float(t)) == "firing":
+            fired = t
+            break
+    assert fired is not None and 60 <= fired <= 62
+    assert abs(rule.last_value - 10.0) < 1e-6
+
+
+def test_rate_rule_uses_collector_sample_times():
+    rule = AlertRule("memory_growth", "memory.percent", rate_above=5, for_seconds=60)
+    # Snapshots every 0.5 s repeat each 1 s memory sample; 10 %/min growth
+    fired = None
+    for tick in range(0, 600):
+        t = tick * 0.5
+        sampled = float(int(t))
+        if rule.evaluate(memory(40 + sampled / 6, sampled), t) == "firing":
+            fired = t
+            break
+    assert fired is not None and 60 <= fired <= 62
+    assert abs(rule.last_value - 10.0) < 1e-6
+
+
+def test_rate_rule_skips_repeated_samples():
+    rule = AlertRule("memory_growth", "memory.percent", rate_above=5)
+    assert rule.value(memory(40, 10.0), 10.0) is None
+    assert rule.value(memory(40, 10.0), 10.5) is None
+    assert rule.value(memory(41, 11.0), 11.0) == 60.0
+
+
+def test_rule_needs_one_threshold():
+    for spec in ({}, {"above": 1, "rate_above": 1}):
+        try:
+            AlertRule("bad", "cpu.overall_percent", spec.get("above"), spec.get("rate_above"))
+        except ValueError:
+            continue
+        raise AssertionError(f"{spec} accepted")
+
+
+def test_engine_annotates_snapshot_and_notifies_sinks(tmp_path):
+    log = tmp_path / "alerts.log"
+    engine = AlertEngine([{"name": "cpu_high", "metric": "cpu.overall_percent", "above": 85}], [LogFileSink(str(log))])
+    metrics = {"cpu": {"overall_percent": 97.0}}
+    engine(metrics, 100.0)
+    metrics = {"cpu": {"overall_percent": 10.0}}
+    engine(metrics, 101.0)
+    assert metrics["alerts"] == []
+    engine.close()
+
+    events = [json.loads(line) for line in log.read_text().splitlines()]
+    assert [(e["rule"], e["state"]) for e in events] == [("cpu_high", "firing"), ("cpu_high", "resolved")]
+
+
+def test_engine_lists_firing_rules():
+    engine = AlertEngine([{"name": "disk_full", "metric": "disk.percent", "above": 90, "severity": "critical"}])
+    metrics = {"disk": {"percent": 95.0}}
+    engine(metrics, 1.0)
+    assert metrics["alerts"] == [{"rule": "disk_full", "severity": "critical", "metric": "disk.percent", "value": 95.0, "threshold": 90}]
@@ -0,0 +1,345 @@
+import json
+import os
+import subprocess
+import sys
+import time
+
+import pytest
+
+import build_run
+from build_run import BuildProgress, DockerIgnore, analyze_context, classify_failure
+from conftest import ROOT
+
+FAKE_DOCKER = os.path.join(ROOT, "fake_docker.py")
+
+
+@pytest.fixture
+def fake_docker(monkeypatch, tmp_path):
+    monkeypatch.setattr(build_run, "DOCKER", FAKE_DOCKER)
+    monkeypatch.setattr(build_run, "CACHE_DIR", str(tmp_path / "buildkit"))
+    monkeypatch.setattr(build_run, "BUILDER", None)
+    monkeypatch.setattr(build_run, "BUILD_LOG", str(tmp_path / "build-log.jsonl"))
+    monkeypatch.setattr(build_run, "RETRY_BACKOFF", 0.0)
+    monkeypatch.setenv("FAKE_DOCKER_STATE", str(tmp_path / "state"))
+    monkeypatch.setenv("FAKE_DOCKER_STEP_SECONDS", "0")
+    for name in ("FAKE_DOCKER_BUILDX", "FAKE_DOCKER_CONTAINERD", "FAKE_DOCKER_FAIL"):
+        monkeypatch.delenv(name, raising=False)
+    monkeypatch.chdir(tmp_path)
+    return monkeypatch
+
+
+def write_dockerfiles(directory):
+    (directory / "Dockerfile.base").write_text("FROM ubuntu:22.04\nRUN apt-get update\n")
+    (directory / "Dockerfile").write_text("FROM arthurrl/vulkan-dev:base\nRUN make\n")
+
+
+def graph_node(image, dockerfile, depends=()):
+    return {"image": image, "dockerfile": dockerfile, "build_args": None, "depends": list(depends)}
+
+
+def test_graph_with_unknown_dependency_is_rejected():
+    with pytest.raises(SystemExit):
+        build_run.validate_build_graph({"derived": graph_node("a:b", "Dockerfile", ["base"])})
+
+
+def test_graph_with_cycle_is_rejected():
+    with pytest.raises(SystemExit):
+        build_run.validate_build_graph({"a": graph_node("a:a", "Dockerfile", ["b"]), "b": graph_node("a:b", "Dockerfile", ["a"])})
+
+
+def test_graph_file_defaults(tmp_path):
+    path = tmp_path / "graph.json"
+    path.write_text('{"dev": {"image": "repo/dev:1", "dockerfile": "Dockerfile"}}')
+    assert build_run.load_build_graph(str(path)) == {"dev": graph_node("repo/dev:1", "Dockerfile")}
+
+
+def test_default_graph_builds_base_first(fake_docker, tmp_path):
+    write_dockerfiles(tmp_path)
+    graph = build_run.default_build_graph("arthurrl/vulkan-dev", "latest", None)
+    assert graph["derived"]["depends"] == ["base"]
+    assert build_run.build_graph(graph, jobs=2, retry=1)
+
+
+def test_failed_node_skips_its_dependents(fake_docker, tmp_path):
+    write_dockerfiles(tmp_path)
+    graph = {"base": graph_node("repo/dev:base", "Dockerfile.missing"),
+             "derived": graph_node("repo/dev:latest", "Dockerfile", ["base"]),
+             "other": graph_node("repo/other:latest", "Dockerfile.base")}
+    built = []
+    build = build_run.build
+
+    def recording_build(image, **kwargs):
+        built.append(image)
+        return build(image=image, **kwargs)
+
+    fake_docker.setattr(build_run, "build", recording_build)
+    assert not build_run.build_graph(graph, jobs=2, retry=1)
+    assert sorted(built) == ["repo/dev:base", "repo/other:latest"]
+
+
+def test_independent_nodes_build_in_parallel(fake_docker, tmp_path):
+    (tmp_path / "Dockerfile").write_text("FROM ubuntu:22.04\nRUN one\nRUN two\n")
+    fake_docker.setenv("FAKE_DOCKER_STEP_SECONDS", "0.3")
+    graph = {f"tag{i}": graph_node(f"repo/dev:{i}", "Dockerfile") for i in range(2)}
+    started = time.perf_counter()
+    assert build_run.build_graph(graph, jobs=2, retry=1)
+    # Each build takes ~0.9 s; run one after the other they would need ~1.8 s
+    assert time.perf_counter() - started < 1.6
+
+
+def test_graph_build_from_the_command_line(tmp_path):
+    write_dockerfiles(tmp_path)
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "build_run.py"), "--build", "--graph",
+                             "--docker", FAKE_DOCKER, "-p", str(tmp_path / "project"),
+                             "--cache-dir", str(tmp_path / "buildkit"), "--build-log", str(tmp_path / "build-log.jsonl"),
+                             "--context-cache-dir", str(tmp_path / "context")],
+                            cwd=tmp_path, env={**os.environ, "FAKE_DOCKER_STATE": str(tmp_path / "state"), "FAKE_DOCKER_STEP_SECONDS": "0"},
+                            capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert "[derived] " in result.stdout and "Build graph summary" in result.stderr
+
+
+def progress(*lines):
+    parsed = BuildProgress()
+    for line in lines:
+        parsed.feed(line)
+    return parsed
+
+
+def test_build_progress_tracks_steps():
+    parsed = progress("#5 [base 1/3] FROM ubuntu:22.04",
+                      "#5 CACHED",
+                      "#6 [base 2/3] RUN apt-get update",
+                      "#6 DONE 41.3s",
+                      "#7 [base 3/3] RUN make",
+                      "#7 ERROR: process \"/bin/sh -c make\" did not complete successfully: exit code: 2")
+    assert [(s["step"], s["status"], s["seconds"]) for s in parsed.summary()] == [
+        ("base 1/3", "CACHED", 0.0), ("base 2/3", "BUILT", 41.3), ("base 3/3", "ERROR", 0.0)]
+
+
+def test_build_commands_with_and_without_buildx(fake_docker, tmp_path):
+    inline = build_run.build_command("repo/image:tag", "Dockerfile", "sdk=1.3", buildx=False)
+    assert inline[:2] == [FAKE_DOCKER, "build"]
+    assert "BUILDKIT_INLINE_CACHE=1" in inline and "SDK=1.3" in inline
+    assert inline[inline.index("--cache-from") + 1] == "repo/image:tag"
+
+    fake_docker.setattr(build_run, "BUILDER", "ci")
+    buildx = build_run.build_command("repo/image:tag", "Dockerfile", None, buildx=True, cache_export=str(tmp_path / "export"))
+    assert buildx[:3] == [FAKE_DOCKER, "buildx", "build"] and buildx[buildx.index("--builder") + 1] == "ci"
+    # Nothing to import before the first export
+    assert "--cache-from" not in buildx and f"type=local,dest={tmp_path / 'export'},mode=max" in buildx
+
+
+@pytest.mark.parametrize("env, builder, exports", [
+    ({"FAKE_DOCKER_BUILDX": "docker"}, None, False),
+    ({"FAKE_DOCKER_BUILDX": "docker", "FAKE_DOCKER_CONTAINERD": "1"}, None, True),
+    ({"FAKE_DOCKER_BUILDX": "docker-container"}, None, True),
+    ({"FAKE_DOCKER_BUILDX": "docker"}, "ci", True),
+])
+def test_local_cache_export_needs_a_capable_builder(fake_docker, env, builder, exports):
+    for name, value in env.items():
+        fake_docker.setenv(name, value)
+    fake_docker.setattr(build_run, "BUILDER", builder)
+    assert build_run.local_cache_export() == exports
+
+
+def test_rebuild_reuses_cached_steps(fake_docker, tmp_path, caplog):
+    write_dockerfiles(tmp_path)
+    caplog.set_level("INFO")
+    assert build_run.build("repo/dev:base", "Dockerfile.base", None, retry=1)
+    assert build_run.build("repo/dev:base", "Dockerfile.base", None, retry=1)
+    summaries = [r.getMessage() for r in caplog.records if "Build steps" in r.getMessage()]
+    assert summaries == ["Build steps (0 cached, 2 rebuilt):", "Build steps (2 cached, 0 rebuilt):"]
+
+
+def test_parallel_builds_of_one_dockerfile_export_separately(fake_docker, tmp_path):
+    write_dockerfiles(tmp_path)
+    fake_docker.setenv("FAKE_DOCKER_BUILDX", "docker-container")
+    fake_docker.setenv("FAKE_DOCKER_STEP_SECONDS", "0.2")
+    exports = []
+    build_command = build_run.build_command
+
+    def recording_command(*args, **kwargs):
+        command = build_command(*args, **kwargs)
+        exports.append(command[command.index("--cache-to") + 1])
+        return command
+
+    fake_docker.setattr(build_run, "build_command", recording_command)
+    graph = {f"tag{i}": graph_node(f"repo/dev:{i}", "Dockerfile.base") for i in range(4)}
+    assert build_run.build_graph(graph, jobs=4, retry=1)
+    assert len(set(exports)) == 4
+    cache = build_run.cache_path("Dockerfile.base")
+    assert os.path.isfile(os.path.join(cache, "index.json")) and os.listdir(os.path.dirname(cache)) == ["Dockerfile.base"]
+
+
+def test_docker_driver_builds_without_a_cache_export(fake_docker, tmp_path):
+    write_dockerfiles(tmp_path)
+    fake_docker.setenv("FAKE_DOCKER_BUILDX", "docker")
+    # The fake rejects --cache-to on the docker driver, as the real one does
+    assert build_run.build("repo/dev:base", "Dockerfile.base", None, retry=1)
+    assert not os.path.exists(build_run.cache_path("Dockerfile.base"))
+
+
+def test_buildx_build_swaps_in_the_exported_cache(fake_docker, tmp_path):
+    write_dockerfiles(tmp_path)
+    fake_docker.setenv("FAKE_DOCKER_BUILDX", "docker-container")
+    assert build_run.build("repo/dev:base", "Dockerfile.base", None, retry=1)
+    cache = build_run.cache_path("Dockerfile.base")
+    assert os.path.isfile(os.path.join(cache, "index.json")) and os.listdir(os.path.dirname(cache)) == ["Dockerfile.base"]
+    assert "--cache-from" in build_run.build_command("repo/dev:base", "Dockerfile.base", None, buildx=True)
+
+
+def test_build_progress_keeps_the_failed_step_output():
+    parsed = progress("#5 [1/3] FROM ubuntu:22.04",
+                      "#5 CACHED",
+                      "#6 [2/3] RUN make",
+                      "#6 1.234 main.cpp:1:1: error: expected ';'",
+                      "#6 ERROR: process \"/bin/sh -c make\" did not complete successfully: exit code: 2")
+    assert parsed.failed_step()["instruction"] == "RUN make"
+    assert parsed.failed_output()[0] == "main.cpp:1:1: error: expected ';'"
+
+
+def test_compile_error_after_recovered_network_flake():
+    step = ["Connection timed out, retrying", "Saved 'sdk.tar.gz'",
+            "/tmp/src/main.cpp:12:5: error: 'vkCreateThing' was not declared in this scope",
+            "ERROR: process \"/bin/sh -c make\" did not complete successfully: exit code: 2"]
+    failure = classify_failure("\n".join(step), step)
+    assert failure["class"] == "compile" and not failure["transient"]
+
+
+def test_network_failure_in_failed_step_is_transient():
+    step = ["wget: unable to resolve host address 'sdk.lunarg.com'",
+            "ERROR: process \"/bin/sh -c wget ...\" did not complete successfully: exit code: 4"]
+    failure = classify_failure("\n".join(step), step)
+    assert failure["class"] == "network" and failure["transient"]
+    assert failure["reason"] == "wget: unable to resolve host address 'sdk.lunarg.com'"
+
+
+def test_failure_without_step_uses_last_error_line():
+    output = "#1 [internal] load build definition from Dockerfile\nERROR: failed to solve: dockerfile parse error line 3: unknown instruction: RUNN\n"
+    assert classify_failure(output)["class"] == "dockerfile"
+
+
+def test_unknown_failure_is_not_retried():
+    failure = classify_failure("something odd happened\n", ["something odd happened"])
+    assert failure == {"class": "unknown", "transient": False, "reason": "something odd happened"}
+
+
+def build_attempts(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_build_retries_transient_failures(fake_docker, tmp_path):
+    (tmp_path / "Dockerfile").write_text("FROM ubuntu:22.04\nRUN wget https://sdk.lunarg.com/sdk.tar.gz\nRUN make\n")
+    fake_docker.setenv("FAKE_DOCKER_FAIL", "wget=network*1")
+    assert build_run.build("repo/image:tag", "Dockerfile", None, retry=3)
+    attempts = build_attempts(tmp_path / "build-log.jsonl")
+    assert [a["returncode"] for a in attempts] == [1, 0]
+    assert attempts[0]["failure"]["class"] == "network" and attempts[0]["failure"]["step"].startswith("2/3 RUN wget")
+    # The retry resumes from the layers of the failed attempt
+    assert attempts[1]["cached_steps"] == 1
+
+
+def test_build_stops_on_deterministic_failures(fake_docker, tmp_path):
+    (tmp_path / "Dockerfile").write_text("FROM ubuntu:22.04\nRUN wget https://sdk.lunarg.com/sdk.tar.gz\nRUN make\n")
+    fake_docker.setenv("FAKE_DOCKER_FAIL", "make=compile")
+    assert not build_run.build("repo/image:tag", "Dockerfile", None, retry=3)
+    attempts = build_attempts(tmp_path / "build-log.jsonl")
+    assert len(attempts) == 1 and attempts[0]["failure"]["class"] == "compile"
+
+
+def test_dockerignore_semantics():
+    ignore = DockerIgnore(["# comment", "*.log", "build", "docs/**/*.png", "!docs/keep/**", "/tmp*"])
+    assert ignore.excluded("app.log")
+    # * stays within one segment
+    assert not ignore.excluded("logs/app.log")
+    # A directory pattern covers everything below it
+    assert ignore.excluded("build/obj/main.o")
+    assert ignore.excluded("docs/a/b/c.png") and ignore.excluded("docs/c.png")
+    # The last matching pattern wins
+    assert not ignore.excluded("docs/keep/c.png")
+    assert ignore.excluded("tmpdir/x") and not ignore.excluded("src/tmp")
+    assert ignore.has_exceptions
+
+
+def test_dockerfile_ignore_file_takes_precedence(tmp_path):
+    (tmp_path / ".dockerignore").write_text("*.log\n")
+    dockerfile = tmp_path / "Dockerfile.base"
+    assert DockerIgnore.path(str(tmp_path), str(dockerfile)) == str(tmp_path / ".dockerignore")
+    assert DockerIgnore.load(str(tmp_path), str(dockerfile)).excluded("app.log")
+    (tmp_path / "Dockerfile.base.dockerignore").write_text("src\n")
+    assert DockerIgnore.path(str(tmp_path), str(dockerfile)) == str(tmp_path / "Dockerfile.base.dockerignore")
+    ignore = DockerIgnore.load(str(tmp_path), str(dockerfile))
+    assert ignore.excluded("src/main.cpp") and not ignore.excluded("app.log")
+
+
+def make_context(root):
+    for path, size in {"src/main.cpp": 100, "src/app.log": 50, "build/obj/a.o": 1000, "build/obj/b.o": 1000,
+                       "node_modules/x/index.js": 10, "node_modules/x/node_modules/y/index.js": 10}.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(b"x" * size)
+
+
+def test_analyze_context_reports_what_is_sent(tmp_path):
+    context = tmp_path / "context"
+    context.mkdir()
+    make_context(context)
+    (context / ".dockerignore").write_text("*/*.log\n")
+    report = analyze_context(str(context), cache_file=str(tmp_path / "cache.json"))
+    # Five files plus .dockerignore itself, src/app.log is left out
+    assert report["files"] == 6 and report["excluded"] == 1
+    assert report["bytes"] == 2120 + len("*/*.log\n")
+    assert report["directories"]["src"] == [100, 1]
+    assert report["heavy"]["build"] == 2000
+
+
+def test_analyze_context_applies_the_dockerfile_ignore(tmp_path):
+    context = tmp_path / "context"
+    context.mkdir()
+    make_context(context)
+    (context / ".dockerignore").write_text("build\n")
+    (context / "Dockerfile.dev").write_text("FROM scratch\n")
+    (context / "Dockerfile.dev.dockerignore").write_text("*/*.log\n")
+
+    default = analyze_context(str(context), cache_file=str(tmp_path / "default.json"))
+    dev = analyze_context(str(context), str(context / "Dockerfile.dev"), cache_file=str(tmp_path / "dev.json"))
+    assert "build" not in default["heavy"] and default["excluded"] == 1
+    # The Dockerfile's own ignore file replaces .dockerignore entirely
+    assert dev["heavy"]["build"] == 2000
+    assert dev["directories"]["src"] == [100, 1]
+
+
+def test_analyze_context_counts_only_outermost_heavy_paths(tmp_path):
+    make_context(tmp_path)
+    report = analyze_context(str(tmp_path), cache_file=str(tmp_path.parent / "cache.json"))
+    assert report["heavy"] == {"build": 2000, "node_modules": 20}
+
+
+def test_content_digest_is_opt_in_and_cached(tmp_path):
+    context = tmp_path / "context"
+    context.mkdir()
+    make_context(context)
+    cache = str(tmp_path / "cache.json")
+
+    plain = analyze_context(str(context), cache_file=cache)
+    assert plain["hashed"] == 0 and not plain["content_digest"]
+
+    first = analyze_context(str(context), cache_file=cache, content_digest=True)
+    assert first["hashed"] == 6 and first["hashed_bytes"] == 2170
+    second = analyze_context(str(context), cache_file=cache, content_digest=True)
+    assert second["hashed"] == 0 and second["changed"] == 0 and second["digest"] == first["digest"]
+
+    # Same content, new mtime: rehashed, but the content digest does not change
+    os.utime(context / "src" / "main.cpp", ns=(1, 1))
+    touched = analyze_context(str(context), cache_file=cache, content_digest=True)
+    assert touched["hashed"] == 1 and touched["digest"] == first["digest"]
+    with open(cache) as f:
+        assert json.load(f)["files"]["src/main.cpp"][0] == 1
+
+
+def test_main_parses_the_cli(monkeypatch):
+    monkeypatch.setattr(sys, "argv", ["build_run.py", "--help"])
+    with pytest.raises(SystemExit) as exit_info:
+        build_run.main()
+    assert exit_info.value.code == 0
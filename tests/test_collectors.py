@@ -0,0 +1,241 @@
+import os
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+import monitor
+from conftest import ROOT
+from monitor import (AgentSource, CategoryEngine, CgroupReader, CgroupSource, FakeGpuBackend, FleetPoller, ProcessTable,
+                     SmiOneShotBackend, SyntheticProcess, create_fleet_source, create_gpu_backend, get_boot_id)
+
+
+def test_fake_gpu_backend_aggregates_devices(mon):
+    first = mon.get_gpu_metrics()
+    assert first["backend"] == "fake"
+    assert first["status"] == "OPERATIONAL"
+    assert len(first["devices"]) == 2
+    assert first["utilization"] == pytest.approx(57.5)
+    assert first["memory_used_mb"] == 4096 + 12288
+    assert first["temperature"] == 71
+    # The recording advances one frame per sample
+    assert mon.get_gpu_metrics()["temperature"] == 72
+
+
+def test_fake_gpu_backend_loops_the_recording(gpu_replay):
+    backend = FakeGpuBackend(gpu_replay[0])
+    frames = [backend.sample() for _ in range(3)]
+    assert [len(devices) for _, devices in frames] == [2, 2, 2]
+    assert frames[2] == frames[0]
+
+
+def test_missing_backends_fall_back_to_one_shot(monkeypatch, tmp_path):
+    monkeypatch.setenv("PATH", str(tmp_path))
+    backend = create_gpu_backend("smi-loop")
+    assert isinstance(backend, SmiOneShotBackend)
+    assert backend.sample() == ("SMI_MISSING", [])
+
+
+def test_fake_gpu_backend_replays_processes(gpu_replay):
+    backend = FakeGpuBackend(*gpu_replay)
+    assert backend.processes() == {4242: {"gpu_memory_mb": 2048.0, "gpu_sm_percent": 30.0},
+                                   4343: {"gpu_memory_mb": 512.0, "gpu_sm_percent": None}}
+    assert backend.processes()[4242]["gpu_memory_mb"] == 2100.0
+
+
+def test_gpu_usage_joins_the_process_table():
+    table = ProcessTable(pid_source=lambda: [4242, 7], process_factory=SyntheticProcess, host_namespace=True)
+    table.update()
+    usage = {4242: {"gpu_memory_mb": 2048.0, "gpu_sm_percent": 30.0}, 9999: {"gpu_memory_mb": 64.0, "gpu_sm_percent": None}}
+    table.attach_gpu(100.0, usage)
+    rows = table.gpu_rows(usage)
+    assert [r["pid"] for r in rows] == [4242, 9999]
+    assert rows[0]["name"] == SyntheticProcess(4242).name()
+    assert rows[1]["name"] == "?"
+
+
+def test_gpu_usage_maps_host_pids_through_nspid():
+    # Inside a PID namespace local PID 7 is host PID 4242; local PID 4242 is an unrelated process
+    table = ProcessTable(pid_source=lambda: [7, 4242], process_factory=SyntheticProcess, host_namespace=False,
+                         ns_source=lambda pid: [4242, 7] if pid == 7 else [pid])
+    table.update()
+    usage = {4242: {"gpu_memory_mb": 2048.0, "gpu_sm_percent": None}}
+    table.attach_gpu(100.0, usage)
+    assert [r["pid"] for r in table.gpu_rows(usage)] == [7]
+    assert table.entries[7]["gpu_memory_mb"] == 2048.0
+    assert table.entries[4242]["gpu_memory_mb"] == 0.0
+
+
+def test_nspid_is_read_from_proc_status(tmp_path):
+    (tmp_path / "7").mkdir()
+    (tmp_path / "7" / "status").write_text("Name:\tvkcube\nPid:\t7\nNSpid:\t4242\t7\n")
+    assert monitor.ns_pids(7, proc_root=str(tmp_path)) == [4242, 7]
+    assert monitor.ns_pids(8, proc_root=str(tmp_path)) == []
+
+
+def test_vram_growth_is_tracked_per_process():
+    table = ProcessTable(pid_source=lambda: [4242, 7], process_factory=SyntheticProcess, host_namespace=True)
+    table.update()
+    for t in range(0, 120, 10):
+        table.attach_gpu(float(t), {4242: {"gpu_memory_mb": 1000.0 + t, "gpu_sm_percent": None}})
+    top = table.top(2, by="vram")
+    assert top[0]["pid"] == 4242
+    assert abs(top[0]["gpu_memory_slope"] - 60.0) < 1e-6
+    # A process that left the GPU drops to zero
+    table.attach_gpu(130.0, {})
+    assert table.entries[4242]["gpu_memory_mb"] == 0.0
+
+
+def test_gpu_process_collector_uses_the_fake_backend(mon):
+    rows = mon.collect_gpu_processes()
+    assert [r["pid"] for r in rows] == [4242, 4343]
+    assert mon.gpu_process_sample[1][4242]["gpu_memory_mb"] == 2048.0
+
+
+def test_category_engine_matches_whole_tokens():
+    engine = CategoryEngine()
+    assert engine.match("ld", []) == "BUILD"
+    assert engine.match("bash", ["./build-world.sh"]) == "SYSTEM"
+    assert engine.match("python3", ["/usr/bin/cmake", "--build", "."]) == "BUILD"
+
+
+def test_category_rules_keep_priority_order():
+    engine = CategoryEngine({"BUILD": ["make"], "SCRIPT/AI": [r"python[\d.]*"]}, default="OTHER")
+    assert engine.match("python3", ["-m", "make"]) == "BUILD"
+    assert engine.match("python3", []) == "SCRIPT/AI"
+    assert engine.classify((1, 0.0), "vim", []) == "OTHER"
+
+
+def test_cgroup_reader_on_fake_sysfs(fake_cgroup):
+    reader = CgroupReader(str(fake_cgroup), "/")
+    assert reader.cpu() == (1000000, 50000)
+    assert reader.cpu_limit() == 2.0
+    # memory.current minus inactive_file
+    assert reader.memory() == (512 * 1024**2, 1024**3)
+    assert reader.io().rbytes == 4096
+    assert reader.pressure()["memory"]["some"]["avg10"] == 1.5
+    reader.close()
+
+
+def test_cgroup_memory_without_memory_stat_is_current(fake_cgroup):
+    (fake_cgroup / "memory.stat").unlink()
+    reader = CgroupReader(str(fake_cgroup), "/")
+    assert reader.memory() == (768 * 1024**2, 1024**3)
+    reader.close()
+
+
+def test_cgroup_reader_rejects_a_v1_tree(tmp_path):
+    with pytest.raises(OSError):
+        CgroupReader(str(tmp_path), "/")
+
+
+def test_cpuset_bounds_the_limit_without_a_quota(fake_cgroup):
+    (fake_cgroup / "cpu.max").write_text("max 100000\n")
+    (fake_cgroup / "cpuset.cpus.effective").write_text("0-3,8\n")
+    reader = CgroupReader(str(fake_cgroup), "/")
+    assert reader.cpu_limit() == 5
+    reader.close()
+
+
+def test_collectors_report_cgroup_scope(mon, fake_cgroup, monkeypatch):
+    monkeypatch.setitem(mon.CONFIG, "collector_backend", "cgroup")
+    monkeypatch.setitem(mon.CONFIG, "cgroup_root", str(fake_cgroup))
+    memory = mon.collect_memory()
+    assert memory["scope"] == "cgroup"
+    assert memory["percent"] == 50.0
+    cpu = mon.collect_cpu()
+    assert cpu["scope"] == "cgroup" and cpu["limit_cpus"] == 2.0
+    assert mon.collect_disk()["read_total"] == 4096
+    assert mon.collect_pressure()["memory"]["some"]["avg10"] == 1.5
+
+
+def test_psutil_backend_stays_host_wide(mon, fake_cgroup, monkeypatch):
+    monkeypatch.setitem(mon.CONFIG, "collector_backend", "psutil")
+    monkeypatch.setitem(mon.CONFIG, "cgroup_root", str(fake_cgroup))
+    assert mon.collect_memory()["scope"] == "host"
+
+
+def container_scope(root, name):
+    """A container cgroup below the fake root, with the same accounting files"""
+    scope = root / "system.slice" / name
+    scope.mkdir(parents=True)
+    for f in root.iterdir():
+        if f.is_file():
+            (scope / f.name).write_text(f.read_text())
+    return scope
+
+
+def test_cgroup_source_lists_containers(fake_cgroup):
+    container_scope(fake_cgroup, "docker-" + "ab" * 32 + ".scope")
+    source = CgroupSource("system.slice/docker-*.scope", root=str(fake_cgroup))
+    rows = source.poll()
+    source.close()
+    assert [r["target"] for r in rows] == ["docker-abababababab"]
+    assert rows[0]["memory_used_gb"] == 0.5 and rows[0]["cores_total"] == 2.0
+
+
+def test_fleet_target_specs():
+    assert isinstance(create_fleet_source("cgroup:system.slice/*.scope"), CgroupSource)
+    with pytest.raises(ValueError):
+        create_fleet_source("ssh://node1")
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+@pytest.fixture
+def stub_agent(gpu_replay):
+    port = free_port()
+    agent = subprocess.Popen([sys.executable, os.path.join(ROOT, "monitor.py"), "--stub-agent", f"127.0.0.1:{port}",
+                              "--collector-backend", "psutil", "--no-disk-cache",
+                              "--gpu-backend", "fake", "--gpu-replay", gpu_replay[0]],
+                             stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    yield f"http://127.0.0.1:{port}"
+    agent.terminate()
+    agent.wait(10)
+
+
+def poll_until_ok(poller, timeout=20):
+    deadline = time.monotonic() + timeout
+    while True:
+        fleet = poller.snapshot()
+        if all(r["status"] == "OK" for r in fleet["targets"]) or time.monotonic() > deadline:
+            return fleet
+        time.sleep(0.2)
+
+
+def test_fleet_polls_stub_agent(stub_agent):
+    poller = FleetPoller([AgentSource(stub_agent)])
+    try:
+        fleet = poll_until_ok(poller)
+    finally:
+        poller.close()
+    row = fleet["targets"][0]
+    assert row["status"] == "OK" and row["kind"] == "agent"
+    assert row["node"] == get_boot_id() and row["scope"] == "host"
+    assert row["vram_used_mb"] is not None
+    assert [r["target"] for r in fleet["rollups"]] == ["Σ all"]
+
+
+def test_fleet_total_skips_containers_covered_by_host_agent(stub_agent, fake_cgroup):
+    container_scope(fake_cgroup, "docker-0123456789ab.scope")
+    poller = FleetPoller([AgentSource(stub_agent), CgroupSource("system.slice/docker-*.scope", root=str(fake_cgroup))])
+    try:
+        fleet = poll_until_ok(poller)
+    finally:
+        poller.close()
+    assert [(r["target"], r["count"]) for r in fleet["rollups"]] == [("Σ agent", 1), ("Σ cgroup", 1), ("Σ nodes", 1)]
+
+
+def test_unreachable_agent_is_reported_not_raised():
+    poller = FleetPoller([AgentSource(f"http://127.0.0.1:{free_port()}", timeout=1)])
+    try:
+        fleet = poller.snapshot()
+    finally:
+        poller.close()
+    assert fleet["targets"][0]["status"] != "OK"
@@ -0,0 +1,64 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from conftest import ROOT
+
+FAKE_DOCKER = os.path.join(ROOT, "fake_docker.py")
+
+
+@pytest.fixture
+def dev(tmp_path):
+    """Runs `build_run.py --run` for container `dev` against fake_docker; returns (exit code, action)"""
+    env = {**os.environ, "FAKE_DOCKER_STATE": str(tmp_path / "state"), "FAKE_DOCKER_STEP_SECONDS": "0", "DISPLAY": ":0"}
+    for name in ("FAKE_DOCKER_BUILDX", "FAKE_DOCKER_OFFLINE", "FAKE_DOCKER_FAIL"):
+        env.pop(name, None)
+    project = tmp_path / "project"
+    project.mkdir()
+
+    def run(*args, **overrides):
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "build_run.py"), "--run", "--docker", FAKE_DOCKER,
+                                 "-p", str(project), "-c", "dev", *args],
+                                env={**env, **overrides}, capture_output=True, text=True, timeout=60)
+        action = re.search(r"ready in [\d.]+s \((.*)\)", result.stdout + result.stderr)
+        return result.returncode, action.group(1) if action else None
+
+    run.docker = lambda *args: subprocess.run([sys.executable, FAKE_DOCKER, *args], env=env, capture_output=True, text=True)
+    return run
+
+
+def test_container_is_reused_until_it_drifts(dev):
+    assert dev() == (0, "created")
+    assert dev() == (0, "already running")
+
+    dev.docker("stop", "dev")
+    assert dev() == (0, "started")
+
+    # Another DISPLAY changes the run options: recreated, not silently reused
+    assert dev(DISPLAY=":1") == (0, "recreated")
+    assert dev(DISPLAY=":1") == (0, "already running")
+    assert dev("--recreate", DISPLAY=":1") == (0, "recreated")
+
+
+def test_new_image_recreates_the_container(dev):
+    assert dev() == (0, "created")
+    # Another tag of the image is another image id
+    assert dev("-it", "lts") == (0, "recreated")
+
+
+def test_rebuilt_image_recreates_the_container(dev, tmp_path):
+    assert dev() == (0, "created")
+    dockerfile = tmp_path / "Dockerfile"
+    dockerfile.write_text("FROM ubuntu:22.04\nRUN make\n")
+    assert dev.docker("build", "-t", "arthurrl/vulkan-dev:latest", "-f", str(dockerfile), ".").returncode == 0
+    assert dev() == (0, "recreated")
+    assert dev() == (0, "already running")
+
+
+def test_missing_image_that_cannot_be_pulled_fails(dev):
+    returncode, action = dev(FAKE_DOCKER_OFFLINE="1")
+    assert returncode != 0 and action is None
+    assert dev.docker("container", "inspect", "dev").returncode != 0
@@ -0,0 +1,97 @@
+import pytest
+
+import monitor
+from monitor import MetricSeries, MetricStore, TrendEstimator
+
+
+def fill(series, seconds=1800, step=10):
+    # value == timestamp, so tier averages are easy to predict
+    for t in range(0, seconds, step):
+        series.append(float(t), float(t))
+
+
+def test_raw_tier_keeps_newest_samples():
+    series = MetricSeries(None, (5, 4, 3))
+    fill(series)
+    assert [t for t, _ in series.raw.latest(5)] == [1750, 1760, 1770, 1780, 1790]
+
+
+def test_minute_tier_averages_completed_buckets():
+    series = MetricSeries(None, (5, 4, 3))
+    fill(series)
+    # Minutes 0..28 are complete, the ring keeps the last 4; minute 29 is still accumulating
+    assert series.minute.latest(4) == [(1500.0, 1525.0), (1560.0, 1585.0), (1620.0, 1645.0), (1680.0, 1705.0)]
+
+
+def test_ten_minute_tier_keeps_min_avg_max():
+    series = MetricSeries(None, (5, 4, 3))
+    fill(series)
+    assert series.ten_minute.latest(3) == [(0.0, 0.0, 295.0, 590.0), (600.0, 600.0, 895.0, 1190.0)]
+
+
+def test_window_uses_finest_tier_reaching_back():
+    series = MetricSeries(None, (5, 4, 3))
+    fill(series)
+    # 40 s: the raw tier still covers it
+    assert [t for t, _ in series.window(40, now=1790)] == [1750, 1760, 1770, 1780, 1790]
+    # 60 s: beyond raw, served by the minute tier plus the bucket being accumulated
+    assert series.window(60, now=1790) == [(1740.0, 1765.0)]
+    # 20 min: the 10 minute tier, averages only
+    assert series.window(1200, now=1790) == [(600.0, 895.0), (1200.0, 1495.0)]
+
+
+def test_file_backed_store_resumes(tmp_path):
+    capacities = {"raw": 8, "1m": 4, "10m": 2}
+    store = MetricStore(str(tmp_path), capacities)
+    for t in range(10):
+        store.append("cpu", t * 10.0, 1000.0 + t)
+    store.close()
+
+    reopened = MetricStore(str(tmp_path), capacities)
+    assert reopened.last("cpu", 3) == [70.0, 80.0, 90.0]
+    reopened.close()
+
+
+def test_changed_capacities_start_fresh(tmp_path):
+    store = MetricStore(str(tmp_path), {"raw": 8, "1m": 4, "10m": 2})
+    store.append("cpu", 50.0, 1000.0)
+    store.close()
+
+    resized = MetricStore(str(tmp_path), {"raw": 16, "1m": 4, "10m": 2})
+    assert resized.last("cpu", 5) == []
+    resized.close()
+
+
+def test_trend_slope_is_per_minute_whatever_the_interval():
+    for step in (1, 5):
+        trend = TrendEstimator("linear", window=900)
+        for t in range(0, 300, step):
+            trend.update(float(t), t / 60 * 2.0)
+        assert abs(trend.slope() - 2.0) < 1e-6
+
+
+def test_collector_samples_feed_history_and_trends(monkeypatch):
+    monkeypatch.setattr(monitor, "history", MetricStore())
+    monkeypatch.setattr(monitor, "trends", {})
+    for t in range(0, 120, 2):
+        devices = [{"index": 0, "utilization": 50.0, "memory_percent": 10 + t / 60},
+                   {"index": 1, "utilization": 50.0, "memory_percent": 20.0}]
+        monitor.record_sample("gpu", {"utilization": 50.0, "memory_percent": 15 + t / 120, "devices": devices}, 1000.0 + t)
+    assert len(monitor.history.last("gpu0_memory", 100)) == 60
+    assert monitor.get_trend("gpu0_memory").slope() == pytest.approx(1.0)
+    assert monitor.get_trend("gpu1_memory").slope() == pytest.approx(0.0, abs=1e-9)
+
+
+@pytest.mark.parametrize("numpy", [True, False])
+def test_batched_scores_match_the_streaming_estimators(monkeypatch, numpy):
+    if not numpy:
+        monkeypatch.setattr(monitor, "np", None)
+    monkeypatch.setattr(monitor, "history", MetricStore())
+    monkeypatch.setattr(monitor, "trends", {})
+    for t in range(0, 300, 2):
+        monitor.record_sample("cpu", {"overall_percent": 50.0, "per_core": [t / 60 * 3.0, 40.0]}, 1000.0 + t)
+    slopes = monitor.score_trends(["cpu0", "cpu1", "missing"])
+    assert slopes["cpu0"] == pytest.approx(3.0)
+    assert slopes["cpu1"] == pytest.approx(0.0, abs=1e-9)
+    assert slopes["missing"] == 0.0
+    assert slopes["cpu0"] == pytest.approx(monitor.get_trend("cpu0").slope())
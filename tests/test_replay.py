@@ -0,0 +1,115 @@
+import collections
+
+import pytest
+
+import monitor
+from conftest import use_fake_gpu, write_gpu_replay
+
+
+def record(mon, path, rounds=2):
+    """Runs every collector `rounds` times live, recording their inputs; returns the last live values"""
+    recorder = mon.TraceRecorder(str(path))
+    live = {}
+    for i in range(rounds):
+        for j, (key, collector) in enumerate(mon.COLLECTORS.items()):
+            with mon.inputs.capture() as captured:
+                live[key] = collector()
+            recorder.write(key, captured, 1000.0 + i + j / 100)
+    recorder.close()
+    return live
+
+
+def replay(mon, path):
+    return [metrics for _, metrics, _ in mon.replay_snapshots(mon.read_trace(str(path)), tick=0.001)]
+
+
+def test_replay_runs_recorded_inputs_through_the_collectors(mon, tmp_path):
+    path = tmp_path / "trace.jsonl.gz"
+    live = record(mon, path)
+    replayed = replay(mon, path)[-1]
+
+    assert replayed["cpu"]["per_core"] == live["cpu"]["per_core"]
+    assert replayed["memory"] == live["memory"]
+    assert replayed["disk"]["read_total"] == live["disk"]["read_total"]
+    assert replayed["network"]["recv_total"] == live["network"]["recv_total"]
+    assert replayed["gpu"]["devices"] == live["gpu"]["devices"]
+    assert [p["pid"] for p in replayed["top_processes"]] == [p["pid"] for p in live["top_processes"]]
+    assert replayed["sampled_at"]["cpu"] == 1001.01
+
+
+def test_replayed_frames_show_the_recorded_vulkan_devices(mon, tmp_path, monkeypatch):
+    monkeypatch.setattr(mon, "get_vulkan_info", lambda: {"api_version": "1.3.275", "devices": [{"id": "0", "name": "llvmpipe"}]})
+    path = tmp_path / "trace.jsonl"
+    record(mon, path)
+
+    def probe():
+        raise AssertionError("replay probed vulkaninfo")
+
+    monkeypatch.setattr(mon, "get_vulkan_info", probe)
+    monkeypatch.setattr(mon, "run_vulkaninfo", probe)
+    frame = "\n".join(mon.build_frame(replay(mon, path)[-1]))
+    assert "Vulkan API: 1.3.275 | Devices: 1" in frame
+
+
+def test_replay_records_history_per_sample(mon, tmp_path):
+    path = tmp_path / "trace.jsonl"
+    record(mon, path, rounds=3)
+    replay(mon, path)
+    assert len(mon.history.last("memory", 10)) == 3
+
+
+def test_replay_rejects_output_traces(mon, tmp_path):
+    path = tmp_path / "old.jsonl"
+    path.write_text('{"t": 1.0, "c": "cpu", "v": {"overall_percent": 5.0}}\n')
+    with pytest.raises(ValueError):
+        list(mon.read_trace(str(path)))
+
+
+def test_input_encoding_keeps_types():
+    value = {"cpu_times": [monitor.CgroupCpu(1, 2)], "gpu_processes": {4242: {"gpu_memory_mb": 1.0}}, "load": (1.0, 2.0)}
+    decoded = monitor.decode_input(monitor.encode_input(value))
+    assert decoded["cpu_times"][0].usage_usec == 1 and decoded["cpu_times"][0]._fields == ("usage_usec", "throttled_usec")
+    assert decoded["gpu_processes"] == {4242: {"gpu_memory_mb": 1.0}}
+
+
+@pytest.fixture(scope="module")
+def build_storm(tmp_path_factory):
+    """Input trace of a 10k-process parallel build, 30 s with 20% of the processes replaced every second"""
+    directory = tmp_path_factory.mktemp("storm")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        use_fake_gpu(monkeypatch, write_gpu_replay(directory))
+        monkeypatch.setattr(monitor, "get_vulkan_info", dict)
+        monitor.synthesize_build_storm(str(directory / "build-storm.jsonl"), processes=10000, seconds=30)
+    return directory / "build-storm.jsonl"
+
+
+def test_build_storm_goes_through_the_process_table(mon, build_storm):
+    frames = replay(mon, build_storm)
+    assert len(mon.process_table.entries) == 10000
+    counts = collections.Counter(e["category"] for e in mon.process_table.entries.values())
+    assert counts["BUILD"] > 5000
+    assert frames[-1]["cpu"]["overall_percent"] >= 70
+    assert len(frames[-1]["top_processes"]) == mon.CONFIG["top_processes"]
+
+
+def test_bench_build_storm_replay(benchmark, mon, build_storm):
+    frames = benchmark.pedantic(replay, args=(mon, build_storm), rounds=3, iterations=1)
+    assert frames
+
+
+def test_bench_process_table_update(benchmark):
+    pids = list(range(1, 10001))
+    table = monitor.ProcessTable(pid_source=lambda: pids, process_factory=monitor.SyntheticProcess, host_namespace=True)
+    table.update()
+
+    def tick():
+        table.update()
+        return table.top(monitor.CONFIG["top_processes"])
+
+    assert len(benchmark(tick)) == monitor.CONFIG["top_processes"]
+
+
+def test_bench_trace_decode(benchmark, build_storm):
+    samples = benchmark.pedantic(lambda: [monitor.decode_input(v) for _, _, v in monitor.read_trace(str(build_storm))],
+                                 rounds=3, iterations=1)
+    assert samples